@@ -37,7 +37,9 @@ task = DockerOperator(
     ],
     environment={
         'POSTGRES_HOST': 'postgres',
-        'POSTGRES_PASSWORD': Variable.get('POSTGRES_DATA_PASSWORD')
+        'POSTGRES_PASSWORD': Variable.get('POSTGRES_DATA_PASSWORD'),
+        'ETL_PROFILE': Variable.get('ETL_PROFILE', default_var='0'),
+        'ETL_RUN_ID': '{{ run_id }}'
     },
     mount_tmp_dir=False,
     command='python -m footballdata_co_uk.football_data_co_uk_seasonal'
@@ -0,0 +1,101 @@
+"""Benchmark of the raw file archive stored uncompressed, with gzip and with zstd
+
+Saves generated seasonal football-data files to a temporary archive and measures the size
+on disk, the save time and the read and read+parse throughput of every compression:
+
+    python -m benchmarks.file_compression --files 20 --rows 380
+"""
+import argparse
+from pathlib import Path
+import tempfile
+import time
+from typing import Callable, Dict, List, cast
+
+from benchmarks.football_data import generate_csv
+from etl.data_parser import CSVDataParser
+from etl.files import File
+
+
+COMPRESSIONS = (None, 'gzip', 'zstd')
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    """
+    Measure the shortest duration of a function.
+
+    Parameters:
+        function (Callable[[], object]): Function to measure
+        repeat (int): Number of measurements
+
+    Returns:
+        float: Shortest duration in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark(directory: Path, contents: List[bytes], compression: str | None, repeat: int) -> Dict[str, float]:
+    """
+    Save, read and parse the files with a compression.
+
+    Parameters:
+        directory (Path): Archive directory
+        contents (List[bytes]): Contents of the files
+        compression (str | None): Compression of the files
+        repeat (int): Number of measurements
+
+    Returns:
+        Dict[str, float]: Size in bytes and durations in seconds
+    """
+    files = [File(directory / f'{number}.csv', compression=compression) for number in range(len(contents))]
+    parser = CSVDataParser(encoding='unicode_escape', engine='c')
+
+    def save() -> None:
+        for file, content in zip(files, contents):
+            file.save(content)
+
+    def read() -> None:
+        for file in files:
+            file.read(memory_map=True)
+
+    def read_parse() -> None:
+        for file in files:
+            parser.parse(cast(bytes, file.read(memory_map=True)))
+
+    return {
+        'save': best_time(save, repeat),
+        'size': sum(file.path.stat().st_size for file in files),
+        'read': best_time(read, repeat),
+        'read+parse': best_time(read_parse, repeat)
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    arg_parser.add_argument('--files', type=int, default=20, help='Number of files')
+    arg_parser.add_argument('--rows', type=int, default=380, help='Number of matches in a file')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Number of measurements')
+    args = arg_parser.parse_args()
+
+    contents = [generate_csv(args.rows, seed) for seed in range(args.files)]
+    raw_size = sum(map(len, contents))
+    mib = 2**20
+    print(f'{args.files} files with {args.rows} rows, {raw_size / mib:.1f} MiB uncompressed')
+    print(f"{'compression':<14}{'size [MiB]':>12}{'ratio':>8}{'save [s]':>10}{'read [MiB/s]':>14}"
+          f"{'read+parse [MiB/s]':>20}")
+    for compression in COMPRESSIONS:
+        with tempfile.TemporaryDirectory() as directory:
+            result = benchmark(Path(directory), contents, compression, args.repeat)
+        print(
+            f"{compression or 'none':<14}{result['size'] / mib:>12.2f}{raw_size / result['size']:>8.1f}"
+            f"{result['save']:>10.3f}{raw_size / mib / result['read']:>14.0f}"
+            f"{raw_size / mib / result['read+parse']:>20.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
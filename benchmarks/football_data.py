@@ -0,0 +1,162 @@
+"""Generator of synthetic football-data.co.uk CSV files
+
+The files have the real headers of the seasonal and the new (other leagues) datasets and the
+quirks of the real files: ragged rows with missing or extra trailing values, blank trailing
+lines of empty values, empty cells, CRLF line endings and seasons with different date formats.
+"""
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+SEASON_ROWS = 380
+SEASONAL_HEADER = (
+    'Div,Date,Time,HomeTeam,AwayTeam,FTHG,FTAG,FTR,HTHG,HTAG,HTR,Referee,HS,AS,HST,AST,HF,AF,HC,AC,HY,AY,HR,AR,'
+    'B365H,B365D,B365A,BWH,BWD,BWA,IWH,IWD,IWA,PSH,PSD,PSA,WHH,WHD,WHA,VCH,VCD,VCA,MaxH,MaxD,MaxA,AvgH,AvgD,AvgA,'
+    'B365>2.5,B365<2.5,P>2.5,P<2.5,Max>2.5,Max<2.5,Avg>2.5,Avg<2.5,'
+    'AHh,B365AHH,B365AHA,PAHH,PAHA,MaxAHH,MaxAHA,AvgAHH,AvgAHA,'
+    'B365CH,B365CD,B365CA,BWCH,BWCD,BWCA,IWCH,IWCD,IWCA,PSCH,PSCD,PSCA,WHCH,WHCD,WHCA,VCCH,VCCD,VCCA,'
+    'MaxCH,MaxCD,MaxCA,AvgCH,AvgCD,AvgCA,B365C>2.5,B365C<2.5,PC>2.5,PC<2.5,MaxC>2.5,MaxC<2.5,AvgC>2.5,AvgC<2.5,'
+    'AHCh,B365CAHH,B365CAHA,PCAHH,PCAHA,MaxCAHH,MaxCAHA,AvgCAHH,AvgCAHA'
+).split(',')
+NEW_HEADER = (
+    'Country,League,Season,Date,Time,Home,Away,HG,AG,Res,'
+    'PSCH,PSCD,PSCA,MaxCH,MaxCD,MaxCA,AvgCH,AvgCD,AvgCA,BFECH,BFECD,BFECA'
+).split(',')
+DATE_FORMATS = ('%d/%m/%y', '%d/%m/%Y')
+_STATS = ('HS', 'AS', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR')
+
+
+def _match_dates(rows: int, date_formats: Sequence[str], first_season: int) -> np.ndarray:
+    """
+    Generate the dates of consecutive seasons, every season formatted with the next format.
+
+    Parameters:
+        rows (int): Number of matches
+        date_formats (Sequence[str]): Date formats of consecutive seasons
+        first_season (int): Starting year of the first season
+
+    Returns:
+        np.ndarray: Formatted dates
+    """
+    number = np.arange(rows)
+    season = number // SEASON_ROWS
+    starts = pd.to_datetime([f'{first_season + year}-08-10' for year in range(season[-1] + 1 if rows else 0)])
+    dates = starts[season] + pd.to_timedelta((number % SEASON_ROWS) * 280 // SEASON_ROWS, unit='D')
+    formatted = np.empty(rows, dtype=object)
+    for index, date_format in enumerate(date_formats):
+        mask = season % len(date_formats) == index
+        formatted[mask] = dates[mask].strftime(date_format)
+    return formatted
+
+
+def _columns(
+    header: List[str], rows: int, rng: np.random.Generator, league: str, first_season: int, dates: np.ndarray
+) -> Dict[str, Any]:
+    """
+    Generate the values of the columns of a header.
+
+    Parameters:
+        header (List[str]): Column names
+        rows (int): Number of matches
+        rng (np.random.Generator): Random generator
+        league (str): League code
+        first_season (int): Starting year of the first season
+        dates (np.ndarray): Formatted match dates
+
+    Returns:
+        Dict[str, Any]: Column values
+    """
+    home_goals, away_goals = rng.poisson(1.5, rows), rng.poisson(1.2, rows)
+    result = np.where(home_goals > away_goals, 'H', np.where(home_goals < away_goals, 'A', 'D'))
+    teams = np.array([f'Team {number}' for number in range(20)])
+    home = rng.integers(0, 20, rows)
+    known = {
+        'Div': league, 'Country': 'England', 'League': league,
+        'Season': np.array([
+            f'{first_season + season}/{first_season + season + 1}' for season in np.arange(rows) // SEASON_ROWS
+        ]),
+        'Date': dates,
+        'Time': rng.choice(['12:30', '15:00', '17:30', '20:00'], rows),
+        'HomeTeam': teams[home], 'Home': teams[home],
+        'AwayTeam': teams[(home + rng.integers(1, 20, rows)) % 20],
+        'FTHG': home_goals, 'HG': home_goals, 'FTAG': away_goals, 'AG': away_goals,
+        'FTR': result, 'Res': result,
+        'HTHG': home_goals // 2, 'HTAG': away_goals // 2,
+        'HTR': np.where(home_goals // 2 > away_goals // 2, 'H', np.where(home_goals // 2 < away_goals // 2, 'A', 'D')),
+        'Referee': rng.choice(['M Oliver', 'A Taylor', 'S Hooper', 'P Bankes'], rows),
+        'AHh': rng.choice(np.arange(-2.5, 2.75, 0.25), rows), 'AHCh': rng.choice(np.arange(-2.5, 2.75, 0.25), rows),
+    }
+    known['AwayTeam'] = np.where(known['AwayTeam'] == known['HomeTeam'], teams[(home + 1) % 20], known['AwayTeam'])
+    known['Away'] = known['AwayTeam']
+    columns: Dict[str, Any] = {}
+    for col in header:
+        if col in known:
+            columns[col] = known[col]
+        elif col in _STATS:
+            stats = rng.integers(0, 25, rows).astype(str).astype(object)
+            stats[rng.random(rows) < 0.01] = ''
+            columns[col] = stats
+        else:
+            columns[col] = rng.uniform(1.01, 15, rows).round(2)
+    return columns
+
+
+def _ragged(lines: List[str], fraction: float, rng: np.random.Generator) -> None:
+    """
+    Remove trailing values from or append trailing values to a fraction of the rows.
+
+    Parameters:
+        lines (List[str]): Data rows, changed in place
+        fraction (float): Fraction of the changed rows
+        rng (np.random.Generator): Random generator
+    """
+    for index in np.flatnonzero(rng.random(len(lines)) < fraction):
+        cut = int(rng.integers(1, 10))
+        if index % 2:
+            lines[index] = lines[index].rsplit(',', cut)[0]
+        else:
+            lines[index] += ',' * cut if index % 4 else ',extra,values'
+
+
+def generate_csv(
+    rows: int,
+    seed: int = 0,
+    dataset: str = 'seasonal',
+    league: str = 'E0',
+    first_season: int = 2000,
+    ragged: float = 0.01,
+    blank_lines: int = 3,
+    date_formats: Sequence[str] = DATE_FORMATS
+) -> bytes:
+    """
+    Generate a football-data.co.uk CSV file.
+
+    Parameters:
+        rows (int): Number of matches, every 380 matches form a season
+        seed (int): Random seed
+        dataset (str): 'seasonal' for the header of the main leagues, 'new' for the header of
+            the other leagues
+        league (str): League code
+        first_season (int): Starting year of the first season
+        ragged (float): Fraction of rows with missing or extra trailing values
+        blank_lines (int): Number of trailing lines of empty values
+        date_formats (Sequence[str]): Date formats of consecutive seasons
+
+    Returns:
+        bytes: CSV content with CRLF line endings
+
+    Raises:
+        ValueError: If the dataset is unknown
+    """
+    if dataset not in ('seasonal', 'new'):
+        raise ValueError(f'Unknown dataset {dataset}')
+    header = SEASONAL_HEADER if dataset == 'seasonal' else NEW_HEADER
+    rng = np.random.default_rng(seed)
+    dates = _match_dates(rows, date_formats, first_season)
+    data = pd.DataFrame(_columns(header, rows, rng, league, first_season, dates), columns=header)
+    lines = data.to_csv(index=False, header=False, lineterminator='\n').splitlines() if rows else []
+    _ragged(lines, ragged, rng)
+    lines = [','.join(header), *lines, *[',' * (len(header) - 1)] * blank_lines]
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
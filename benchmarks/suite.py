@@ -0,0 +1,243 @@
+"""Micro-benchmark suite of the parsing and transformation of football-data files
+
+Runs every benchmark on generated seasonal files of 1x to 100x a season, compares the results
+with a JSON baseline and flags the benchmarks that got slower than the threshold:
+
+    python -m benchmarks.suite --save benchmarks/baselines/rpi.json
+    python -m benchmarks.suite --baseline benchmarks/baselines/rpi.json --threshold 0.2
+
+The suite exits with status 1 if any benchmark regressed. Durations are only comparable
+between runs on the same machine, so a baseline records the machine it was measured on.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from benchmarks.football_data import SEASON_ROWS, generate_csv
+from etl.data_parser import CSVDataParser
+from etl.date_utils import parse_dataframe_dates
+from footballdata_co_uk.pipelines import get_transform_pipeline
+
+
+CONFIG_PATH = Path('footballdata_co_uk/configuration/footballdata_co_uk.yaml')
+SCALES = (1, 10, 100)
+
+
+def _parse(_config: Dict[str, Any], content: bytes) -> Callable[[], object]:
+    """
+    Parse a file with the C engine.
+
+    Parameters:
+        _config (Dict[str, Any]): Preprocessing configuration
+        content (bytes): File content
+
+    Returns:
+        Callable[[], object]: Benchmarked function
+    """
+    parser = CSVDataParser(encoding='unicode_escape', engine='c')
+    return lambda: parser.parse(content)
+
+
+def _parse_python(_config: Dict[str, Any], content: bytes) -> Callable[[], object]:
+    """
+    Parse a file with the Python engine.
+
+    Parameters:
+        _config (Dict[str, Any]): Preprocessing configuration
+        content (bytes): File content
+
+    Returns:
+        Callable[[], object]: Benchmarked function
+    """
+    parser = CSVDataParser(encoding='unicode_escape', engine='python')
+    return lambda: parser.parse(content)
+
+
+def _parse_iter(_config: Dict[str, Any], content: bytes) -> Callable[[], object]:
+    """
+    Parse a file in chunks of 10000 rows.
+
+    Parameters:
+        _config (Dict[str, Any]): Preprocessing configuration
+        content (bytes): File content
+
+    Returns:
+        Callable[[], object]: Benchmarked function
+    """
+    parser = CSVDataParser(encoding='unicode_escape', engine='c')
+    return lambda: list(parser.parse_iter(content, chunk_size=10000))
+
+
+def _parse_dates(config: Dict[str, Any], content: bytes) -> Callable[[], object]:
+    """
+    Parse the match dates of a parsed file.
+
+    Parameters:
+        config (Dict[str, Any]): Preprocessing configuration
+        content (bytes): File content
+
+    Returns:
+        Callable[[], object]: Benchmarked function
+    """
+    data = CSVDataParser(encoding='unicode_escape', engine='c').parse(content)
+    data = data.rename(**config['rename'])[['match_date']]
+    return lambda: parse_dataframe_dates(data, **config['parse_dates'])
+
+
+def _transform_pipeline(config: Dict[str, Any], content: bytes) -> Callable[[], object]:
+    """
+    Transform a parsed file with the football-data transform pipeline.
+
+    Parameters:
+        config (Dict[str, Any]): Preprocessing configuration
+        content (bytes): File content
+
+    Returns:
+        Callable[[], object]: Benchmarked function
+    """
+    data = CSVDataParser(encoding='unicode_escape', engine='c').parse(content)
+    pipeline = get_transform_pipeline(config)
+    return lambda: pipeline.apply(data)
+
+
+BENCHMARKS: Dict[str, Callable[[Dict[str, Any], bytes], Callable[[], object]]] = {
+    'parse': _parse,
+    'parse_python': _parse_python,
+    'parse_iter': _parse_iter,
+    'parse_dates': _parse_dates,
+    'transform_pipeline': _transform_pipeline,
+}
+
+
+def measure(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """
+    Measure a function after a warm-up call.
+
+    Parameters:
+        function (Callable[[], object]): Function to measure
+        repeat (int): Number of measurements
+
+    Returns:
+        Dict[str, float]: Shortest and median duration in seconds
+    """
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'median': statistics.median(times)}
+
+
+def run(names: List[str], scales: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Run benchmarks on generated files of every scale.
+
+    Parameters:
+        names (List[str]): Benchmark names
+        scales (List[int]): Sizes of the files in seasons
+        repeat (int): Number of measurements
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Results by '<benchmark>[<scale>x]'
+    """
+    config = yaml.safe_load(CONFIG_PATH.read_text(encoding='utf-8'))['preprocessing']
+    results = {}
+    for scale in scales:
+        content = generate_csv(SEASON_ROWS * scale)
+        for name in names:
+            result = measure(BENCHMARKS[name](config, content), repeat)
+            results[f'{name}[{scale}x]'] = {'rows': SEASON_ROWS * scale, 'bytes': len(content), **result}
+    return results
+
+
+def machine() -> Dict[str, str]:
+    """
+    Describe the machine and the library versions of the measurements.
+
+    Returns:
+        Dict[str, str]: Platform, processor and versions
+    """
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'node': platform.node(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float
+) -> Dict[str, float]:
+    """
+    Compare the results with a baseline.
+
+    Parameters:
+        results (Dict[str, Dict[str, Any]]): Results
+        baseline (Dict[str, Dict[str, Any]]): Baseline results
+        threshold (float): Relative slowdown of the shortest duration flagged as a regression
+
+    Returns:
+        Dict[str, float]: Relative change of the shortest duration of the regressed benchmarks
+    """
+    regressions = {}
+    for name, result in results.items():
+        if name in baseline:
+            change = result['best'] / baseline[name]['best'] - 1
+            if change > threshold:
+                regressions[name] = change
+    return regressions
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    arg_parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                            help='Benchmarks to run')
+    arg_parser.add_argument('--scales', nargs='+', type=int, default=list(SCALES), help='File sizes in seasons')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Number of measurements')
+    arg_parser.add_argument('--baseline', type=Path, help='Baseline JSON file to compare with')
+    arg_parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative slowdown flagged as a regression (default: 0.2)')
+    arg_parser.add_argument('--save', type=Path, help='JSON file to save the results to as a new baseline')
+    args = arg_parser.parse_args()
+
+    baseline: Dict[str, Any] = {'machine': {}, 'results': {}}
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if baseline['machine'] != machine():
+            print(f"Warning: the baseline was measured on a different machine: {baseline['machine']}")
+    results = run(args.benchmarks, args.scales, args.repeat)
+    regressions = compare(results, baseline['results'], args.threshold)
+
+    print(f"{'benchmark':<28}{'rows':>8}{'best [ms]':>12}{'median [ms]':>13}{'rows/s':>12}"
+          f"{'baseline':>11}{'change':>9}")
+    for name, result in results.items():
+        base = baseline['results'].get(name)
+        base_time = f"{base['best'] * 1e3:.1f}" if base else ''
+        change = f"{result['best'] / base['best'] - 1:+.0%}" if base else ''
+        print(
+            f"{name:<28}{result['rows']:>8}{result['best'] * 1e3:>12.1f}{result['median'] * 1e3:>13.1f}"
+            f"{result['rows'] / result['best']:>12.0f}{base_time:>11}{change:>9}"
+            f"{'  REGRESSION' if name in regressions else ''}"
+        )
+    if args.save is not None:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({'machine': machine(), 'results': results}, indent=2) + '\n', encoding='utf-8')
+    if regressions:
+        print(f'{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
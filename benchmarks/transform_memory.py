@@ -0,0 +1,101 @@
+"""Benchmark of the memory used by the football-data transform pipeline
+
+Compares the copy-free pipeline (pandas copy-on-write and in-place operations) with the same
+operations run one after another on full copies, for a full-history backfill sized input:
+
+    python -m benchmarks.transform_memory --rows 130000
+
+Each variant runs in a fresh process. The per-operation peak RSS is only reported on Linux.
+"""
+import argparse
+import multiprocessing
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+import yaml
+
+from benchmarks.football_data import generate_csv
+from etl.data_parser import CSVDataParser
+from etl.date_utils import parse_dataframe_dates
+from etl.transform import OperationStats, TransformPipeline, cast_numeric
+from footballdata_co_uk.pipelines import get_transform_pipeline, select_columns
+
+
+CONFIG_PATH = Path('footballdata_co_uk/configuration/footballdata_co_uk.yaml')
+
+
+def baseline_pipeline(config: Dict[str, Any]) -> TransformPipeline:
+    """
+    Build the transform pipeline with every operation returning a full copy of the data.
+
+    Parameters:
+        config (Dict[str, Any]): Preprocessing configuration
+
+    Returns:
+        TransformPipeline: Pipeline
+    """
+    return (
+        TransformPipeline()
+            .add_operation(pd.DataFrame.rename, **config['rename'])
+            .add_operation(select_columns, config['columns_select'])
+            .add_operation(parse_dataframe_dates, **config['parse_dates'])
+            .add_operation(pd.DataFrame.replace, **config['replace'])
+            .add_operation(pd.DataFrame.dropna, **config['dropna'])
+            .add_operation(cast_numeric, config['columns_to_numeric'])
+        )
+
+
+def run_variant(variant: str, rows: int) -> List[OperationStats]:
+    """
+    Parse the generated data and transform it with memory tracking.
+
+    Parameters:
+        variant (str): 'baseline' or 'copy-free'
+        rows (int): Number of matches
+
+    Returns:
+        List[OperationStats]: Resources used by the operations
+    """
+    config = yaml.safe_load(CONFIG_PATH.read_text(encoding='utf-8'))['preprocessing']
+    pipeline = baseline_pipeline(config) if variant == 'baseline' else get_transform_pipeline(config)
+    pipeline.track_memory = True
+    raw = CSVDataParser(engine='c').parse(generate_csv(rows))
+    pipeline.apply(raw)
+    return pipeline.stats
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    arg_parser.add_argument('--rows', type=int, default=130000, help='Number of matches')
+    args = arg_parser.parse_args()
+
+    results: Dict[str, List[OperationStats]] = {}
+    context = multiprocessing.get_context('spawn')
+    for variant in ('baseline', 'copy-free'):
+        with context.Pool(1) as pool:
+            results[variant] = pool.apply(run_variant, (variant, args.rows))
+
+    mib = 2**20
+    print(f'Transforming {args.rows} rows, memory in MiB')
+    print(f"{'operation':<32}{'allocated':>12}{'allocated':>12}{'peak RSS':>12}{'peak RSS':>12}")
+    print(f"{'':<32}{'baseline':>12}{'copy-free':>12}{'baseline':>12}{'copy-free':>12}")
+    for base, free in zip(results['baseline'], results['copy-free']):
+        rss = [
+            'n/a' if stats.rss_peak is None else f'{stats.rss_peak / mib:.1f}' for stats in (base, free)
+        ]
+        print(
+            f'{base.operation:<32}{base.allocated_peak / mib:>12.1f}{free.allocated_peak / mib:>12.1f}'
+            f'{rss[0]:>12}{rss[1]:>12}'
+        )
+    for variant, stats in results.items():
+        rss_values = [op.rss_peak for op in stats if op.rss_peak is not None]
+        print(
+            f'{variant}: {sum(op.seconds for op in stats):.2f}s, '
+            f'largest allocation {max(op.allocated_peak for op in stats) / mib:.1f} MiB, '
+            f"peak RSS {f'{max(rss_values) / mib:.1f} MiB' if rss_values else 'n/a'}"
+        )
+
+
+if __name__ == '__main__':
+    main()
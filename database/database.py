@@ -4,6 +4,8 @@ from sqlalchemy import create_engine as _create_engine
 from sqlalchemy.orm import sessionmaker as _sessionmaker
 
 
-engine = _create_engine(
-    f"postgresql+psycopg2://mlfootball_api:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}/mlfootball")
+engine = _create_engine(os.getenv(
+    'DATABASE_URL',
+    f"postgresql+psycopg2://mlfootball_api:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}/mlfootball"
+))
 Session = _sessionmaker(bind=engine)
@@ -36,6 +36,7 @@ CREATE TABLE IF NOT EXISTS football_data.football_data_co_uk (
 	max_under numeric(5, 2) NULL,
 	avg_over numeric(5, 2) NULL,
 	avg_under numeric(5, 2) NULL,
+	row_hash int8 NULL,
 	CONSTRAINT football_data_co_uk_unique UNIQUE (season, league, match_date, home_team, away_team)
 );
 
@@ -0,0 +1,4 @@
+-- Row hash of the upsert change detection, added after the table was first created.
+-- Idempotent: a no-op on new databases, run it on existing ones with
+--   docker exec -i postgres_database psql -U airflow -d mlfootball < database/init/03_add_row_hash.sql
+ALTER TABLE football_data.football_data_co_uk ADD COLUMN IF NOT EXISTS row_hash int8 NULL;
@@ -1,10 +1,15 @@
 """Custom Data Parsers"""
 from abc import ABC, abstractmethod
+import codecs
+import csv
+import io
 import logging
-from typing import List
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
 import pandas as pd
 
 from etl.exceptions import DataParserError
+from etl.metrics import METRICS, Measurement
 
 
 logger = logging.getLogger(__name__)
@@ -30,26 +35,72 @@ class DataParser(ABC):
             DataParserError: If there's an issue during parsing
         """
 
+    def parse_iter(self, content: bytes, chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        Parse data into DataFrame chunks. Parsers that cannot split the content parse it
+        at once and yield slices of the parsed data, at least one chunk even if empty.
+
+        Parameters:
+            content (bytes): Raw data to be parsed
+            chunk_size (int): Maximum number of rows in a chunk (default is 10000)
+
+        Yields:
+            pd.DataFrame: Consecutive chunks of parsed data
+
+        Raises:
+            DataParserError: If there's an issue during parsing
+        """
+        data = self.parse(content)
+        for start in range(0, max(len(data), 1), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+
 
 class CSVDataParser(DataParser):
     """
     Parses CSV data into a Pandas DataFrame.
 
+    Rows longer than the first line are truncated to its width, rows shorter than it are padded
+    with None and lines containing only empty values are dropped. Quotes are not interpreted.
+
     Attributes:
         header (bool): Whether the CSV file has a header row.
         encoding (str): The encoding of the CSV content.
+        engine (str): Parser engine, 'python' (pure Python) or 'c' (pandas C engine).
+        dtype (Dict[Any, Any] | None): Column dtypes, only supported by the 'c' engine.
     """
+    ENGINES = ('python', 'c')
+    _MISSING = '\x1f'
+    _BLOCK_SIZE = 1 << 20
 
-    def __init__(self, header: bool = True, encoding: str = 'utf-8'):
+    def __init__(
+        self,
+        header: bool = True,
+        encoding: str = 'utf-8',
+        engine: str = 'python',
+        dtype: Dict[Any, Any] | None = None
+    ):
         """
         Initialize CSVDataParser.
 
         Parameters:
             header (bool, optional): Whether the CSV file has a header row (default is True)
             encoding (str, optional): The encoding of the CSV content (default is 'utf-8')
+            engine (str, optional): Parser engine, 'python' or 'c' (default is 'python')
+            dtype (Dict[Any, Any] | None, optional): Dtypes of columns given by name
+                (or by position if there is no header), e.g. {'FTHG': 'Int16'}. Empty values of
+                typed columns are parsed as missing. Only supported by the 'c' engine.
+
+        Raises:
+            ValueError: If the engine is unknown or dtype is given for the 'python' engine
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f'Unknown engine {engine}, expected one of {self.ENGINES}')
+        if dtype and engine != 'c':
+            raise ValueError('Column dtypes are only supported by the "c" engine')
         self.header = header
         self.encoding = encoding
+        self.engine = engine
+        self.dtype = dtype or {}
 
     @staticmethod
     def _is_empty_line(line: List[str]) -> bool:
@@ -64,32 +115,42 @@ class CSVDataParser(DataParser):
         """
         return not any(line)
 
-    def parse(self, content: bytes) -> pd.DataFrame:
+    def _decode(self, content: bytes) -> str:
         """
-        Parse CSV content into a Pandas DataFrame.
+        Decode CSV content.
 
         Parameters:
-            content (bytes): Raw content of CSV data
+            content (bytes): Raw content of CSV data, any bytes-like object (e.g. memoryview, mmap)
 
         Returns:
-            pd.DataFrame: Parsed CSV data in DataFrame format, or None if parsing fails
+            str: Decoded content
 
         Raises:
-            DataParserError: If there's an issue during parsing
+            DataParserError: If the content is too short, not bytes-like or cannot be decoded
         """
         if len(content) < 2:
             logger.error('Error parsing content: Not enough content to parse.')
             raise DataParserError('Not enough content to parse')
 
         try:
-            decoded = content.decode(self.encoding)
+            return codecs.decode(content, self.encoding)
         except UnicodeDecodeError as exc:
             logger.error('Error parsing content: Could not decode content.')
             raise DataParserError('Could not decode content') from exc
-        except AttributeError as exc:
+        except (AttributeError, TypeError) as exc:
             logger.error('Error parsing content: Not a "bytes" object.')
             raise DataParserError('Content is not a "bytes" object.') from exc
 
+    def _parse_python(self, decoded: str) -> pd.DataFrame:
+        """
+        Parse decoded CSV content by splitting lines in Python.
+
+        Parameters:
+            decoded (str): Decoded CSV content
+
+        Returns:
+            pd.DataFrame: Parsed CSV data
+        """
         content_lines = decoded.splitlines()
         reference_len = len(content_lines[0].split(','))
         lines = [
@@ -99,3 +160,236 @@ class CSVDataParser(DataParser):
         if self.header:
             return pd.DataFrame(data=lines[1:], columns=lines[0])
         return pd.DataFrame(data=lines)
+
+    def _parse_lines(self, lines: List[str], names: List[Any]) -> pd.DataFrame:
+        """
+        Parse a chunk of CSV lines without the header line.
+
+        Parameters:
+            lines (List[str]): Decoded CSV lines
+            names (List[Any]): Column names
+
+        Returns:
+            pd.DataFrame: Parsed CSV data
+        """
+        if self.engine == 'c':
+            return self._parse_c('\n'.join(lines), names)
+        width = len(names)
+        rows = [
+            parsed_line[:width] + [None] * (width - len(parsed_line)) for line in lines
+            if not self._is_empty_line(parsed_line := line.split(','))
+        ]
+        return pd.DataFrame(data=rows, columns=names)
+
+    def _iter_lines(self, decoded: str, chunk_size: int, start: int = 0) -> Iterator[List[str]]:
+        """
+        Split decoded CSV content into lists of lines, splitting only one block of text at a time.
+
+        Parameters:
+            decoded (str): Decoded CSV content
+            chunk_size (int): Number of lines in a list
+            start (int): Position in the content to start from (default is 0)
+
+        Yields:
+            List[str]: Consecutive lines
+        """
+        lines: List[str] = []
+        while start < len(decoded):
+            # Blocks end after a line feed, so \r\n line breaks are never split
+            end = decoded.find('\n', start + self._BLOCK_SIZE) + 1 or len(decoded)
+            lines.extend(decoded[start:end].splitlines())
+            start = end
+            while len(lines) >= chunk_size:
+                yield lines[:chunk_size]
+                del lines[:chunk_size]
+        if lines:
+            yield lines
+
+    def _read_marked(self, marked: str, names: List[Any]) -> pd.DataFrame:
+        """
+        Read CSV content with marked lines with the pandas C engine.
+
+        Parameters:
+            marked (str): CSV content with the marker field appended to every line
+            names (List[Any]): Column names
+
+        Returns:
+            pd.DataFrame: Parsed data with positional column names, including the marker column
+
+        Raises:
+            DataParserError: If the content cannot be parsed or a value does not match its dtype
+        """
+        width = len(names)
+        positions = list(range(width + 1))
+        dtype: Dict[int, Any] = {i: object for i in positions}
+        na_values: Dict[int, List[str]] = {}
+        for col, col_dtype in self.dtype.items():
+            if col in names:
+                dtype[names.index(col)] = col_dtype
+                na_values[names.index(col)] = ['', self._MISSING]
+
+        # A leading line spanning all the columns, so the C engine always finds them
+        content = ',' * width + self._MISSING + '\n' + marked
+        options: Dict[str, Any] = {
+            'header': None,
+            'names': positions,
+            'usecols': positions,
+            'dtype': dtype,
+            'keep_default_na': False,
+            'na_values': na_values,
+            'quoting': csv.QUOTE_NONE,
+            'skip_blank_lines': False
+        }
+        try:
+            try:
+                data = pd.read_csv(io.StringIO(content), engine='c', **options)
+            except pd.errors.ParserError as exc:
+                # The C tokenizer can overflow its buffers on content made mostly of empty fields
+                if 'Buffer overflow' not in str(exc):
+                    raise
+                logger.debug('C engine failed, parsing content with the python engine: %s', exc)
+                data = pd.read_csv(io.StringIO(content), engine='python', **options)
+        except ValueError as exc:
+            logger.error('Error parsing content: %s', exc)
+            raise DataParserError(f'Could not parse content: {exc}') from exc
+        return data.iloc[1:].reset_index(drop=True)
+
+    def _find_missing(
+        self, rows: pd.DataFrame, complete: np.ndarray, marked: str, positions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the fields missing from rows read by the C engine, and the rows with no values.
+
+        Parameters:
+            rows (pd.DataFrame): Rows to inspect, without the marker column
+            complete (np.ndarray): Whether the marker of each row was found after the last column
+            marked (str): CSV content with the marker field appended to every line
+            positions (np.ndarray): Positions of the rows among the lines
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Mask of the missing fields and mask of the empty rows
+        """
+        is_marker = rows.isin([self._MISSING]).to_numpy()
+        is_missing = np.logical_or.accumulate(is_marker, axis=1).astype(bool)
+        is_empty = (is_missing | rows.isna().to_numpy() | rows.isin(['']).to_numpy()).all(axis=1)
+        unresolved = np.flatnonzero(~is_marker.any(axis=1) & ~complete)
+        if len(unresolved):
+            lines = marked.split('\n')
+            for row in unresolved:
+                fields = lines[positions[row]].split(',')[:-1]
+                is_missing[row, len(fields):] = True
+                is_empty[row] = self._is_empty_line(fields)
+        return is_missing, is_empty
+
+    def _parse_c(self, decoded: str, names: List[Any] | None = None) -> pd.DataFrame:
+        """
+        Parse decoded CSV content with the pandas C engine.
+
+        A marker field is appended to every line, so that fields missing from short rows can be
+        told apart from empty fields and set to None as in the Python engine. One column more than
+        the first line width is read to find the markers of complete rows. The few rows whose
+        marker is not found (rows longer than the first line, or with the marker in a typed column)
+        are resolved from their text.
+
+        Parameters:
+            decoded (str): Decoded CSV content
+            names (List[Any] | None): Column names of content without its first line (e.g. a chunk),
+                by default they are taken from the first line
+
+        Returns:
+            pd.DataFrame: Parsed CSV data
+        """
+        # Rows are split on the line boundaries of str.splitlines, as in the Python engine
+        decoded = '\n'.join(decoded.splitlines()).rstrip('\n')
+        if names is None:
+            first_line, _, rest = decoded.partition('\n')
+            names = first_line.split(',') if self.header else list(range(len(first_line.split(','))))
+            decoded = rest if self.header else decoded
+        width = len(names)
+        marked = decoded.replace('\n', f',{self._MISSING}\n') + f',{self._MISSING}'
+        data = self._read_marked(marked, names)
+
+        # Rows with the marker right after the last column are complete, rows can only be
+        # empty if their first value is, only the remaining rows are inspected cell by cell
+        complete = data[width].isin([self._MISSING]).to_numpy()
+        inspect = np.flatnonzero(~complete | data[0].isna().to_numpy() | data[0].isin(['']).to_numpy())
+        is_empty_row = np.zeros(len(data), dtype=bool)
+        data = data.iloc[:, :width]
+        if len(inspect):
+            rows = data.iloc[inspect]
+            is_missing, is_empty_row[inspect] = self._find_missing(rows, complete[inspect], marked, inspect)
+            if is_missing.any():
+                data = data.copy()
+                data.iloc[inspect] = rows.mask(is_missing, None)
+
+        data = data[~is_empty_row].reset_index(drop=True)
+        data.columns = names
+        return data
+
+    def parse(self, content: bytes) -> pd.DataFrame:
+        """
+        Parse CSV content into a Pandas DataFrame.
+
+        Parameters:
+            content (bytes): Raw content of CSV data, any bytes-like object (e.g. memoryview, mmap)
+
+        Returns:
+            pd.DataFrame: Parsed CSV data in DataFrame format, or None if parsing fails
+
+        Raises:
+            DataParserError: If there's an issue during parsing
+        """
+        with METRICS.measure('parse') as measurement:
+            decoded = self._decode(content)
+            measurement.bytes = len(content)
+            data = self._parse_c(decoded) if self.engine == 'c' else self._parse_python(decoded)
+            measurement.rows_out = len(data)
+        return data
+
+    def parse_iter(self, content: bytes, chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        Parse CSV content into DataFrame chunks, so that only one chunk of lines and rows is held
+        in memory besides the decoded content. The chunks have the columns of the first line and
+        together are equal to the result of `parse`. At least one chunk is yielded, even if empty.
+
+        Parameters:
+            content (bytes): Raw content of CSV data, any bytes-like object (e.g. memoryview, mmap)
+            chunk_size (int): Number of lines parsed into a chunk, chunks are smaller if some
+                of the lines have no values (default is 10000)
+
+        Yields:
+            pd.DataFrame: Consecutive chunks of parsed CSV data
+
+        Raises:
+            DataParserError: If there's an issue during parsing
+        """
+        measurement = Measurement('parse')
+        yield from METRICS.follow(measurement, self._parse_chunks(content, chunk_size, measurement))
+
+    def _parse_chunks(self, content: bytes, chunk_size: int, measurement: Measurement) -> Iterator[pd.DataFrame]:
+        """
+        Parse CSV content into DataFrame chunks (see `parse_iter`).
+
+        Parameters:
+            content (bytes): Raw content of CSV data, any bytes-like object (e.g. memoryview, mmap)
+            chunk_size (int): Number of lines parsed into a chunk
+            measurement (Measurement): Measurement of the parsing
+
+        Yields:
+            pd.DataFrame: Consecutive chunks of parsed CSV data
+        """
+        decoded = self._decode(content)
+        measurement.bytes = len(content)
+        first_line = (decoded[:decoded.find('\n') + 1 or len(decoded)].splitlines(keepends=True) or [''])[0]
+        fields = first_line.splitlines()[0].split(',') if first_line else ['']
+        names = fields if self.header else list(range(len(fields)))
+        offset = 0
+        for lines in self._iter_lines(decoded, chunk_size, start=len(first_line) if self.header else 0):
+            data = self._parse_lines(lines, names)
+            if data.empty:
+                continue
+            data.index = pd.RangeIndex(offset, offset + len(data))
+            offset += len(data)
+            yield data
+        if not offset:
+            yield self._parse_lines([], names)
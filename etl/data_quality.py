@@ -2,6 +2,7 @@
 import logging
 from typing import Any, Callable, List
 from etl.exceptions import InvalidDataException
+from etl.metrics import METRICS, count_rows
 
 
 logger = logging.getLogger(__name__)
@@ -43,6 +44,19 @@ class DataQualityValidator:
         Parameters:
             data (any): Data to be validated.
         
+        Raises:
+            InvalidDataException: If any condition fails during validation.
+        """
+        with METRICS.measure('validate', rows_in=count_rows(data)):
+            self._validate(data)
+
+    def _validate(self, data: Any) -> None:
+        """
+        Check the conditions one by one.
+
+        Parameters:
+            data (any): Data to be validated.
+
         Raises:
             InvalidDataException: If any condition fails during validation.
         """
@@ -1,10 +1,30 @@
 """Date util functions"""
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Iterator, Tuple, List
+import fcntl
+import json
+import math
+import re
+from typing import Dict, Iterator, Tuple, List
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from etl.exceptions import DataParserError
+from etl.files import File
+
+
+# Lengths of the strings matched by the strptime directives, unknown directives match any length
+_DIRECTIVE_LENGTHS = {
+    'd': (1, 2), 'm': (1, 2), 'H': (1, 2), 'I': (1, 2), 'M': (1, 2), 'S': (1, 2),
+    'y': (2, 2), 'Y': (4, 4), 'b': (3, 3), 'a': (3, 3), 'p': (2, 2), 'f': (1, 6), 'j': (1, 3),
+    'B': (3, 9), 'A': (6, 9), '%': (1, 1)
+}
+_DIRECTIVE_PATTERN = re.compile(r'%.')
+_MAX_REPORTED_ROWS = 10
+
 
 def generate_seasons(start_date: datetime, end_date: datetime) -> Iterator[Tuple[str, str]]:
     """
@@ -39,26 +59,196 @@ def generate_dates(start_date: datetime, end_date: datetime) -> Iterator[datetim
     for i in range(int((end_date - start_date).days) + 1):
         yield start_date + timedelta(i)
 
-def parse_dataframe_dates(data: pd.DataFrame, col: str, date_formats: List[str]) -> pd.DataFrame:
+class DateFormatCache:
+    """
+    Date formats that matched the dates of each source, tried first when the source is parsed again.
+
+    The cache is stored as JSON. Updates are merged with the stored cache while holding an
+    exclusive lock on a sidecar lock file, so it can be shared by processes, e.g. the transform
+    workers, without losing their updates; the last update of a source wins.
+
+    Attributes:
+        file (File): File storing the cache.
+    """
+
+    def __init__(self, file: File) -> None:
+        self.file = file
+        self._formats: Dict[str, List[str]] | None = None
+
+    def _read(self) -> Dict[str, List[str]]:
+        """
+        Read the stored cache.
+
+        Returns:
+            Dict[str, List[str]]: Formats of each source.
+        """
+        return json.loads(bytes(self.file.read())) if self.file.exists() else {}
+
+    def get(self, source: str) -> List[str]:
+        """
+        Get the formats that matched the dates of a source.
+
+        Parameters:
+            source (str): Source of the data
+
+        Returns:
+            List[str]: Formats, most used first, empty if unknown
+        """
+        if self._formats is None:
+            self._formats = self._read()
+        return self._formats.get(source, [])
+
+    def update(self, source: str, formats: List[str]) -> None:
+        """
+        Store the formats that matched the dates of a source.
+
+        Parameters:
+            source (str): Source of the data
+            formats (List[str]): Formats, most used first
+        """
+        if self.get(source) == formats:
+            return
+        with self._locked():
+            self._formats = {**self._read(), source: formats}
+            self.file.save(json.dumps(self._formats, indent=2).encode())
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Hold an exclusive lock of the cache, blocking until other processes release it.
+
+        Yields:
+            None
+        """
+        lock = self.file.sidecar('.lock').path
+        lock.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock, 'a', encoding='utf-8') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _format_length(date_format: str) -> Tuple[int, float]:
+    """
+    Get the range of lengths of the strings matching a date format.
+
+    Parameters:
+        date_format (str): strptime format
+
+    Returns:
+        Tuple[int, float]: Minimum and maximum length, infinite if unbounded
+    """
+    directives = _DIRECTIVE_PATTERN.findall(date_format)
+    literals = len(_DIRECTIVE_PATTERN.sub('', date_format))
+    lengths = [_DIRECTIVE_LENGTHS.get(directive[1], (0, math.inf)) for directive in directives]
+    return literals + sum(low for low, _ in lengths), literals + sum(high for _, high in lengths)
+
+
+def _present_values(values: pd.Series) -> Tuple[np.ndarray, np.ndarray | None]:
+    """
+    Find the values that are not missing, empty or whitespace only, and the lengths of strings.
+
+    Parameters:
+        values (pd.Series): Values
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray | None]: Whether each value is present, and the lengths,
+            NaN for missing values, None if not all values are strings
+    """
+    present = values.notna().to_numpy(copy=True)
+    try:
+        strings = pa.array(values, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        present &= ~values.map(lambda value: isinstance(value, str) and not value.strip()).to_numpy(dtype=bool)
+        return present, None
+    blank = pc.equal(pc.utf8_length(pc.utf8_trim_whitespace(strings)), 0)  # pylint: disable=no-member
+    present &= ~blank.fill_null(False).to_numpy(zero_copy_only=False)
+    return present, pc.utf8_length(strings).to_numpy(zero_copy_only=False)  # pylint: disable=no-member
+
+
+def parse_dates(values: pd.Series, date_formats: List[str]) -> Tuple[pd.Series, List[str]]:
+    """
+    Parse dates written in any of the given formats, also mixed within the values.
+
+    The values are grouped by the formats their length can match, and every group is parsed
+    with a single vectorized call. Values not parsed by a format are tried with the next one.
+    Empty and whitespace only strings are missing dates, parsed as NaT.
+
+    Parameters:
+        values (pd.Series): Dates as strings
+        date_formats (List[str]): List of formats to try to match the dates, in order
+
+    Returns:
+        Tuple[pd.Series, List[str]]: Parsed dates and the formats that matched any of them,
+            most used first
+
+    Raises:
+        DataParserError: If some dates do not match any of the formats, listing them
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values, []
+    remaining, lengths = _present_values(values)
+    parsed = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[ns]')
+    used: Dict[str, int] = {}
+    for date_format in date_formats:
+        candidates = remaining.copy()
+        if lengths is not None:
+            low, high = _format_length(date_format)
+            candidates = candidates & (lengths >= low) & (lengths <= high)
+        if not candidates.any():
+            continue
+        if candidates.all():
+            group = pd.to_datetime(values, format=date_format, errors='coerce')
+        else:
+            group = pd.to_datetime(values[candidates], format=date_format, errors='coerce')
+        matched = group.notna().to_numpy()
+        candidates[candidates] = matched
+        parsed[candidates] = group.to_numpy(dtype='datetime64[ns]')[matched]
+        remaining &= ~candidates
+        if matched.any():
+            used[date_format] = int(matched.sum())
+    if remaining.any():
+        invalid = values[remaining]
+        rows = ', '.join(f'{index}: {value!r}' for index, value in invalid.head(_MAX_REPORTED_ROWS).items())
+        if len(invalid) > _MAX_REPORTED_ROWS:
+            rows += f' and {len(invalid) - _MAX_REPORTED_ROWS} more'
+        raise DataParserError(f'{len(invalid)} dates in {values.name} match none of {date_formats}: {rows}')
+    dates = pd.Series(parsed, index=values.index, name=values.name)
+    return dates, sorted(used, key=used.__getitem__, reverse=True)
+
+
+def parse_dataframe_dates(
+    data: pd.DataFrame,
+    col: str,
+    date_formats: List[str],
+    source: str | None = None,
+    format_cache: DateFormatCache | None = None
+) -> pd.DataFrame:
     """
     Parse pandas dataframe column to datetime format.
 
+    The formats may be mixed within the column. The formats that matched the dates of a source
+    are cached and tried first the next time the source is parsed.
+
     Parameters:
         data (pd.DataFrame): Data with column to be converted
         col (str): Date column name
         date_formats (List[str]): List of formats to try to match the date
+        source (str | None): Source of the data, the key of the format cache
+        format_cache (DateFormatCache | None): Cache of the formats matching each source
     
     Returns:
         pd.DataFrame: Data with converted date columns
     
     Raises:
-        DataParserError: If none of the date formats match the specified column's date format
+        DataParserError: If some dates do not match any of the date formats, listing them
     """
-    data = data.copy()
-    for date_format in date_formats:
-        try:
-            data[col] = pd.to_datetime(data[col], format=date_format)
-            return data
-        except ValueError:
-            pass
-    raise DataParserError(f'None of {date_formats} match {col} date format')
+    cached = format_cache.get(source) if format_cache is not None and source is not None else []
+    ordered = [fmt for fmt in cached if fmt in date_formats]
+    ordered += [fmt for fmt in date_formats if fmt not in ordered]
+    dates, used = parse_dates(data[col], ordered)
+    if format_cache is not None and source is not None and used:
+        format_cache.update(source, used)
+    return data.assign(**{col: dates})
@@ -1,12 +1,47 @@
 """Download strategies"""
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date, timedelta
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Dict, Tuple
+from sqlalchemy import text
 from etl.downloader import Downloader
+from etl.manifest import Manifest
+
+
+logger = logging.getLogger(__name__)
 
 
 class DownloadStrategy(ABC):
     """
     Abstract base class defining a download strategy interface.
+
+    Attributes:
+        manifest (Manifest | None): Manifest of the downloads, checked instead of the files
     """
+    def __init__(self, manifest: Manifest | None = None) -> None:
+        self.manifest = manifest
+
+    def is_downloaded(self, obj: Downloader) -> bool:
+        """
+        Determine whether the object was downloaded before.
+
+        With a manifest this is one lookup of the object key. Objects missing from the manifest,
+        e.g. downloaded before it was introduced, and strategies without a manifest fall back
+        to the existence of the object file.
+
+        Args:
+            obj (Downloader): The object representing the downloader
+
+        Returns:
+            bool: True if the object was downloaded, False otherwise
+        """
+        if self.manifest is not None and self.manifest.get(obj.key) is not None:
+            return True
+        return obj.file.exists()
+
     @abstractmethod
     def is_download_required(self, obj: Downloader) -> bool:
         """
@@ -19,12 +54,28 @@ class DownloadStrategy(ABC):
             bool: True if download is required, False otherwise
         """
 
+    def is_load_required(  # pylint: disable=unused-argument
+        self, obj: Downloader, content: bytes | None, digest: str | None = None
+    ) -> bool:
+        """
+        Determine whether the downloaded content has to be transformed and loaded.
+
+        Args:
+            obj (Downloader): The object representing the downloader
+            content (bytes | None): Downloaded content, None if it was streamed to the object file
+            digest (str | None): SHA-256 hex digest of the content, if already computed
+
+        Returns:
+            bool: True if the content has to be processed, False otherwise
+        """
+        return True
+
 
 class AppendStrategy(DownloadStrategy):
     """
     Download strategy for appending data.
 
-    This strategy checks if the file already exists and returns True if it needs to be downloaded.
+    This strategy checks if the object was already downloaded and returns True if it needs to be downloaded.
     """
     def is_download_required(self, obj: Downloader) -> bool:
         """
@@ -34,10 +85,9 @@ class AppendStrategy(DownloadStrategy):
             obj (Downloader): The object representing the downloader
 
         Returns:
-            bool: False if file exists, otherwise True
+            bool: False if the object was downloaded, otherwise True
         """
-        print(obj.file.exists())
-        return not obj.file.exists()
+        return not self.is_downloaded(obj)
 
 
 class ReplaceStrategy(DownloadStrategy):
@@ -63,8 +113,8 @@ class ReplaceOnMetaFlagStrategy(DownloadStrategy):
     """
     Download strategy for replacing data based on metadata flag.
 
-    This strategy checks if the 'replace' flag in download object metadata is True 
-    or if the file doesn't exist.
+    This strategy checks if the 'replace' flag in download object metadata is True
+    or if the object was not downloaded.
     """
     def is_download_required(self, obj: Downloader) -> bool:
         """
@@ -74,6 +124,255 @@ class ReplaceOnMetaFlagStrategy(DownloadStrategy):
             obj (Downloader): The object representing the downloader
 
         Returns:
-            bool: True if 'replace' flag in metadata is True or file does not exist, False otherwise
+            bool: True if 'replace' flag in metadata is True or the object was not downloaded, False otherwise
+        """
+        return obj.meta.get('replace', False) or not self.is_downloaded(obj)
+
+
+class ContentHashStrategy(DownloadStrategy):
+    """
+    Download strategy skipping the processing of content that has not changed.
+
+    The download decision is delegated to the wrapped strategy. After the download, the content
+    hash is compared with the hash committed after the last load of the object, taken from the
+    manifest if set, otherwise from the object state. Identical content does not need to be saved,
+    transformed or loaded again.
+
+    With a fingerprint of the transformation (see `etl.fingerprint.fingerprint`), the compared
+    hash covers the content and the fingerprint, so unchanged content is loaded again once the
+    parser, the pipelines or their code change. Hashes committed without a fingerprint never
+    match hashes with one, so adding a fingerprint reloads every object once.
+
+    Attributes:
+        strategy (DownloadStrategy): Strategy deciding whether the download is required.
+        manifest (Manifest | None): Manifest of the loads
+        fingerprint (str | Callable[[Downloader], str] | None): Fingerprint of the transformation,
+            or a function returning the fingerprint of an object's transformation
+        force (bool): Whether the content is loaded even if it has not changed, the new hash
+            is still committed
+    """
+    def __init__(
+        self,
+        strategy: DownloadStrategy,
+        manifest: Manifest | None = None,
+        fingerprint: str | Callable[[Downloader], str] | None = None,
+        force: bool = False
+    ) -> None:
+        super().__init__(manifest)
+        self.strategy = strategy
+        self.fingerprint = fingerprint
+        self.force = force
+
+    def is_download_required(self, obj: Downloader) -> bool:
+        """
+        Determines whether a download is required using the wrapped strategy.
+
+        Args:
+            obj (Downloader): The object representing the downloader
+
+        Returns:
+            bool: Decision of the wrapped strategy
+        """
+        return self.strategy.is_download_required(obj)
+
+    def load_digest(self, obj: Downloader, digest: str) -> str:
+        """
+        Combine the content hash with the fingerprint of the object's transformation.
+
+        Args:
+            obj (Downloader): The object representing the downloader
+            digest (str): Hash of the content
+
+        Returns:
+            str: Hash of the content and the fingerprint, the content hash without a fingerprint
+        """
+        fingerprint = self.fingerprint(obj) if callable(self.fingerprint) else self.fingerprint
+        if not fingerprint:
+            return digest
+        return hashlib.sha256(f'{digest}:{fingerprint}'.encode()).hexdigest()
+
+    def is_load_required(self, obj: Downloader, content: bytes | None, digest: str | None = None) -> bool:
+        """
+        Determines whether the content or the transformation changed since the last load.
+
+        The new hash is staged in the object state and persisted once the object is committed.
+
+        Args:
+            obj (Downloader): The object representing the downloader
+            content (bytes | None): Downloaded content, None if it was streamed to the object file
+            digest (str | None): SHA-256 hex digest of the content, computed from the content or
+                the object file if not given
+
+        Returns:
+            bool: False if the hash matches the last loaded one, the object was downloaded and
+                the load is not forced, otherwise True
+        """
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in obj.file.read_chunks() if content is None else [content]:
+                sha256.update(chunk)
+            digest = sha256.hexdigest()
+        load_digest = self.load_digest(obj, digest)
+        entry = self.manifest.get(obj.key) if self.manifest is not None else None
+        if entry is not None:
+            unchanged = entry.loaded_sha256 == load_digest
+        else:
+            unchanged = obj.file.exists() and obj.state.get('sha256') == load_digest
+        obj.update_state(sha256=load_digest)
+        if unchanged and not self.force:
+            logger.info('UNCHANGED: %s', obj)
+            return False
+        return self.strategy.is_load_required(obj, content, digest)
+
+
+@dataclass(frozen=True)
+class SeasonWindow:
+    """
+    Part of the year in which the matches of a league season are played.
+
+    A window ending before it starts spans two years, e.g. August to May for the '2023/2024'
+    season, otherwise it lies within the first year of the season.
+
+    Attributes:
+        start (Tuple[int, int]): Month and day of the first matches
+        end (Tuple[int, int]): Month and day of the last matches
+    """
+    start: Tuple[int, int] = (8, 1)
+    end: Tuple[int, int] = (6, 10)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, str]) -> 'SeasonWindow':
+        """
+        Create a window from 'MM-DD' strings.
+
+        Parameters:
+            config (Dict[str, str]): 'start' and 'end' of the window
+
+        Returns:
+            SeasonWindow: Season window
+        """
+        start_month, start_day = map(int, config['start'].split('-'))
+        end_month, end_day = map(int, config['end'].split('-'))
+        return cls((start_month, start_day), (end_month, end_day))
+
+    def dates(self, season: str) -> Tuple[date, date]:
+        """
+        Get the first and last possible match date of a season.
+
+        Parameters:
+            season (str): Season, e.g. '2023/2024' or '2023'
+
+        Returns:
+            Tuple[date, date]: Start and end of the season
+        """
+        first_year = int(season.split('/')[0])
+        end_year = first_year + 1 if self.end < self.start else first_year
+        return date(first_year, *self.start), date(end_year, *self.end)
+
+
+class SeasonRefreshStrategy(DownloadStrategy):
+    """
+    Download strategy refreshing only the league seasons that could hold new matches.
+
+    Objects carry their league and season in the metadata ('league', 'season'). The latest match
+    date of every league season in the database is compared with the calendar and the season
+    window of the league:
+        - seasons that have not started yet are skipped, their files do not exist
+        - seasons missing from the database are downloaded
+        - seasons within their window, extended by the grace period for postponed matches and
+          late corrections, are downloaded while new matches are plausible, i.e. until the
+          latest stored match reaches the end of the window
+        - the current season of a league outside of its window is downloaded once its last
+          download is older than the TTL, as a safety net for misconfigured windows
+        - past seasons are not downloaded again
+
+    The time of the last download is taken from the manifest. Without a manifest the TTL is
+    considered expired.
+
+    Attributes:
+        latest (Dict[Tuple[str, str], date]): Latest match date by league and season
+        windows (Dict[str, SeasonWindow]): Season windows by league
+        default_window (SeasonWindow): Season window of the other leagues
+        grace (timedelta): Period after the end of the window with plausible new matches
+        ttl (timedelta): Maximum age of the current season outside of its window
+        today (date): Date the decisions are made for
+        manifest (Manifest | None): Manifest of the downloads
+    """
+    def __init__(
+        self,
+        latest: Dict[Tuple[str, str], date],
+        windows: Dict[str, SeasonWindow] | None = None,
+        default_window: SeasonWindow = SeasonWindow(),
+        grace: timedelta = timedelta(days=14),
+        ttl: timedelta = timedelta(days=7),
+        today: date | None = None,
+        manifest: Manifest | None = None
+    ) -> None:
+        super().__init__(manifest)
+        self.latest = latest
+        self.windows = windows or {}
+        self.default_window = default_window
+        self.grace = grace
+        self.ttl = ttl
+        self.today = today or date.today()
+
+    @staticmethod
+    def query_latest(
+        session: Any, schema: str, table: str, date_column: str = 'match_date'
+    ) -> Dict[Tuple[str, str], date]:
+        """
+        Query the latest match date of every league season of a table.
+
+        Parameters:
+            session (Any): Database session
+            schema (str): Schema of the table
+            table (str): Table with 'league' and 'season' columns
+            date_column (str): Match date column
+
+        Returns:
+            Dict[Tuple[str, str], date]: Latest match date by league and season
+        """
+        result = session.execute(text(
+            f'SELECT league, season, MAX({date_column}) FROM {schema}.{table} GROUP BY league, season'
+        ))
+        return {(league, season): latest for league, season, latest in result}
+
+    def _expired(self, obj: Downloader) -> bool:
+        """
+        Determine whether the last download of the object is older than the TTL.
+
+        Args:
+            obj (Downloader): The object representing the downloader
+
+        Returns:
+            bool: True if the TTL expired or the download time is unknown, False otherwise
+        """
+        entry = self.manifest.get(obj.key) if self.manifest is not None else None
+        if entry is None or entry.fetched_at is None:
+            return True
+        return time.time() - entry.fetched_at > self.ttl.total_seconds()
+
+    def is_download_required(self, obj: Downloader) -> bool:
+        """
+        Determines whether the league season of the object could hold new matches.
+
+        Args:
+            obj (Downloader): The object representing the downloader
+
+        Returns:
+            bool: True if the season could hold new matches or is missing from the database,
+                False otherwise
         """
-        return not obj.file.exists() or obj.meta.get('replace', False)
\ No newline at end of file
+        league, season = obj.meta['league'], obj.meta['season']
+        window = self.windows.get(league, self.default_window)
+        start, end = window.dates(season)
+        if self.today < start:
+            return False
+        latest = self.latest.get((league, season))
+        if latest is None:
+            return True
+        if self.today <= end + self.grace:
+            return latest < end
+        if self.today < date(start.year + 1, *window.start):
+            return self._expired(obj)
+        return False
@@ -1,15 +1,36 @@
 """Downloader Objects"""
 from abc import ABC, abstractmethod
+import json
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
+from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from etl.exceptions import ContentNotModified
 from etl.files import File
 
 logger = logging.getLogger(__name__)
 
 
+def create_session(pool_size: int = 10) -> requests.Session:
+    """
+    Create a requests session with a connection pool that can be shared between threads.
+
+    Parameters:
+        pool_size (int): Maximum number of pooled connections per host (default is 10)
+
+    Returns:
+        requests.Session: Session with the pooled adapter mounted.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 class Downloader(ABC):
     """
     Abstract base class defining a downloader interface.
@@ -19,12 +40,61 @@ class Downloader(ABC):
         table (str | None): The db table name (optional, can be None if data won't be loaded into db).
         schema (str | None): The db schema name (optional, can be None if data won't be loaded into db).
         meta (Dict | None): Metadata used for storing additional info about the object.
+        content (Any): Extracted content handed over from extraction to transformation.
     """
+    STATE_SUFFIX = '.state.json'
+
     def __init__(self, file: File, table: str | None, schema: str | None, meta: Dict | None) -> None:
         self.file = file
         self.table = table
         self.schema = schema
         self.meta = meta or {}
+        self.content: Any = None
+        self._state: Dict[str, Any] | None = None
+        self._pending_state: Dict[str, Any] = {}
+
+    @property
+    def key(self) -> str:
+        """
+        Returns the identifier of the downloaded resource, e.g. in the download manifest.
+
+        Returns:
+            str: Path of the object file.
+        """
+        return str(self.file.path)
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """
+        State committed after the last successful load, stored in a sidecar next to the file.
+
+        Returns:
+            Dict[str, Any]: Committed state.
+        """
+        if self._state is None:
+            sidecar = self.file.sidecar(self.STATE_SUFFIX)
+            self._state = json.loads(bytes(sidecar.read())) if sidecar.exists() else {}
+        return self._state
+
+    def update_state(self, **kwargs: Any) -> None:
+        """
+        Stage state values to be persisted on the next commit.
+
+        Parameters:
+            **kwargs (Any): State values to update.
+        """
+        self._pending_state.update(kwargs)
+
+    def commit(self) -> None:
+        """
+        Persist the staged state. Should be called only once the data is loaded.
+        """
+        if not self._pending_state:
+            return
+        state = {**self.state, **self._pending_state}
+        self.file.sidecar(self.STATE_SUFFIX).save(json.dumps(state).encode())
+        self._state = state
+        self._pending_state = {}
 
     @abstractmethod
     def download(self, session: Any | None = None) -> Any:
@@ -38,6 +108,21 @@ class Downloader(ABC):
             Any: Content retrieved from the download.
         """
 
+    def download_stream(self, session: Any | None = None, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        Download data as a stream of chunks. Downloads everything at once by default and
+        yields slices of the content, at least one chunk even if empty.
+
+        Parameters:
+            session (Any | None): Optional session to use for the download.
+            chunk_size (int): Maximum size of a chunk in bytes (default is 65536).
+
+        Returns:
+            Iterator[bytes]: Chunks of the content retrieved from the download.
+        """
+        content = self.download(session)
+        return (content[start:start + chunk_size] for start in range(0, max(len(content), 1), chunk_size))
+
 
 class APIDownloader(Downloader):
     """
@@ -77,6 +162,26 @@ class APIDownloader(Downloader):
         return f'APIDownloader(file={self.file}, method={self.method}, ' \
             f'url={self.url}, db={self.schema}/{self.table})'
 
+    @property
+    def key(self) -> str:
+        """
+        Returns the identifier of the downloaded resource.
+
+        Returns:
+            str: URL of the resource.
+        """
+        return self.url
+
+    @property
+    def host(self) -> str:
+        """
+        Returns the host the object downloads from.
+
+        Returns:
+            str: Network location of the URL.
+        """
+        return urlparse(self.url).netloc
+
     def __str__(self) -> str:
         """
         Returns a string representation of the object.
@@ -87,21 +192,100 @@ class APIDownloader(Downloader):
         db_str = f'@{self.schema}/{self.table}' if self.table is not None else ''
         return f'APIDownloader {self.url}{db_str}'
 
-    def download(self, session: requests.Session | None = None) -> bytes:
+    def _conditional_headers(self) -> Dict[str, str]:
         """
-        Download data from the specified URL using the provided method and options.
+        Build the conditional request headers from the validators of the last committed download.
+
+        Returns:
+            Dict[str, str]: If-None-Match and If-Modified-Since headers, if available.
+        """
+        if not self.file.exists():
+            return {}
+        headers = {}
+        if self.state.get('etag'):
+            headers['If-None-Match'] = self.state['etag']
+        if self.state.get('last_modified'):
+            headers['If-Modified-Since'] = self.state['last_modified']
+        return headers
+
+    def _request(self, session: requests.Session | None = None, **kwargs: Any) -> requests.Response:
+        """
+        Send the request and stage the validators of a successful response.
 
         Parameters:
             session (requests.Session | None): Optional requests session to use for the download.
+            **kwargs (Any): Additional keyword arguments for the request.
 
         Returns:
-            bytes: Content retrieved from the download.
+            requests.Response: Successful response.
 
         Raises:
             requests.HTTPError: If the response status code is not a success code.
+            ContentNotModified: If the source reports that the content did not change.
         """
         logger.info('DOWNLOADING: %s', self)
         session = session or requests.Session()
-        response = session.request(self.method, self.url, **self.download_kwargs)
+        download_kwargs = {**self.download_kwargs, **kwargs}
+        conditional_headers = self._conditional_headers()
+        if conditional_headers:
+            download_kwargs['headers'] = {**download_kwargs.get('headers', {}), **conditional_headers}
+        response = session.request(self.method, self.url, **download_kwargs)
         response.raise_for_status()
-        return response.content
+        if response.status_code == 304:
+            logger.info('NOT MODIFIED: %s', self)
+            response.close()
+            raise ContentNotModified(f'{self} not modified')
+        self.update_state(
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            content_length=response.headers.get('Content-Length')
+        )
+        return response
+
+    def download(self, session: requests.Session | None = None) -> bytes:
+        """
+        Download data from the specified URL using the provided method and options.
+
+        The request is conditional if validators (ETag, Last-Modified) of a previous download
+        were committed and the file still exists.
+
+        Parameters:
+            session (requests.Session | None): Optional requests session to use for the download.
+
+        Returns:
+            bytes: Content retrieved from the download.
+
+        Raises:
+            requests.HTTPError: If the response status code is not a success code.
+            ContentNotModified: If the source reports that the content did not change.
+        """
+        return self._request(session).content
+
+    def download_stream(
+        self, session: requests.Session | None = None, chunk_size: int = 65536
+    ) -> Iterator[bytes]:
+        """
+        Download data from the specified URL as a stream of chunks.
+
+        The request is sent and checked before returning, the body is read while iterating.
+        Gzip and deflate content encodings are decompressed on the fly, so at most one
+        decompressed chunk is held in memory.
+
+        Parameters:
+            session (requests.Session | None): Optional requests session to use for the download.
+            chunk_size (int): Maximum size of a chunk in bytes (default is 65536).
+
+        Returns:
+            Iterator[bytes]: Chunks of the content retrieved from the download.
+
+        Raises:
+            requests.HTTPError: If the response status code is not a success code.
+            ContentNotModified: If the source reports that the content did not change.
+        """
+        response = self._request(session, stream=True)
+
+        def iter_chunks() -> Iterator[bytes]:
+            with response:
+                yield from response.iter_content(chunk_size=chunk_size)
+
+        return iter_chunks()
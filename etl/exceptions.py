@@ -6,3 +6,7 @@ class InvalidDataException(Exception):
 
 class DataParserError(Exception):
     """Raised when could not parse data"""
+
+
+class ContentNotModified(Exception):
+    """Raised when the source reports that the content has not changed since the last download"""
@@ -1,75 +1,280 @@
 """Custom File Managers"""
+from contextlib import contextmanager, nullcontext
+import gzip
+import mmap
+import os
 from pathlib import Path
 import logging
+import tempfile
+from typing import IO, Any, BinaryIO, Iterable, Iterator, cast
+
+import zstandard
 
 logger = logging.getLogger(__name__)
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _get_umask() -> int:
+    """
+    Get the file mode creation mask of the process.
+
+    Called once on import, as reading the mask requires setting it, which is not thread-safe.
+
+    Returns:
+        int: Mask of the permission bits removed from new files.
+    """
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _get_umask()
+
+
+@contextmanager
+def _compressed_writer(handle: IO[bytes], compression: str) -> Iterator[BinaryIO]:
+    """
+    Wrap a binary file handle with a stream compressing the data written to it.
+
+    Parameters:
+        handle (IO[bytes]): Handle of the compressed file.
+        compression (str): Compression, 'gzip' or 'zstd'.
+
+    Yields:
+        BinaryIO: Stream to write the uncompressed data to.
+    """
+    if compression == 'gzip':
+        with gzip.GzipFile(fileobj=handle, mode='wb', mtime=0) as writer:
+            yield cast(BinaryIO, writer)
+    else:
+        with zstandard.ZstdCompressor().stream_writer(handle, closefd=False) as writer:
+            yield writer
+
+
+def _decompressed_reader(handle: IO[bytes], compression: str) -> BinaryIO:
+    """
+    Wrap a binary file handle with a stream decompressing the data read from it.
+
+    Parameters:
+        handle (IO[bytes]): Handle of the compressed file.
+        compression (str): Compression, 'gzip' or 'zstd'.
+
+    Returns:
+        BinaryIO: Stream of the uncompressed data.
+    """
+    if compression == 'gzip':
+        return cast(BinaryIO, gzip.GzipFile(fileobj=handle, mode='rb'))
+    return zstandard.ZstdDecompressor().stream_reader(handle, closefd=False)
 
 
 class File:
     """
     Class for managing files.
 
+    Files can be stored compressed with gzip or zstd, chosen by the '.gz' or '.zst' extension
+    of the path or by the compression option, which appends the extension to the path.
+    The content is compressed on save and decompressed on read, so the data handled by
+    the methods is always uncompressed. A compressed file falls back to the uncompressed file
+    without the extension if only that exists, e.g. when it was saved before compression
+    was enabled; it is removed once the compressed file is saved.
+
     Attributes:
-        path (Path): The path to the file.
+        path (Path): The path to the file, including the compression extension.
+        compression (str | None): Compression of the stored file, 'gzip', 'zstd' or None.
     """
 
-    def __init__(self, path: str | Path) -> None:
+    def __init__(self, path: str | Path, compression: str | None = None) -> None:
         """
         Initialize class.
 
         Parameters:
             path (str | Path): File path.
+            compression (str | None): Compression, 'gzip' or 'zstd' (default is None, inferred
+                from the path extension).
 
         Returns:
             None
+
+        Raises:
+            ValueError: If the compression is unknown or does not match the path extension.
+        """
+        path = Path(path)
+        inferred = next((name for name, suffix in COMPRESSION_SUFFIXES.items() if path.suffix == suffix), None)
+        if compression is not None and compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f'Unknown compression {compression}, expected one of {list(COMPRESSION_SUFFIXES)}')
+        if compression is not None and inferred not in (None, compression):
+            raise ValueError(f'Compression {compression} does not match the extension of {path}')
+        if compression is not None and inferred is None:
+            path = path.with_name(path.name + COMPRESSION_SUFFIXES[compression])
+        self.path = path
+        self.compression = compression or inferred
+
+    @property
+    def uncompressed_path(self) -> Path:
+        """
+        Path of the file without the compression extension.
+
+        Returns:
+            Path: Path without the extension, the path itself if the file is not compressed.
+        """
+        return self.path.with_suffix('') if self.compression else self.path
+
+    def _stored(self) -> tuple[Path, str | None]:
+        """
+        Get the path and compression of the stored file, falling back to the uncompressed file.
+
+        Returns:
+            tuple[Path, str | None]: Path and compression of the file to read.
+        """
+        if self.compression and not self.path.is_file() and self.uncompressed_path.is_file():
+            return self.uncompressed_path, None
+        return self.path, self.compression
+
+    def sidecar(self, suffix: str) -> 'File':
+        """
+        Get a file stored next to this file, used for keeping its metadata.
+        The sidecar name does not depend on the compression of the file.
+
+        Parameters:
+            suffix (str): Suffix appended to the file name.
+
+        Returns:
+            File: Sidecar file object.
         """
-        self.path = Path(path)
+        return File(self.path.with_name(self.uncompressed_path.name + suffix))
 
     def exists(self) -> bool:
         """
-        Check if file exists.
+        Check if file exists, compressed or not.
 
         Returns:
             bool: Whether file exists.
         """
-        return self.path.is_file()
+        return self._stored()[0].is_file()
 
-    def read(self, mode: str = 'rb', encoding: str | None = None) -> bytes:
+    def read(
+        self, mode: str = 'rb', encoding: str | None = None, memory_map: bool = False
+    ) -> bytes | mmap.mmap:
         """
         Read file. Currently only mode that reads bytes is supported.
 
         Parameters:
             mode (str): File open mode ('r', 'rb', 'r+', etc.).
+            memory_map (bool): Return a read-only memory map of the file instead of
+                copying its content into memory, ignored for compressed files (default is False).
 
         Returns:
-            content(bytes | str): Content read from the file.
+            content(bytes | mmap.mmap): Content read from the file.
 
         Raises:
             NotImplementedError: If the mode is unsupported.
             FileNotFoundError: If the file does not exist.
             IOError: If an error occurs while reading the file.
         """
-        logger.info('Reading data from file %s.', self.path)
+        path, compression = self._stored()
+        logger.info('Reading data from file %s.', path)
         if mode != 'rb':
             raise NotImplementedError('Currently only mode that reads bytes is supported.')
         try:
-            with open(self.path, mode, encoding=encoding) as f:
-                content = f.read()
+            with open(path, mode, encoding=encoding) as f:
+                if compression:
+                    with _decompressed_reader(f, compression) as reader:
+                        return reader.read()
+                if not memory_map:
+                    return f.read()
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b''
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
         except FileNotFoundError:
-            logger.error('File %s not found.', self.path)
+            logger.error('File %s not found.', path)
             raise
         except IOError as exc:
-            logger.error('Error reading file %s: %s', self.path, exc)
+            logger.error('Error reading file %s: %s', path, exc)
+            raise
+
+    def read_chunks(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        Read file in fixed-size chunks, decompressed while reading.
+
+        Parameters:
+            chunk_size (int): Maximum size of a chunk in bytes (default is 65536).
+
+        Yields:
+            bytes: Consecutive chunks of the file content.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            IOError: If an error occurs while reading the file.
+        """
+        path, compression = self._stored()
+        try:
+            with open(path, 'rb') as f, \
+                    _decompressed_reader(f, compression) if compression else nullcontext(f) as reader:
+                while chunk := reader.read(chunk_size):
+                    yield chunk
+        except IOError as exc:
+            logger.error('Error reading file %s: %s', path, exc)
             raise
-        return content
+
+    @contextmanager
+    def _atomic_open(self, mode: str, encoding: str | None = None) -> Iterator[IO]:
+        """
+        Open a temporary file that replaces the file only once it is completely written
+        and flushed to disk. The temporary file is removed if writing fails. Data written
+        to a compressed file is compressed while writing. The file keeps the permissions of
+        the file it replaces, new files get the default permissions of the umask.
+
+        Parameters:
+            mode (str): File open mode ('w', 'wb', etc.).
+            encoding (str | None): Text encoding.
+
+        Yields:
+            IO: Handle of the temporary file.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=f'.{self.path.name}.', suffix='.tmp')
+        try:
+            if os.name == 'posix':
+                # mkstemp creates the file readable by the owner only, keep the mode a plain open() gives
+                try:
+                    file_mode = os.stat(self.path).st_mode & 0o7777
+                except FileNotFoundError:
+                    file_mode = 0o666 & ~_UMASK
+                os.fchmod(fd, file_mode)
+            if self.compression:
+                with open(fd, 'wb') as f:
+                    with _compressed_writer(f, self.compression) as writer:
+                        yield writer
+                    f.flush()
+                    os.fsync(f.fileno())
+            else:
+                with open(fd, mode, encoding=encoding) as f:
+                    yield f
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        if self.compression:
+            self.uncompressed_path.unlink(missing_ok=True)
+        if os.name == 'posix':
+            dir_fd = os.open(self.path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
 
     def save(self, content: bytes | str, mode: str = 'wb', encoding: str | None = None) -> None:
         """
-        Save data to a file.
+        Save data to a file atomically: the file either keeps its previous content
+        or contains the complete new content.
 
         Parameters:
             content (bytes | str): Data to be written to the file.
-            mode (str): File open mode ('w', 'wb', 'w+', etc.).
+            mode (str): File open mode ('w', 'wb', 'w+', etc.), compressed files are always
+                written in binary mode.
+            encoding (str | None): Text encoding.
 
         Returns:
             None
@@ -77,11 +282,41 @@ class File:
         Raises:
             IOError: If an error occurs while writing to the file.
         """
-        self.path.parent.mkdir(parents=True, exist_ok=True)
         logger.info('Saving data to file %s.', self.path)
+        if self.compression and isinstance(content, str):
+            content = content.encode(encoding or 'utf-8')
         try:
-            with open(self.path, mode, encoding=encoding) as f:
+            with self._atomic_open(mode, encoding=encoding) as f:
                 f.write(content)
         except IOError as exc:
             logger.error('Error writing to file %s: %s', self.path, exc)
             raise
+
+    def save_stream(self, chunks: Iterable[bytes], digest: Any | None = None) -> int:
+        """
+        Save a stream of byte chunks to a file atomically, holding only one chunk in memory.
+
+        Parameters:
+            chunks (Iterable[bytes]): Chunks of data to be written to the file.
+            digest (Any | None): Hash object (e.g. hashlib.sha256()) updated with the chunks
+                while they are written, saving a second pass over the file.
+
+        Returns:
+            int: Number of bytes written.
+
+        Raises:
+            IOError: If an error occurs while writing to the file.
+        """
+        logger.info('Streaming data to file %s.', self.path)
+        size = 0
+        try:
+            with self._atomic_open('wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+                    size += len(chunk)
+        except IOError as exc:
+            logger.error('Error writing to file %s: %s', self.path, exc)
+            raise
+        return size
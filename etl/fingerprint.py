@@ -0,0 +1,74 @@
+"""Stable fingerprints of the objects configuring data processing"""
+from functools import lru_cache
+import hashlib
+import inspect
+from pathlib import Path
+import sys
+from typing import Any
+
+
+@lru_cache(maxsize=None)
+def _module_digest(module: str) -> str:
+    """
+    Get the digest of the source file of a module, or the version of its package if the
+    module has no source file.
+
+    Parameters:
+        module (str): Module name
+
+    Returns:
+        str: Digest of the module code
+    """
+    loaded = sys.modules.get(module)
+    path = getattr(loaded, '__file__', None)
+    if path and Path(path).is_file():
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()[:16]
+    package = sys.modules.get(module.split('.', 1)[0])
+    return str(getattr(package, '__version__', ''))
+
+
+def describe(value: Any) -> str:
+    """
+    Describe a value with a string that is the same in every process and run.
+
+    Functions and classes are described by their qualified name and the code of their module,
+    so the description changes with the code. Objects with a `fingerprint` method are described
+    by it, other objects by their class and public attributes (their repr if they have none).
+
+    Parameters:
+        value (Any): Value to describe
+
+    Returns:
+        str: Description of the value
+    """
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes, Path)):
+        return repr(value)
+    if isinstance(value, dict):
+        items = sorted(f'{describe(key)}: {describe(item)}' for key, item in value.items())
+        return '{' + ', '.join(items) + '}'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ', '.join(sorted(describe(item) for item in value)) + '}'
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__ + '(' + ', '.join(describe(item) for item in value) + ')'
+    if inspect.isroutine(value) or inspect.isclass(value):
+        module = getattr(value, '__module__', None) or getattr(getattr(value, '__objclass__', None), '__module__', '')
+        return f"{module}.{getattr(value, '__qualname__', repr(value))}@{_module_digest(module)}"
+    method = getattr(value, 'fingerprint', None)
+    if callable(method):
+        return f'{type(value).__qualname__}({method()})'
+    public = {name: item for name, item in vars(value).items() if not name.startswith('_')} \
+        if hasattr(value, '__dict__') else repr(value)
+    return f'{describe(type(value))}({describe(public)})'
+
+
+def fingerprint(*values: Any) -> str:
+    """
+    Get a stable fingerprint of values.
+
+    Parameters:
+        *values (Any): Values to fingerprint
+
+    Returns:
+        str: Hex digest of the description of the values
+    """
+    return hashlib.sha256(describe(values).encode()).hexdigest()
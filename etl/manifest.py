@@ -0,0 +1,351 @@
+"""Persistent manifest of the downloaded and loaded resources"""
+from dataclasses import dataclass
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+import uuid
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    path TEXT,
+    fetched_at REAL,
+    sha256 TEXT,
+    size INTEGER,
+    loaded_at REAL,
+    loaded_sha256 TEXT,
+    rows INTEGER
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    event TEXT NOT NULL,
+    at REAL NOT NULL,
+    sha256 TEXT,
+    size INTEGER,
+    rows INTEGER
+);
+CREATE TABLE IF NOT EXISTS missing (
+    key TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    checked_at REAL NOT NULL,
+    misses INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    at REAL NOT NULL,
+    PRIMARY KEY (run_id, key)
+);
+CREATE INDEX IF NOT EXISTS events_key ON events (key, at);
+CREATE INDEX IF NOT EXISTS events_run ON events (run_id);
+"""
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    """
+    Latest download and load of a resource.
+
+    Attributes:
+        key (str): Resource identifier, e.g. the URL
+        path (str | None): Path of the archived file
+        fetched_at (float | None): Unix timestamp of the last download
+        sha256 (str | None): Hash of the last downloaded content
+        size (int | None): Size of the last downloaded content in bytes
+        loaded_at (float | None): Unix timestamp of the last committed load
+        loaded_sha256 (str | None): Hash of the content of the last committed load
+        rows (int | None): Number of rows of the last committed load
+    """
+    key: str
+    path: str | None = None
+    fetched_at: float | None = None
+    sha256: str | None = None
+    size: int | None = None
+    loaded_at: float | None = None
+    loaded_sha256: str | None = None
+    rows: int | None = None
+
+
+@dataclass(frozen=True)
+class MissingEntry:
+    """
+    Resource the source reported as missing.
+
+    Attributes:
+        key (str): Resource identifier, e.g. the URL
+        status (int): HTTP status of the last check, e.g. 404
+        first_seen (float): Unix timestamp of the first check reporting the resource missing
+        checked_at (float): Unix timestamp of the last check
+        misses (int): Number of consecutive checks reporting the resource missing
+    """
+    key: str
+    status: int
+    first_seen: float
+    checked_at: float
+    misses: int
+
+    def expires_at(self, ttl: float, max_ttl: float) -> float:
+        """
+        Get the time the resource has to be checked again. The TTL doubles with every
+        consecutive miss, so resources that never appear are checked less and less often.
+
+        Parameters:
+            ttl (float): TTL after the first miss in seconds
+            max_ttl (float): Maximum TTL in seconds
+
+        Returns:
+            float: Unix timestamp of the expiry
+        """
+        return self.checked_at + min(ttl * 2 ** (self.misses - 1), max_ttl)
+
+
+class Manifest:
+    """
+    Manifest of the downloaded and loaded resources stored in an SQLite database.
+
+    Every resource has one entry with its latest download and load, looked up by its primary
+    key. Every download and load is also appended to the event history of the run that
+    recorded it. Resources the source reported as missing are kept in a negative cache until
+    they are downloaded. The checkpoints of a run record the processing status of every
+    resource in the order the resources were processed, so a restarted run with the same run
+    identifier can skip the finished ones. Updates are transactional and the manifest can be
+    shared by threads.
+
+    Attributes:
+        path (Path): Database file
+        run_id (str): Identifier of the run recording the events
+    """
+
+    def __init__(self, path: str | Path, run_id: str | None = None) -> None:
+        self.path = Path(path)
+        self.run_id = run_id or f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def _execute(self, statements: Iterable[Tuple[str, Tuple[Any, ...]]]) -> None:
+        """
+        Execute statements in one transaction.
+
+        Parameters:
+            statements (Iterable[Tuple[str, Tuple[Any, ...]]]): SQL statements and their parameters
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                for sql, parameters in statements:
+                    self._connection.execute(sql, parameters)
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+
+    def _query(self, sql: str, parameters: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+        """
+        Run a query.
+
+        Parameters:
+            sql (str): SQL query
+            parameters (Tuple[Any, ...]): Query parameters
+
+        Returns:
+            List[Dict[str, Any]]: Rows by column name
+        """
+        with self._lock:
+            cursor = self._connection.execute(sql, parameters)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get(self, key: str) -> ManifestEntry | None:
+        """
+        Get the entry of a resource.
+
+        Parameters:
+            key (str): Resource identifier
+
+        Returns:
+            ManifestEntry | None: Entry, None if the resource was never downloaded
+        """
+        rows = self._query('SELECT * FROM entries WHERE key = ?', (key,))
+        return ManifestEntry(**rows[0]) if rows else None
+
+    def record_download(self, key: str, path: str | Path, sha256: str, size: int) -> None:
+        """
+        Record a download of a resource.
+
+        Parameters:
+            key (str): Resource identifier
+            path (str | Path): Path of the archived file
+            sha256 (str): Hash of the downloaded content
+            size (int): Size of the downloaded content in bytes
+        """
+        now = time.time()
+        self._execute([
+            (
+                'INSERT INTO entries (key, path, fetched_at, sha256, size) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET path = excluded.path, fetched_at = excluded.fetched_at, '
+                'sha256 = excluded.sha256, size = excluded.size',
+                (key, str(path), now, sha256, size)
+            ),
+            (
+                "INSERT INTO events (run_id, key, event, at, sha256, size) VALUES (?, ?, 'download', ?, ?, ?)",
+                (self.run_id, key, now, sha256, size)
+            ),
+            ('DELETE FROM missing WHERE key = ?', (key,))
+        ])
+
+    def get_missing(self, key: str) -> MissingEntry | None:
+        """
+        Get the negative cache entry of a resource.
+
+        Parameters:
+            key (str): Resource identifier
+
+        Returns:
+            MissingEntry | None: Entry, None if the resource is not known to be missing
+        """
+        rows = self._query('SELECT * FROM missing WHERE key = ?', (key,))
+        return MissingEntry(**rows[0]) if rows else None
+
+    def record_missing(self, key: str, status: int) -> None:
+        """
+        Record a check reporting a resource missing.
+
+        Parameters:
+            key (str): Resource identifier
+            status (int): HTTP status of the response
+        """
+        now = time.time()
+        self._execute([
+            (
+                'INSERT INTO missing (key, status, first_seen, checked_at, misses) VALUES (?, ?, ?, ?, 1) '
+                'ON CONFLICT (key) DO UPDATE SET status = excluded.status, checked_at = excluded.checked_at, '
+                'misses = missing.misses + 1',
+                (key, status, now, now)
+            ),
+            (
+                "INSERT INTO events (run_id, key, event, at) VALUES (?, ?, 'missing', ?)",
+                (self.run_id, key, now)
+            )
+        ])
+
+    def _checkpoint_statement(self, key: str, status: str, now: float) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Build the statement recording the status of a resource in the run checkpoints. A new
+        resource is put at the next position of the run.
+
+        Parameters:
+            key (str): Resource identifier
+            status (str): Processing status
+            now (float): Unix timestamp of the status
+
+        Returns:
+            Tuple[str, Tuple[Any, ...]]: SQL statement and its parameters
+        """
+        return (
+            'INSERT INTO checkpoints (run_id, key, position, status, at) '
+            'SELECT ?, ?, COALESCE(MAX(position) + 1, 0), ?, ? FROM checkpoints WHERE run_id = ? '
+            'ON CONFLICT (run_id, key) DO UPDATE SET status = excluded.status, at = excluded.at',
+            (self.run_id, key, status, now, self.run_id)
+        )
+
+    def record_checkpoint(self, key: str, status: str) -> None:
+        """
+        Record the processing status of a resource in the run checkpoints.
+
+        Parameters:
+            key (str): Resource identifier
+            status (str): Processing status, e.g. 'extracted', 'unchanged' or 'loaded'
+        """
+        self._execute([self._checkpoint_statement(key, status, time.time())])
+
+    def checkpoints(self, run_id: str | None = None) -> Dict[str, str]:
+        """
+        Get the checkpoints of a run.
+
+        Parameters:
+            run_id (str | None): Run identifier, the run of the manifest if None
+
+        Returns:
+            Dict[str, str]: Processing status by resource identifier, in processing order
+        """
+        rows = self._query(
+            'SELECT key, status FROM checkpoints WHERE run_id = ? ORDER BY position', (run_id or self.run_id,)
+        )
+        return {row['key']: row['status'] for row in rows}
+
+    def record_loads(self, loads: Iterable[Tuple[str, str | None, int]]) -> None:
+        """
+        Record committed loads of resources in one transaction, with the 'committed' status in
+        the run checkpoints.
+
+        Parameters:
+            loads (Iterable[Tuple[str, str | None, int]]): Resource identifiers, hashes of the
+                loaded content and numbers of loaded rows
+        """
+        now = time.time()
+        statements: List[Tuple[str, Tuple[Any, ...]]] = []
+        for key, sha256, rows in loads:
+            statements.append((
+                'INSERT INTO entries (key, loaded_at, loaded_sha256, rows) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET loaded_at = excluded.loaded_at, '
+                'loaded_sha256 = excluded.loaded_sha256, rows = excluded.rows',
+                (key, now, sha256, rows)
+            ))
+            statements.append((
+                "INSERT INTO events (run_id, key, event, at, sha256, rows) VALUES (?, ?, 'load', ?, ?, ?)",
+                (self.run_id, key, now, sha256, rows)
+            ))
+            statements.append(self._checkpoint_statement(key, 'committed', now))
+        self._execute(statements)
+
+    def history(self, key: str | None = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get the latest events, of all resources or of one.
+
+        Parameters:
+            key (str | None): Resource identifier
+            limit (int): Maximum number of events
+
+        Returns:
+            List[Dict[str, Any]]: Events from the latest
+        """
+        if key is None:
+            return self._query('SELECT * FROM events ORDER BY at DESC, id DESC LIMIT ?', (limit,))
+        return self._query('SELECT * FROM events WHERE key = ? ORDER BY at DESC, id DESC LIMIT ?', (key, limit))
+
+    def runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Summarize the latest runs.
+
+        Parameters:
+            limit (int): Maximum number of runs
+
+        Returns:
+            List[Dict[str, Any]]: Run identifier, first and last event, numbers of downloads,
+                downloaded bytes, loads and loaded rows of every run, from the latest
+        """
+        return self._query(
+            "SELECT run_id, MIN(at) AS started, MAX(at) AS finished, "
+            "SUM(event = 'download') AS downloads, SUM(CASE WHEN event = 'download' THEN size END) AS bytes, "
+            "SUM(event = 'load') AS loads, SUM(CASE WHEN event = 'load' THEN rows END) AS rows "
+            "FROM events GROUP BY run_id ORDER BY started DESC LIMIT ?",
+            (limit,)
+        )
@@ -0,0 +1,316 @@
+"""Metrics and tracing of ETL runs"""
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timezone
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Tuple, TypeVar
+
+import pandas as pd
+
+from etl.files import File
+
+
+T = TypeVar('T')
+
+
+@dataclass
+class StageMetrics:
+    """
+    Totals of the measurements of a stage.
+
+    Attributes:
+        calls (int): Number of measurements
+        errors (int): Number of measurements that raised an exception
+        seconds (float): Total duration in seconds
+        bytes (int): Number of bytes processed
+        rows_in (int): Number of rows received
+        rows_out (int): Number of rows produced
+        retries (int): Number of retried attempts
+    """
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+    rows_in: int = 0
+    rows_out: int = 0
+    retries: int = 0
+
+    def __add__(self, other: 'StageMetrics') -> 'StageMetrics':
+        return StageMetrics(**{
+            metric.name: getattr(self, metric.name) + getattr(other, metric.name) for metric in fields(self)
+        })
+
+
+@dataclass
+class Measurement:
+    """
+    Measurement of a single call of a stage, the measured code sets the processed amounts.
+
+    Attributes:
+        stage (str): Stage name
+        name (str | None): Name of the processed object, measurements with a name are traced
+        start (float): Start of the call as a Unix timestamp
+        seconds (float): Duration in seconds
+        bytes (int): Number of bytes processed
+        rows_in (int): Number of rows received
+        rows_out (int): Number of rows produced
+        retries (int): Number of retried attempts
+        error (str | None): Exception raised by the call
+    """
+    stage: str
+    name: str | None = None
+    start: float = field(default_factory=time.time)
+    seconds: float = 0.0
+    bytes: int = 0
+    rows_in: int = 0
+    rows_out: int = 0
+    retries: int = 0
+    error: str | None = None
+    _deferred: bool = field(default=False, repr=False)
+
+
+def count_rows(data: Any) -> int:
+    """
+    Count the rows of data.
+
+    Parameters:
+        data (Any): Data
+
+    Returns:
+        int: Number of rows of a DataFrame or Series, 0 for other data
+    """
+    return len(data) if isinstance(data, (pd.DataFrame, pd.Series)) else 0
+
+
+def _escape(value: str) -> str:
+    """
+    Escape a Prometheus label value.
+
+    Parameters:
+        value (str): Label value
+
+    Returns:
+        str: Escaped value
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """
+    Thread-safe registry of the durations, processed bytes and rows, retries and errors
+    of the ETL stages.
+
+    Every measurement is added to the totals of its stage. Measurements of a named object
+    (e.g. the extraction of a download object) are also kept as spans tracing the run.
+    Measurements may be nested, e.g. parsing is measured inside the transformation.
+
+    Attributes:
+        stages (Dict[str, StageMetrics]): Totals of every stage
+        spans (List[Measurement]): Measurements of named objects
+        started (float): Unix timestamp of the creation or the last reset of the registry
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stages: Dict[str, StageMetrics] = {}
+        self.spans: List[Measurement] = []
+        self.started = time.time()
+
+    def reset(self) -> None:
+        """
+        Remove all the measurements.
+        """
+        with self._lock:
+            self.stages = {}
+            self.spans = []
+            self.started = time.time()
+
+    def record(self, measurement: Measurement) -> None:
+        """
+        Add a finished measurement.
+
+        Parameters:
+            measurement (Measurement): Measurement
+        """
+        totals = StageMetrics(
+            calls=1,
+            errors=int(measurement.error is not None),
+            seconds=measurement.seconds,
+            bytes=measurement.bytes,
+            rows_in=measurement.rows_in,
+            rows_out=measurement.rows_out,
+            retries=measurement.retries
+        )
+        with self._lock:
+            self.stages[measurement.stage] = self.stages.get(measurement.stage, StageMetrics()) + totals
+            if measurement.name is not None:
+                self.spans.append(measurement)
+
+    @contextmanager
+    def measure(self, stage: str, name: str | None = None, **values: Any) -> Iterator[Measurement]:
+        """
+        Measure a call of a stage.
+
+        The measurement is recorded when the context exits, unless it is continued
+        with `follow`.
+
+        Parameters:
+            stage (str): Stage name
+            name (str | None): Name of the processed object, to trace the call
+            **values (Any): Initial processed amounts, e.g. bytes or rows_in
+
+        Yields:
+            Measurement: Measurement to set the processed amounts on
+        """
+        measurement = Measurement(stage, name, **values)
+        start = time.perf_counter()
+        try:
+            yield measurement
+        except Exception as exc:
+            measurement.error = f'{type(exc).__name__}: {exc}'
+            raise
+        finally:
+            measurement.seconds += time.perf_counter() - start
+            if not measurement._deferred:  # pylint: disable=protected-access
+                self.record(measurement)
+
+    def follow(self, measurement: Measurement, items: Iterator[T]) -> Iterator[T]:
+        """
+        Continue a measurement over the lazy production of items, e.g. chunks of data.
+
+        Only the time spent producing the items is added. The measurement is recorded once
+        the items are exhausted, fail or are closed.
+
+        Parameters:
+            measurement (Measurement): Measurement to continue
+            items (Iterator[T]): Items
+
+        Returns:
+            Iterator[T]: The same items
+        """
+        measurement._deferred = True  # pylint: disable=protected-access
+        return self._follow(measurement, items)
+
+    def _follow(self, measurement: Measurement, items: Iterator[T]) -> Iterator[T]:
+        """
+        Yield the items measuring the time spent producing them.
+
+        Parameters:
+            measurement (Measurement): Measurement to continue
+            items (Iterator[T]): Items
+
+        Yields:
+            T: Items
+        """
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                except Exception as exc:
+                    measurement.error = f'{type(exc).__name__}: {exc}'
+                    raise
+                finally:
+                    measurement.seconds += time.perf_counter() - start
+                measurement.rows_out += count_rows(item)
+                yield item
+        finally:
+            self.record(measurement)
+
+    def drain(self) -> Tuple[Dict[str, StageMetrics], List[Measurement]]:
+        """
+        Take the measurements out of the registry, e.g. to send them from a worker process.
+
+        Returns:
+            Tuple[Dict[str, StageMetrics], List[Measurement]]: Stage totals and spans
+        """
+        with self._lock:
+            drained = self.stages, self.spans
+            self.stages, self.spans = {}, []
+        return drained
+
+    def merge(self, stages: Dict[str, StageMetrics], spans: List[Measurement]) -> None:
+        """
+        Add measurements taken out of another registry.
+
+        Parameters:
+            stages (Dict[str, StageMetrics]): Stage totals
+            spans (List[Measurement]): Spans
+        """
+        with self._lock:
+            for stage, totals in stages.items():
+                self.stages[stage] = self.stages.get(stage, StageMetrics()) + totals
+            self.spans.extend(spans)
+
+    def summary(self, **extra: Any) -> Dict[str, Any]:
+        """
+        Summarize the run.
+
+        Parameters:
+            **extra (Any): Additional JSON serializable values, e.g. the run report
+
+        Returns:
+            Dict[str, Any]: Start and end of the run, stage totals and spans ordered by start
+        """
+        with self._lock:
+            stages = {stage: asdict(totals) for stage, totals in sorted(self.stages.items())}
+            spans = [
+                {key: value for key, value in asdict(span).items() if not key.startswith('_')}
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ]
+        return {
+            'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            'finished': datetime.now(timezone.utc).isoformat(),
+            **extra,
+            'stages': stages,
+            'spans': spans
+        }
+
+    def write_summary(self, file: File, **extra: Any) -> None:
+        """
+        Write the run summary as JSON.
+
+        Parameters:
+            file (File): Summary file
+            **extra (Any): Additional JSON serializable values, e.g. the run report
+        """
+        file.save(json.dumps(self.summary(**extra), indent=2, default=str).encode())
+
+    def write_textfile(self, file: File, job: str) -> None:
+        """
+        Write the stage totals in the Prometheus text format, for the node_exporter textfile
+        collector. The file is replaced atomically, so the collector never reads it partially.
+
+        Parameters:
+            file (File): Metrics file, with the '.prom' extension
+            job (str): Value of the job label
+        """
+        with self._lock:
+            stages = sorted(self.stages.items())
+        job_label = f'job="{_escape(job)}"'
+        lines = []
+        for metric in fields(StageMetrics):
+            name = f'etl_stage_{metric.name}'
+            lines.append(f'# HELP {name} Stage {metric.name.replace("_", " ")} in the last run')
+            lines.append(f'# TYPE {name} gauge')
+            lines.extend(
+                f'{name}{{{job_label},stage="{_escape(stage)}"}} {getattr(totals, metric.name)}'
+                for stage, totals in stages
+            )
+        now = time.time()
+        lines.extend([
+            '# HELP etl_last_run_timestamp_seconds End of the last run',
+            '# TYPE etl_last_run_timestamp_seconds gauge',
+            f'etl_last_run_timestamp_seconds{{{job_label}}} {now}',
+            '# HELP etl_last_run_duration_seconds Duration of the last run',
+            '# TYPE etl_last_run_duration_seconds gauge',
+            f'etl_last_run_duration_seconds{{{job_label}}} {now - self.started}'
+        ])
+        file.save(('\n'.join(lines) + '\n').encode())
+
+
+METRICS = Metrics()
@@ -0,0 +1,245 @@
+"""Request pacing controllers"""
+from abc import ABC, abstractmethod
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import logging
+import threading
+import time
+from typing import Any, Callable, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse the value of a Retry-After header.
+
+    Parameters:
+        value (str | None): Header value, either a number of seconds or an HTTP date
+
+    Returns:
+        float | None: Number of seconds to wait, or None if the value could not be parsed
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo=timezone.utc)
+    return max((retry_date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class Pacer(ABC):
+    """
+    Abstract base class for controllers pacing the requests sent to a source.
+
+    Attributes:
+        retry_statuses (Tuple[int, ...]): Response status codes after which a request can be retried.
+    """
+    retry_statuses: Tuple[int, ...] = (429, 503)
+
+    @abstractmethod
+    def acquire(self) -> None:
+        """
+        Block until the next request may be sent.
+        """
+
+    def observe(self, status_code: int, latency: float, retry_after: float | None = None) -> None:
+        """
+        Record the outcome of a request.
+
+        Parameters:
+            status_code (int): Response status code
+            latency (float): Time in seconds it took to receive the response
+            retry_after (float | None): Number of seconds the server asked to wait, if any
+        """
+
+    def hook(self, response: Any, *_args: Any, **_kwargs: Any) -> None:
+        """
+        requests response hook feeding the responses to the pacer.
+
+        Parameters:
+            response (requests.Response): Received response
+        """
+        self.observe(
+            response.status_code,
+            response.elapsed.total_seconds(),
+            parse_retry_after(response.headers.get('Retry-After'))
+        )
+
+    def attach(self, session: Any) -> Any:
+        """
+        Register the pacer as a response hook of a requests session.
+
+        Parameters:
+            session (requests.Session): Session to observe
+
+        Returns:
+            requests.Session: The same session.
+        """
+        session.hooks['response'].append(self.hook)
+        return session
+
+    def is_retryable(self, exc: Exception) -> bool:
+        """
+        Check whether the request that raised the exception was throttled and can be retried.
+
+        Parameters:
+            exc (Exception): Exception raised by the download
+
+        Returns:
+            bool: Whether the download can be retried
+        """
+        response = getattr(exc, 'response', None)
+        return getattr(response, 'status_code', None) in self.retry_statuses
+
+
+class FixedPacer(Pacer):
+    """
+    Pacer keeping a fixed interval between requests.
+
+    Attributes:
+        interval (float): Minimum time in seconds between two requests.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        """
+        Initialize FixedPacer.
+
+        Parameters:
+            interval (float): Minimum time in seconds between two requests
+            clock (Callable[[], float]): Monotonic clock function (default is time.monotonic)
+            sleep (Callable[[float], None]): Sleep function (default is time.sleep)
+        """
+        self.interval = interval
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def acquire(self) -> None:
+        """
+        Block until the interval since the previous request has passed.
+        """
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_time)
+            self._next_time = slot + self.interval
+        if slot > now:
+            self._sleep(slot - now)
+
+
+class AdaptivePacer(Pacer):
+    """
+    Token bucket pacer adjusting its rate with additive increase, multiplicative decrease.
+
+    The rate grows by `increase` after every fast successful response and is multiplied
+    by `decrease` after a slow response or a throttling status code (429/503).
+    A Retry-After header blocks all requests until the given time.
+
+    Attributes:
+        rate (float): Current number of requests per second.
+        min_rate (float): Lower bound of the rate.
+        max_rate (float): Upper bound of the rate.
+        burst (int): Number of requests that can be sent at once.
+        increase (float): Rate added after a fast successful response.
+        decrease (float): Factor the rate is multiplied by after a slow or throttled response.
+        target_latency (float): Latency in seconds above which a response is considered slow.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        min_rate: float = 0.1,
+        max_rate: float = 5.0,
+        burst: int = 1,
+        increase: float = 0.1,
+        decrease: float = 0.5,
+        target_latency: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        """
+        Initialize AdaptivePacer.
+
+        Parameters:
+            rate (float): Initial number of requests per second (default is 1.0)
+            min_rate (float): Lower bound of the rate (default is 0.1)
+            max_rate (float): Upper bound of the rate (default is 5.0)
+            burst (int): Number of requests that can be sent at once (default is 1)
+            increase (float): Rate added after a fast successful response (default is 0.1)
+            decrease (float): Factor applied to the rate on slow or throttled responses (default is 0.5)
+            target_latency (float): Latency in seconds above which a response is slow (default is 1.0)
+            clock (Callable[[], float]): Monotonic clock function (default is time.monotonic)
+            sleep (Callable[[float], None]): Sleep function (default is time.sleep)
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        """
+        Add the tokens accumulated since the last update.
+
+        Parameters:
+            now (float): Current clock time
+        """
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """
+        Take a token from the bucket, waiting for it if the bucket is empty or the source
+        asked to retry later.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(-self._tokens / self.rate, self._blocked_until - now, 0.0)
+        if wait > 0:
+            self._sleep(wait)
+
+    def observe(self, status_code: int, latency: float, retry_after: float | None = None) -> None:
+        """
+        Adjust the rate based on the outcome of a request.
+
+        Parameters:
+            status_code (int): Response status code
+            latency (float): Time in seconds it took to receive the response
+            retry_after (float | None): Number of seconds the server asked to wait, if any
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if status_code in self.retry_statuses or latency > self.target_latency:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            elif status_code < 400:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                self._tokens = min(self._tokens, 0.0)
+            rate = self.rate
+        logger.debug('Pacing at %.2f requests/s after status %s in %.2fs', rate, status_code, latency)
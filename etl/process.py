@@ -1,7 +1,17 @@
 """Download ETL Processor"""
+from collections import defaultdict
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import hashlib
+from itertools import chain
+import io
+import multiprocessing
+from queue import Empty, Full, Queue
+import threading
 import time
 import logging
-from typing import Any, Callable, Generic, Iterator, List, Tuple, TypeVar
+from typing import Any, Callable, ContextManager, Dict, Generic, Iterable, Iterator, List, Set, Tuple, Type, TypeVar
 import pandas as pd
 from sqlalchemy import text
 
@@ -9,10 +19,171 @@ from etl.data_parser import DataParser
 from etl.data_quality import DataQualityValidator
 from etl.download_strategy import AppendStrategy, DownloadStrategy
 from etl.downloader import Downloader
-from etl.transform import TransformPipeline
+from etl.exceptions import ContentNotModified
+from etl.files import File
+from etl.manifest import Manifest
+from etl.metrics import METRICS, Measurement, StageMetrics, count_rows
+from etl.pacing import Pacer
+from etl.profiling import Profiler
+from etl.scheduler import Scheduler
+from etl.shared_frames import SharedFrame, receive_frame, release_frame, share_frame
+from etl.transform import ROW_HASH, TransformPipeline
+from etl.transform_cache import TransformCache
 
 logger = logging.getLogger(__name__)
 DownloaderObject = TypeVar('DownloaderObject', bound=Downloader)
+MISSING_STATUSES = (404, 410)
+FINISHED_STATUSES = ('committed', 'unchanged')
+
+
+@dataclass
+class LoadResult:
+    """
+    Numbers of rows affected by a load.
+
+    Attributes:
+        inserted (int): Number of new rows
+        updated (int): Number of existing rows that were updated
+        unchanged (int): Number of existing rows left untouched
+    """
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __add__(self, other: 'LoadResult') -> 'LoadResult':
+        return LoadResult(
+            self.inserted + other.inserted,
+            self.updated + other.updated,
+            self.unchanged + other.unchanged
+        )
+
+
+@dataclass
+class RunReport:
+    """
+    Summary of a pipelined run.
+
+    Attributes:
+        result (LoadResult): Numbers of loaded rows
+        wall_time (float): Duration of the run in seconds
+        utilisation (Dict[str, float]): Fraction of the run each stage spent working instead
+            of waiting for the other stages
+    """
+    result: LoadResult
+    wall_time: float
+    utilisation: Dict[str, float]
+
+
+@dataclass
+class _RunState:
+    """
+    State shared by the stages of a pipelined run.
+    """
+    extracted: Queue
+    transformed: Queue
+    stop: threading.Event = field(default_factory=threading.Event)
+    errors: List[BaseException] = field(default_factory=list)
+    busy: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    def put(self, queue: Queue, item: Any) -> bool:
+        """
+        Put an item into a queue, waiting while it is full unless the run is stopped.
+
+        Args:
+            queue (Queue): Queue between two stages
+            item (Any): Item to put
+
+        Returns:
+            bool: Whether the item was put into the queue
+        """
+        while not self.stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def get(self, queue: Queue) -> Any:
+        """
+        Get an item from a queue, waiting while it is empty unless the run is stopped.
+
+        Args:
+            queue (Queue): Queue between two stages
+
+        Returns:
+            Any: Item, or the end of stage marker if the run is stopped
+        """
+        while not self.stop.is_set():
+            try:
+                return queue.get(timeout=0.1)
+            except Empty:
+                continue
+        return _DONE
+
+    def fail(self, exc: BaseException) -> None:
+        """
+        Record a fatal error and stop the run.
+
+        Args:
+            exc (BaseException): Error raised by a stage
+        """
+        self.errors.append(exc)
+        self.stop.set()
+
+
+_DONE = object()
+
+
+def _transform_file(
+    source: File | bytes,
+    parser: DataParser,
+    transform_pipeline: TransformPipeline | None,
+    validation_pipeline: DataQualityValidator | None,
+    chunk_size: int | None,
+    transform_cache: TransformCache | None = None,
+    name: str | None = None,
+    profiler: Profiler | None = None
+) -> Tuple[List[SharedFrame], float, Tuple[Dict[str, StageMetrics], List[Measurement]]]:
+    """
+    Transform extracted data in a worker process and put the result into shared memory.
+
+    Args:
+        source (File | bytes): Content handed over by the extraction, or the extracted file
+            read through a memory map when the content was streamed to disk
+        parser (DataParser): Parser object
+        transform_pipeline (TransformPipeline | None): Transform pipeline
+        validation_pipeline (DataQualityValidator | None): Validation pipeline
+        chunk_size (int | None): Number of rows the parser splits the data into
+        transform_cache (TransformCache | None): Cache of transformed data
+        name (str | None): Name of the transformed object in the run metrics and profiles
+        profiler (Profiler | None): Profiler of the transformation
+
+    Returns:
+        Tuple[List[SharedFrame], float, Tuple[Dict[str, StageMetrics], List[Measurement]]]:
+            Handles of the transformed chunks, the time in seconds the transformation took
+            and the metrics measured in the worker
+    """
+    start = time.perf_counter()
+    shared: List[SharedFrame] = []
+    if name is None:
+        name = str(source.path) if isinstance(source, File) else 'content'
+    profile = profiler.profile('transform', name) if profiler is not None else nullcontext()
+    try:
+        with profile, METRICS.measure('transform', name) as measurement:
+            content = source.read(memory_map=True) if isinstance(source, File) else source
+            measurement.bytes = len(content)
+            data = ETL._transform_data(  # pylint: disable=protected-access
+                content, parser, transform_pipeline, validation_pipeline, chunk_size, transform_cache)
+            for chunk in [data] if isinstance(data, pd.DataFrame) else data:
+                shared.append(share_frame(chunk))
+                measurement.rows_out += count_rows(chunk)
+    except BaseException:
+        for frame in shared:
+            release_frame(frame)
+        raise
+    return shared, time.perf_counter() - start, METRICS.drain()
+
 
 class ETL(Generic[DownloaderObject]):
     """
@@ -20,77 +191,354 @@ class ETL(Generic[DownloaderObject]):
 
     Attributes:
         sleep_time (int): Time to sleep between extraction cycles
-        file_handler (File): File handling class instance
+        pacer (Pacer | None): Request pacing controller used instead of sleep_time
+        max_retries (int): Number of retries of downloads the pacer reports as throttled
+        stream (bool): Whether downloads are streamed to disk in chunks instead of held in memory
+        chunk_size (int): Size of the streamed chunks in bytes
+        transform_cache (TransformCache | None): Cache of transformed data, skipping the parsing
+            and transformation of content transformed before with the same configuration
+        profiler (Profiler | None): Profiler of the stages of every object
+        manifest (Manifest | None): Manifest recording the downloads, the committed loads and the
+            checkpoints of the run; objects finished by a previous run with the same run
+            identifier are skipped
+        missing_ttl (float | None): Time in seconds objects the source reported as missing
+            (HTTP 404 or 410) are skipped without a request, doubled with every consecutive
+            miss; requires a manifest, None disables skipping
+        max_missing_ttl (float): Maximum time in seconds known missing objects are skipped
+        refresh_missing (bool): Whether to request known missing objects regardless of the TTL
     """
 
-    def __init__(self, sleep_time: int = 0) -> None:
+    def __init__(
+        self,
+        sleep_time: int = 0,
+        pacer: Pacer | None = None,
+        max_retries: int = 0,
+        stream: bool = False,
+        chunk_size: int = 65536,
+        transform_cache: TransformCache | None = None,
+        profiler: Profiler | None = None,
+        manifest: Manifest | None = None,
+        missing_ttl: float | None = None,
+        max_missing_ttl: float = 180 * 86400,
+        refresh_missing: bool = False
+    ) -> None:
         """
         Initialize ETL class.
 
         Args:
             sleep_time (int | None): Time to sleep between extraction cycles
+            pacer (Pacer | None): Request pacing controller used instead of sleep_time
+            max_retries (int): Number of retries of downloads the pacer reports as throttled
+            stream (bool): Whether downloads are streamed to disk in chunks (default: False)
+            chunk_size (int): Size of the streamed chunks in bytes (default: 65536)
+            transform_cache (TransformCache | None): Cache of transformed data (default: None)
+            profiler (Profiler | None): Profiler of the stages of every object (default: None)
+            manifest (Manifest | None): Manifest recording the downloads and loads (default: None)
+            missing_ttl (float | None): Time in seconds known missing objects are skipped (default: None)
+            max_missing_ttl (float): Maximum time in seconds known missing objects are skipped
+                (default: 180 days)
+            refresh_missing (bool): Whether to request known missing objects (default: False)
 
         Returns:
             None
         """
-        self._queue: List[DownloaderObject] = []
+        self._queue: Scheduler[DownloaderObject] = Scheduler()
+        self._loaded: List[DownloaderObject] = []
+        self._loaded_rows: Dict[str, int] = defaultdict(int)
+        self._finished: Set[str] = set()
+        self._unique_keys: Dict[str, List[str]] = {}
+        self._row_hash_tables: Dict[str, bool] = {}
+        self._lock = threading.Lock()
         self.sleep_time = sleep_time
+        self.pacer = pacer
+        self.max_retries = max_retries
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.transform_cache = transform_cache
+        self.profiler = profiler
+        self.manifest = manifest
+        self.missing_ttl = missing_ttl
+        self.max_missing_ttl = max_missing_ttl
+        self.refresh_missing = refresh_missing
+
+    def _profile(self, stage: str, obj: DownloaderObject) -> ContextManager[None]:
+        """
+        Profile a stage of an object if a profiler is set.
+
+        Args:
+            stage (str): Stage name
+            obj (DownloaderObject): Processed object
+
+        Returns:
+            ContextManager[None]: Context of the profiled code
+        """
+        return self.profiler.profile(stage, str(obj)) if self.profiler is not None else nullcontext()
 
     def process_queue(
         self,
-        queue: List[DownloaderObject],
+        queue: Iterable[DownloaderObject],
         strategy: DownloadStrategy = AppendStrategy(),
-        reverse: bool = False
+        reverse: bool = False,
+        priority: Callable[[DownloaderObject], Any] | None = None
     ) -> Iterator[DownloaderObject]:
         """
         Process the queue of objects based on a download strategy.
 
+        The objects are scheduled by priority (see `Scheduler`), duplicate objects are skipped.
+
         Args:
-            queue (List[DownloaderObject]): List of Downloader instances
+            queue (Iterable[DownloaderObject]): Downloader instances, possibly generated lazily
             strategy (DownloadStrategy): Download strategy instance (default: AppendStrategy())
-            reverse (bool): Flag to reverse the queue (default: False)
+            reverse (bool): Flag to reverse the whole queue, consuming a lazy queue up front
+                (default: False)
+            priority (Callable[[DownloaderObject], Any] | None): Priority of an object, lower
+                first (default: None, queue order)
 
         Yields:
             Iterator[DownloaderObject]: Iterator over downloaded objects
         """
-        self._queue = queue
+        self._queue = Scheduler(queue, priority, reverse)
+        self._finished = self._finished_keys()
         while self._queue:
-            queue_obj = self._queue.pop(-int(reverse))
+            queue_obj = self._queue.pop()
+            if self._is_finished(queue_obj) or self._is_known_missing(queue_obj):
+                continue
             if strategy and strategy.is_download_required(queue_obj):
                 yield queue_obj
 
+    def _finished_keys(self) -> Set[str]:
+        """
+        Get the objects finished by a previous run with the run identifier of the manifest,
+        i.e. loaded and committed or found unchanged.
+
+        Returns:
+            Set[str]: Keys of the finished objects
+        """
+        if self.manifest is None:
+            return set()
+        return {key for key, status in self.manifest.checkpoints().items() if status in FINISHED_STATUSES}
+
+    def _is_finished(self, obj: DownloaderObject) -> bool:
+        """
+        Check whether a previous run with the same run identifier finished the object.
+
+        Args:
+            obj (DownloaderObject): Downloader instance
+
+        Returns:
+            bool: True if the object is skipped, False otherwise
+        """
+        if obj.key not in self._finished:
+            return False
+        logger.info('ALREADY PROCESSED: %s', obj)
+        METRICS.record(Measurement('skip_checkpoint', str(obj)))
+        return True
+
+    def _checkpoint(self, obj: DownloaderObject, status: str) -> None:
+        """
+        Record the processing status of an object in the run checkpoints, if a manifest is set.
+
+        Args:
+            obj (DownloaderObject): Downloader instance
+            status (str): Processing status
+        """
+        if self.manifest is not None:
+            self.manifest.record_checkpoint(obj.key, status)
+
+    def _is_known_missing(self, obj: DownloaderObject) -> bool:
+        """
+        Check whether the source reported the object as missing within the missing TTL.
+
+        Args:
+            obj (DownloaderObject): Downloader instance
+
+        Returns:
+            bool: True if the object is skipped without a request, False otherwise
+        """
+        if self.manifest is None or self.missing_ttl is None or self.refresh_missing:
+            return False
+        entry = self.manifest.get_missing(obj.key)
+        if entry is None or time.time() >= entry.expires_at(self.missing_ttl, self.max_missing_ttl):
+            return False
+        logger.info('KNOWN MISSING: %s (HTTP %d, %d misses)', obj, entry.status, entry.misses)
+        METRICS.record(Measurement('skip_missing', str(obj)))
+        return True
+
     def extract(
         self,
         obj: DownloaderObject,
         session: Any | None = None,
-        callback: Callable | None = None
+        callback: Callable | None = None,
+        strategy: DownloadStrategy | None = None
     ) -> DownloaderObject:
         """
         Extract data from a Downloader and save it.
 
+        The content is attached to the object for the transformation, so it does not have to be
+        read back from the file. Streamed content is not kept in memory. The content is hashed
+        once, streamed content while it is saved, and the hash is passed to the strategy and
+        recorded in the manifest, if set. With a manifest the hash is also staged in the object
+        state, to record it with the load once the object is committed, unless the strategy
+        stages its own hash of the load (see `ContentHashStrategy`).
+
         Args:
             obj (DownloaderObject): Downloader instance to extract data from
             session (Any | None): Extract session
             callback (Callable | None): Callback function for generating new download objects
+            strategy (DownloadStrategy | None): Strategy deciding whether the downloaded
+                content has to be processed
 
         Returns:
             Downloader: Object taht had its data downlaoded.
+
+        Raises:
+            ContentNotModified: If the strategy decides the content does not have to be processed
         """
-        content = obj.download(session)
-        obj.file.save(content)
-        time.sleep(self.sleep_time)
+        try:
+            with self._profile('extract', obj), METRICS.measure('extract', str(obj)) as measurement:
+                content = None
+                sha256 = hashlib.sha256()
+                if self.stream:
+                    measurement.bytes = obj.file.save_stream(self._download(obj, session, measurement), sha256)
+                else:
+                    content = self._download(obj, session, measurement)
+                    sha256.update(content)
+                    measurement.bytes = len(content)
+                digest = sha256.hexdigest()
+                if self.manifest is not None:
+                    obj.update_state(sha256=digest)
+                load_required = strategy is None or strategy.is_load_required(obj, content, digest)
+                if load_required and content is not None:
+                    obj.file.save(content)
+                if self.manifest is not None:
+                    self.manifest.record_download(obj.key, obj.file.path, digest, measurement.bytes)
+            if not load_required:
+                raise ContentNotModified(f'{obj} content unchanged')
+        except ContentNotModified:
+            self._checkpoint(obj, 'unchanged')
+            raise
+        self._checkpoint(obj, 'extracted')
+        if self.pacer is None:
+            time.sleep(self.sleep_time)
+        if content is not None:
+            obj.content = content
         if callback:
-            new_objects = callback(obj.file.read())
-            self._queue.extend(new_objects)
+            new_objects = callback(content if content is not None else obj.file.read())
+            with self._lock:
+                self._queue.extend(new_objects)
         return obj
 
+    def _download(
+        self, obj: DownloaderObject, session: Any | None = None, measurement: Measurement | None = None
+    ) -> Any:
+        """
+        Download the object data, waiting for the pacer and retrying throttled downloads.
+
+        Args:
+            obj (DownloaderObject): Downloader instance to download data from
+            session (Any | None): Extract session
+            measurement (Measurement | None): Measurement of the extraction counting the retries
+
+        Returns:
+            Any: Downloaded content, or an iterator over its chunks in stream mode
+        """
+        attempt = 0
+        while True:
+            if self.pacer is not None:
+                self.pacer.acquire()
+            try:
+                if self.stream:
+                    return obj.download_stream(session, chunk_size=self.chunk_size)
+                return obj.download(session)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                if self.pacer is None or attempt >= self.max_retries or not self.pacer.is_retryable(exc):
+                    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+                    if self.manifest is not None and status in MISSING_STATUSES:
+                        self.manifest.record_missing(obj.key, status)
+                    raise
+                attempt += 1
+                if measurement is not None:
+                    measurement.retries += 1
+                logger.warning('Retrying %s (%d/%d): %s', obj, attempt, self.max_retries, exc)
+
+    def extract_concurrent(
+        self,
+        queue: Iterable[DownloaderObject],
+        strategy: DownloadStrategy = AppendStrategy(),
+        session: Any | None = None,
+        callback: Callable | None = None,
+        max_workers: int = 4,
+        max_per_host: int = 2,
+        reverse: bool = False,
+        ignore_exceptions: Tuple[Type[Exception], ...] = (),
+        priority: Callable[[DownloaderObject], Any] | None = None
+    ) -> Iterator[DownloaderObject]:
+        """
+        Process the queue and extract objects using a bounded pool of worker threads.
+
+        Objects are submitted by priority (see `Scheduler`) and yielded in completion order.
+        Objects produced by the callback are put back into the queue and extracted by the same
+        pool, duplicate objects are skipped.
+
+        Args:
+            queue (Iterable[DownloaderObject]): Downloader instances to extract, possibly
+                generated lazily
+            strategy (DownloadStrategy): Download strategy instance (default: AppendStrategy())
+            session (Any | None): Extract session shared by all the workers
+            callback (Callable | None): Callback function for generating new download objects
+            max_workers (int): Maximum number of concurrent downloads (default: 4)
+            max_per_host (int): Maximum number of concurrent downloads per host (default: 2)
+            reverse (bool): Flag to reverse the whole queue, consuming a lazy queue up front
+                (default: False)
+            ignore_exceptions (Tuple[Type[Exception], ...]): Exceptions that only skip the
+                object instead of stopping the extraction
+            priority (Callable[[DownloaderObject], Any] | None): Priority of an object, lower
+                first (default: None, queue order)
+
+        Yields:
+            Iterator[DownloaderObject]: Iterator over extracted objects
+        """
+        self._queue = Scheduler(queue, priority, reverse)
+        self._finished = self._finished_keys()
+        host_limits: Dict[str, threading.BoundedSemaphore] = defaultdict(
+            lambda: threading.BoundedSemaphore(max_per_host))
+
+        def extract_limited(
+            obj: DownloaderObject, host_limit: threading.BoundedSemaphore
+        ) -> DownloaderObject:
+            with host_limit:
+                return self.extract(obj, session=session, callback=callback, strategy=strategy)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending: Set[Future] = set()
+            while True:
+                while len(pending) < max_workers:
+                    with self._lock:
+                        if not self._queue:
+                            break
+                        queue_obj = self._queue.pop()
+                    if self._is_finished(queue_obj) or self._is_known_missing(queue_obj):
+                        continue
+                    if strategy and strategy.is_download_required(queue_obj):
+                        host_limit = host_limits[getattr(queue_obj, 'host', '')]
+                        pending.add(executor.submit(extract_limited, queue_obj, host_limit))
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        yield future.result()
+                    except ignore_exceptions as exc:
+                        logger.info('Skipping extraction: %s', exc)
+
 
     def transform(
         self,
         obj: DownloaderObject,
         parser: DataParser | None = None,
         transform_pipeline: TransformPipeline | None = None,
-        validation_pipeline: DataQualityValidator | None = None
+        validation_pipeline: DataQualityValidator | None = None,
+        chunk_size: int | None = None
     ) -> Tuple[DownloaderObject, Any]:
         """
         Transform the data using specified pipelines.
@@ -100,49 +548,533 @@ class ETL(Generic[DownloaderObject]):
             parser (DataParser | None): Parser object
             transform_pipeline (TransformPipeline | None): Transform pipeline
             validation_pipeline (DataQualityValidator | None): Validation pipeline
+            chunk_size (int | None): Number of rows the parser splits the data into, if given
+                the data is an iterator of chunks transformed lazily one at a time
+
+        Uses the content handed over by the extraction if available, otherwise reads
+        the archived file through a memory map. When parsing in chunks the validation
+        pipeline checks the first chunk only.
 
         Returns:
             Tuple[DownloaderObject, Any]: Tuple containing the object and transformed data
         """
-        data = obj.file.read()
+        with self._profile('transform', obj), METRICS.measure('transform', str(obj)) as measurement:
+            data: Any = obj.content if obj.content is not None else obj.file.read(memory_map=True)
+            obj.content = None
+            measurement.bytes = len(data)
+            data = self._transform_data(
+                data, parser, transform_pipeline, validation_pipeline, chunk_size, self.transform_cache)
+            if isinstance(data, pd.DataFrame) or not chunk_size:
+                measurement.rows_out = count_rows(data)
+            else:
+                data = METRICS.follow(measurement, data)
+        return obj, data
+
+    @classmethod
+    def _transform_data(
+        cls,
+        data: Any,
+        parser: DataParser | None = None,
+        transform_pipeline: TransformPipeline | None = None,
+        validation_pipeline: DataQualityValidator | None = None,
+        chunk_size: int | None = None,
+        transform_cache: TransformCache | None = None
+    ) -> Any:
+        """
+        Parse, validate and transform the data, or read it from the cache if the same content
+        was transformed before with the same parser, pipelines and chunk size.
+
+        Args:
+            data (Any): Raw data
+            parser (DataParser | None): Parser object
+            transform_pipeline (TransformPipeline | None): Transform pipeline
+            validation_pipeline (DataQualityValidator | None): Validation pipeline
+            chunk_size (int | None): Number of rows the parser splits the data into
+            transform_cache (TransformCache | None): Cache of transformed data, only used
+                together with a parser
+
+        Returns:
+            Any: Transformed data, or an iterator over transformed chunks
+        """
+        if transform_cache is None or parser is None:
+            return cls._parse_and_transform(data, parser, transform_pipeline, validation_pipeline, chunk_size)
+        key = transform_cache.key(data, parser, transform_pipeline, validation_pipeline, chunk_size)
+        cached = transform_cache.get(key, chunked=bool(chunk_size))
+        if cached is not None:
+            return cached
+        return transform_cache.put(
+            key,
+            cls._parse_and_transform(data, parser, transform_pipeline, validation_pipeline, chunk_size),
+            chunked=bool(chunk_size)
+        )
+
+    @classmethod
+    def _parse_and_transform(
+        cls,
+        data: Any,
+        parser: DataParser | None,
+        transform_pipeline: TransformPipeline | None,
+        validation_pipeline: DataQualityValidator | None,
+        chunk_size: int | None
+    ) -> Any:
+        """
+        Parse, validate and transform the data.
+
+        Args:
+            data (Any): Raw data
+            parser (DataParser | None): Parser object
+            transform_pipeline (TransformPipeline | None): Transform pipeline
+            validation_pipeline (DataQualityValidator | None): Validation pipeline
+            chunk_size (int | None): Number of rows the parser splits the data into
+
+        Returns:
+            Any: Transformed data, or an iterator over transformed chunks
+        """
+        if parser and chunk_size:
+            chunks = parser.parse_iter(data, chunk_size=chunk_size)
+            first_chunk = next(chunks)
+            if validation_pipeline:
+                validation_pipeline.validate(first_chunk)
+            return cls._transform_chunks(chain([first_chunk], chunks), transform_pipeline)
         if parser:
             data = parser.parse(data)
         if validation_pipeline:
             validation_pipeline.validate(data)
         if transform_pipeline:
             data = transform_pipeline.apply(data)
-        return obj, data
+        return data
+
+    @staticmethod
+    def _transform_chunks(
+        chunks: Iterator[pd.DataFrame], transform_pipeline: TransformPipeline | None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Apply the transform pipeline to each chunk of data.
+
+        Args:
+            chunks (Iterator[pd.DataFrame]): Chunks of parsed data
+            transform_pipeline (TransformPipeline | None): Transform pipeline
+
+        Yields:
+            pd.DataFrame: Transformed chunks
+        """
+        for chunk in chunks:
+            yield transform_pipeline.apply(chunk) if transform_pipeline else chunk
+
+    @staticmethod
+    def _upsert_query(obj: DownloaderObject, columns: Iterable[str], mode: str, source: str) -> Any:
+        """
+        Build the query upserting rows into the object table.
+
+        In replace mode rows with a row hash column are only updated if the hash differs.
+        The query returns whether each of the inserted or updated rows was inserted.
+
+        Args:
+            obj (DownloaderObject): Downloader instance the data belongs to
+            columns (Iterable[str]): Loaded columns
+            mode (str): Load mode, 'replace' or 'append'
+            source (str): Source of the rows, a VALUES clause or a SELECT query
+
+        Returns:
+            TextClause: Upsert query
+
+        Raises:
+            ValueError: If the load mode is unknown
+        """
+        columns = list(columns)
+        if mode == 'replace':
+            conflict_action = (
+                f"DO UPDATE SET {', '.join(f'{col} = EXCLUDED.{col}' for col in columns)}"
+            )
+            if ROW_HASH in columns:
+                conflict_action += f' WHERE {obj.table}.{ROW_HASH} IS DISTINCT FROM EXCLUDED.{ROW_HASH}'
+        elif mode == 'append':
+            conflict_action = 'DO NOTHING'
+        else:
+            raise ValueError(f'Unknown load mode {mode}')
+        return text(
+            f"INSERT INTO {obj.schema}.{obj.table} ({', '.join(columns)}) {source} "
+            f"ON CONFLICT ON CONSTRAINT {obj.table}_unique {conflict_action} "
+            'RETURNING (xmax = 0) AS inserted'
+        )
+
+    def _unique_key(self, obj: DownloaderObject, session: Any) -> List[str]:
+        """
+        Get the columns of the unique constraint of the object table.
+
+        Args:
+            obj (DownloaderObject): Downloader instance the data belongs to
+            session (Any): Database session
+
+        Returns:
+            List[str]: Columns of the constraint
+        """
+        table = f'{obj.schema}.{obj.table}'
+        if table not in self._unique_keys:
+            result = session.execute(
+                text(
+                    'SELECT a.attname FROM pg_constraint c '
+                    'JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey) '
+                    'WHERE c.conrelid = CAST(:table AS regclass) AND c.conname = :constraint '
+                    'ORDER BY array_position(c.conkey, a.attnum)'
+                ),
+                {'table': table, 'constraint': f'{obj.table}_unique'}
+            )
+            self._unique_keys[table] = list(result.scalars())
+        return self._unique_keys[table]
+
+    def _has_row_hash(self, obj: DownloaderObject, session: Any) -> bool:
+        """
+        Check whether the object table has the row hash column.
+
+        Tables created before the column was introduced miss it until the migration
+        database/init/03_add_row_hash.sql is applied. Loads into them keep working without
+        the change detection instead of failing.
+
+        Args:
+            obj (DownloaderObject): Downloader instance the data belongs to
+            session (Any): Database session
+
+        Returns:
+            bool: Whether the table has the row hash column
+        """
+        table = f'{obj.schema}.{obj.table}'
+        if table not in self._row_hash_tables:
+            result = session.execute(
+                text(
+                    'SELECT 1 FROM pg_attribute '
+                    'WHERE attrelid = CAST(:table AS regclass) AND attname = :column AND NOT attisdropped'
+                ),
+                {'table': table, 'column': ROW_HASH}
+            )
+            self._row_hash_tables[table] = result.scalar() is not None
+            if not self._row_hash_tables[table]:
+                logger.warning(
+                    'Table %s has no %s column, loading without change detection. '
+                    'Apply database/init/03_add_row_hash.sql to add it.', table, ROW_HASH
+                )
+        return self._row_hash_tables[table]
+
+    def _upsert(
+        self, obj: DownloaderObject, data: pd.DataFrame, session: Any, mode: str, method: str
+    ) -> LoadResult:
+        """
+        Upsert data through a temporary staging table filled with COPY or parameterized
+        inserts, followed by a single INSERT ... SELECT.
+
+        Rows repeating the unique key are dropped first, as a single INSERT cannot update a row
+        twice. The row kept is the one the row by row upsert would leave in the table.
+
+        Args:
+            obj (DownloaderObject): Downloader instance the data belongs to
+            data (pd.DataFrame): Data to load
+            session (Any): Database session
+            mode (str): Load mode, 'replace' or 'append'
+            method (str): Method filling the staging table, 'insert' or 'copy'
+
+        Returns:
+            LoadResult: Numbers of inserted, updated and unchanged rows
+        """
+        if ROW_HASH in data.columns and not self._has_row_hash(obj, session):
+            data = data.drop(columns=ROW_HASH)
+        key = [col for col in self._unique_key(obj, session) if col in data.columns]
+        if key:
+            data = data.drop_duplicates(subset=key, keep='last' if mode == 'replace' else 'first')
+        staging = f'{obj.table}_staging'
+        columns = ', '.join(data.columns)
+        session.execute(text(f'DROP TABLE IF EXISTS pg_temp.{staging}'))
+        session.execute(text(
+            f'CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS '
+            f'SELECT {columns} FROM {obj.schema}.{obj.table} WITH NO DATA'
+        ))
+        if method == 'copy':
+            buffer = io.StringIO(data.to_csv(index=False, header=False, na_rep='\\N'))
+            with session.connection().connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+        else:
+            placeholders = ', '.join([':' + col for col in data.columns])
+            session.execute(
+                text(f'INSERT INTO {staging} ({columns}) VALUES ({placeholders})'),
+                [dict(row) for row in data.to_dict(orient='records')]
+            )
+        result = session.execute(self._upsert_query(obj, data.columns, mode, f'SELECT {columns} FROM {staging}'))
+        inserted = [row.inserted for row in result]
+        return LoadResult(
+            inserted=sum(inserted),
+            updated=len(inserted) - sum(inserted),
+            unchanged=len(data) - len(inserted)
+        )
 
     def load(
         self,
-        dataset: Tuple[DownloaderObject, pd.DataFrame],
+        dataset: Tuple[DownloaderObject, pd.DataFrame | Iterable[pd.DataFrame]],
         session: Any,
-        mode: str = 'replace'
-    ) -> None:
+        mode: str = 'replace',
+        method: str = 'insert'
+    ) -> LoadResult:
         """
-        Load data into the database.
+        Load data into the database (PostgreSQL only).
 
         Args:
-            dataset (Tuple[Downloader, pd.DataFrame]): Tuple containing the object and DataFrame
+            dataset (Tuple[Downloader, pd.DataFrame | Iterable[pd.DataFrame]]): Tuple containing
+                the object and DataFrame, or chunks of DataFrames upserted one at a time
             session (Any): Database session
-            mode (str): Load mode (default: 'replace')
+            mode (str): Load mode, 'replace' or 'append' (default: 'replace')
+            method (str): Load method, 'insert' staging the rows with parameterized inserts,
+                or 'copy' staging them with COPY (default: 'insert')
 
         Returns:
-            None
+            LoadResult: Numbers of inserted, updated and unchanged rows
+
+        Raises:
+            ValueError: If the load mode or method is unknown
         """
+        if method not in ('insert', 'copy'):
+            raise ValueError(f'Unknown load method {method}')
+        if mode not in ('replace', 'append'):
+            raise ValueError(f'Unknown load mode {mode}')
         obj, data = dataset
         logger.info('UPLOADING: %s to %s.%s', obj, obj.schema, obj.table)
-        placeholders = ', '.join([':' + col for col in data.columns])
-        columns = ', '.join(data.columns)
-        if mode == 'replace':
-            query = text(
-                f"INSERT INTO {obj.schema}.{obj.table} ({columns}) VALUES ({placeholders}) "
-                f"ON CONFLICT ON CONSTRAINT {obj.table}_unique DO UPDATE SET "
-                f"{', '.join(f'{col} = EXCLUDED.{col}' for col in data.columns)}"
+        result = LoadResult()
+        with self._profile('load', obj), METRICS.measure('load', str(obj)) as measurement:
+            for chunk in [data] if isinstance(data, pd.DataFrame) else data:
+                measurement.rows_in += len(chunk)
+                if not chunk.empty:
+                    result += self._upsert(obj, chunk, session, mode, method)
+            measurement.rows_out = result.inserted + result.updated
+        logger.info('%s: %s', obj, result)
+        self._loaded_rows[obj.key] += measurement.rows_in
+        if obj not in self._loaded:
+            self._loaded.append(obj)
+        self._checkpoint(obj, 'loaded')
+        return result
+
+    def commit(self) -> None:
+        """
+        Commit the state of the loaded objects (e.g. download validators) and record their
+        loads in the manifest, which marks them committed in the run checkpoints.
+
+        Should be called once the database transaction the objects were loaded in is committed,
+        so that the state never marks data as loaded when it is not.
+
+        Returns:
+            None
+        """
+        for obj in self._loaded:
+            obj.commit()
+        if self.manifest is not None and self._loaded:
+            self.manifest.record_loads(
+                (obj.key, obj.state.get('sha256'), self._loaded_rows[obj.key]) for obj in self._loaded
             )
-        elif mode == 'append':
-            query = text(
-                f"INSERT INTO {obj.schema}.{obj.table} ({columns}) VALUES ({placeholders}) "
-                f"ON CONFLICT ON CONSTRAINT {obj.table}_unique DO NOTHING"
+        self._loaded = []
+        self._loaded_rows.clear()
+
+    def run(
+        self,
+        queue: Iterable[DownloaderObject],
+        upload_session: Any,
+        parser: DataParser,
+        transform_pipeline: TransformPipeline | Callable[[DownloaderObject], TransformPipeline] | None = None,
+        validation_pipeline: DataQualityValidator | None = None,
+        chunk_size: int | None = None,
+        mode: str = 'replace',
+        method: str = 'insert',
+        workers: int = 2,
+        queue_size: int = 4,
+        commit_every: int = 0,
+        **extract_kwargs: Any
+    ) -> RunReport:
+        """
+        Extract, transform and load the objects with the three stages running concurrently.
+
+        Extraction runs in a thread (see `extract_concurrent`), transformation in a pool of
+        worker processes, and loading in the calling thread. The content held in memory by the
+        extraction is sent to the workers, which costs a copy through the pipe to the worker but
+        saves reading and decompressing the archived file again; streamed downloads have no
+        content in memory and are read by the workers from disk through a memory map.
+        The stages are connected by bounded queues, so a slow stage holds back the others.
+        Transformed chunks are passed back from the workers as Arrow data in shared memory.
+        The first error raised by any stage stops the run and is raised once all the stages
+        have stopped.
+
+        With `commit_every`, the upload session and the loaded objects are committed every
+        `commit_every` loaded objects, so a run that is stopped keeps the committed objects
+        and, restarted with the same run identifier of the manifest, skips them. The caller
+        commits the objects loaded after the last intermediate commit.
+
+        Args:
+            queue (Iterable[DownloaderObject]): Downloader instances to process
+            upload_session (Any): Database session
+            parser (DataParser): Parser object
+            transform_pipeline (TransformPipeline | Callable | None): Transform pipeline, or
+                a function returning the pipeline for an object
+            validation_pipeline (DataQualityValidator | None): Validation pipeline
+            chunk_size (int | None): Number of rows the parser splits the data into
+            mode (str): Load mode, 'replace' or 'append' (default: 'replace')
+            method (str): Load method, 'insert' or 'copy' (default: 'insert')
+            workers (int): Number of transform worker processes (default: 2)
+            queue_size (int): Capacity of the queues between the stages (default: 4)
+            commit_every (int): Number of loaded objects committed together, 0 to leave
+                committing the whole run to the caller (default: 0)
+            **extract_kwargs (Any): Arguments of `extract_concurrent`, with `download_session`
+                passed as its session
+
+        Returns:
+            RunReport: Loaded rows and utilisation of the stages
+
+        Raises:
+            Exception: The first error raised by any of the stages
+        """
+        extract_kwargs['session'] = extract_kwargs.pop('download_session', None)
+        state = _RunState(Queue(maxsize=queue_size), Queue(maxsize=queue_size))
+        start = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        threads = [
+            threading.Thread(target=self._extract_stage, args=(state, queue, extract_kwargs)),
+            threading.Thread(
+                target=self._transform_stage,
+                args=(
+                    state, executor,
+                    (parser, transform_pipeline, validation_pipeline, chunk_size, self.transform_cache, self.profiler)
+                )
             )
-        session.execute(query, [dict(row) for row in data.to_dict(orient='records')])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            result = self._load_stage(state, upload_session, mode, method, commit_every)
+        except BaseException as exc:
+            state.fail(exc)
+            raise
+        finally:
+            state.stop.set()
+            for thread in threads:
+                thread.join()
+            executor.shutdown(cancel_futures=True)
+            self._release_pending(state.transformed)
+        if state.errors:
+            raise state.errors[0]
+        wall_time = time.perf_counter() - start
+        report = RunReport(result, wall_time, {
+            'extract': state.busy['extract'] / wall_time,
+            'transform': state.busy['transform'] / (wall_time * workers),
+            'load': state.busy['load'] / wall_time
+        })
+        logger.info('Run finished: %s', report)
+        return report
+
+    def _load_stage(
+        self, state: _RunState, upload_session: Any, mode: str, method: str, commit_every: int = 0
+    ) -> LoadResult:
+        """
+        Load the transformed chunks in the order the objects were extracted.
+
+        Args:
+            state (_RunState): Run state
+            upload_session (Any): Database session
+            mode (str): Load mode, 'replace' or 'append'
+            method (str): Load method, 'insert' or 'copy'
+            commit_every (int): Number of loaded objects committed together, 0 for no commits
+
+        Returns:
+            LoadResult: Numbers of inserted, updated and unchanged rows
+        """
+        result = LoadResult()
+        while (item := state.get(state.transformed)) is not _DONE:
+            obj, future = item
+            shared, busy, metrics = future.result()
+            state.busy['transform'] += busy
+            METRICS.merge(*metrics)
+            start = time.perf_counter()
+            try:
+                result += self.load((obj, map(receive_frame, shared)), upload_session, mode, method)
+            finally:
+                for frame in shared:
+                    release_frame(frame)
+            if commit_every and len(self._loaded) >= commit_every:
+                upload_session.commit()
+                self.commit()
+            state.busy['load'] += time.perf_counter() - start
+        return result
+
+    def _extract_stage(self, state: _RunState, queue: Iterable[DownloaderObject], kwargs: Dict[str, Any]) -> None:
+        """
+        Extract the objects and pass them to the transform stage.
+
+        Args:
+            state (_RunState): Run state
+            queue (Iterable[DownloaderObject]): Downloader instances to extract
+            kwargs (Dict[str, Any]): Arguments of `extract_concurrent`
+        """
+        start = time.perf_counter()
+        waiting = 0.0
+        try:
+            for obj in self.extract_concurrent(queue, **kwargs):
+                put_start = time.perf_counter()
+                if not state.put(state.extracted, obj):
+                    break
+                waiting += time.perf_counter() - put_start
+        except BaseException as exc:  # pylint: disable=broad-exception-caught
+            state.fail(exc)
+        finally:
+            state.busy['extract'] = time.perf_counter() - start - waiting
+            state.put(state.extracted, _DONE)
+
+    @staticmethod
+    def _transform_stage(state: _RunState, executor: ProcessPoolExecutor, options: Tuple[Any, ...]) -> None:
+        """
+        Submit the extracted objects to the transform workers and pass the pending
+        results to the load stage.
+
+        Args:
+            state (_RunState): Run state
+            executor (ProcessPoolExecutor): Transform worker pool
+            options (Tuple[Any, ...]): Parser, transform pipeline or a function returning it,
+                validation pipeline, chunk size, transform cache and profiler
+        """
+        parser, transform_pipeline, validation_pipeline, chunk_size, transform_cache, profiler = options
+        try:
+            while (obj := state.get(state.extracted)) is not _DONE:
+                pipeline = transform_pipeline
+                if transform_pipeline is not None and not isinstance(transform_pipeline, TransformPipeline):
+                    pipeline = transform_pipeline(obj)
+                source = obj.content if isinstance(obj.content, bytes) else obj.file
+                future = executor.submit(
+                    _transform_file,
+                    source, parser, pipeline, validation_pipeline, chunk_size, transform_cache, str(obj), profiler
+                )
+                obj.content = None
+                if not state.put(state.transformed, (obj, future)):
+                    ETL._release_result(future)
+        except BaseException as exc:  # pylint: disable=broad-exception-caught
+            state.fail(exc)
+        finally:
+            state.put(state.transformed, _DONE)
+
+    @staticmethod
+    def _release_pending(transformed: Queue) -> None:
+        """
+        Release the shared memory of transformed chunks that were not loaded.
+
+        Args:
+            transformed (Queue): Queue of pending transform results
+        """
+        while True:
+            try:
+                item = transformed.get_nowait()
+            except Empty:
+                return
+            if item is not _DONE:
+                ETL._release_result(item[1])
+
+    @staticmethod
+    def _release_result(future: Future) -> None:
+        """
+        Release the shared memory of a transform result that will not be loaded.
+
+        Args:
+            future (Future): Pending transform result
+        """
+        if not future.cancel() and future.exception() is None:
+            for frame in future.result()[0]:
+                release_frame(frame)
@@ -0,0 +1,134 @@
+"""Opt-in CPU and memory profiling of the processing of downloader objects"""
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import logging
+import os
+from pathlib import Path
+import pstats
+import re
+import tracemalloc
+from typing import Iterator, List
+
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler:
+    """
+    Profiler of the ETL stages of single objects with cProfile and tracemalloc.
+
+    Every profiled stage of an object writes to the object's own directory:
+        <stage>.prof: cProfile statistics, e.g. for `python -m pstats` or snakeviz
+        <stage>.txt: Functions with the largest cumulative time
+        <stage>.memory.txt: Peak traced memory and the lines that allocated the most memory
+
+    cProfile only profiles the thread it is enabled in, so objects extracted concurrently are
+    profiled separately. tracemalloc traces the whole process, so the memory of a stage
+    includes the allocations of the stages running concurrently with it.
+
+    Attributes:
+        directory (Path): Directory of the reports
+        top (int): Number of functions and allocating lines in the text reports
+        frames (int): Number of frames stored in the traceback of an allocation
+    """
+    ENVIRONMENT_VARIABLE = 'ETL_PROFILE'
+
+    def __init__(self, directory: str | Path, top: int = 30, frames: int = 1) -> None:
+        self.directory = Path(directory)
+        self.top = top
+        self.frames = frames
+
+    @classmethod
+    def from_environment(cls, directory: str | Path, enabled: bool = False, **kwargs: int) -> 'Profiler | None':
+        """
+        Create a profiler of a run if profiling is enabled by a flag or the ETL_PROFILE
+        environment variable (any value other than '', '0', 'false' or 'no').
+
+        Parameters:
+            directory (str | Path): Directory of the reports of all runs, every run writes to
+                a subdirectory named by its start time
+            enabled (bool): Whether profiling is enabled regardless of the environment
+            **kwargs (int): Profiler options
+
+        Returns:
+            Profiler | None: Profiler, None if profiling is disabled
+        """
+        flag = os.environ.get(cls.ENVIRONMENT_VARIABLE, '').strip().lower()
+        if not enabled and flag in ('', '0', 'false', 'no'):
+            return None
+        run = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        logger.info('Profiling the run to %s', Path(directory) / run)
+        return cls(Path(directory) / run, **kwargs)
+
+    def path(self, name: str, stage: str) -> Path:
+        """
+        Get the path of a report, without an extension.
+
+        Parameters:
+            name (str): Name of the object
+            stage (str): Stage name
+
+        Returns:
+            Path: Report path
+        """
+        slug = re.sub(r'[^\w.-]+', '_', name).strip('_')[:200] or '_'
+        return self.directory / slug / stage
+
+    @contextmanager
+    def profile(self, stage: str, name: str) -> Iterator[None]:
+        """
+        Profile a stage of an object and write its reports when the context exits.
+
+        Parameters:
+            stage (str): Stage name
+            name (str): Name of the object
+
+        Yields:
+            None
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            cpu = True
+        except ValueError as exc:
+            logger.warning('Not profiling the CPU time of %s %s: %s', stage, name, exc)
+            cpu = False
+        try:
+            yield
+        finally:
+            if cpu:
+                profile.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            allocations = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+            self._write(self.path(name, stage), profile if cpu else None, allocations, peak)
+
+    def _write(
+        self, path: Path, profile: cProfile.Profile | None, allocations: List[tracemalloc.StatisticDiff], peak: int
+    ) -> None:
+        """
+        Write the reports of a profiled stage.
+
+        Parameters:
+            path (Path): Report path without an extension
+            profile (cProfile.Profile | None): CPU profile
+            allocations (List[tracemalloc.StatisticDiff]): Memory allocated during the stage by line
+            peak (int): Peak traced memory in bytes
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if profile is not None:
+            profile.dump_stats(path.with_suffix('.prof'))
+            with open(path.with_suffix('.txt'), 'w', encoding='utf-8') as handle:
+                pstats.Stats(profile, stream=handle).sort_stats('cumulative').print_stats(self.top)
+        ignored = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<unknown>')
+        lines = [f'Peak traced memory: {peak / 2**20:.1f} MiB', f'Top {self.top} allocating lines:']
+        lines.extend(
+            str(stat) for stat in allocations
+            if stat.traceback[0].filename not in ignored
+        )
+        with open(path.with_suffix('.memory.txt'), 'w', encoding='utf-8') as handle:
+            handle.write('\n'.join(lines[:self.top + 2]) + '\n')
@@ -0,0 +1,132 @@
+"""Priority scheduler of downloader objects"""
+import heapq
+from itertools import count
+import threading
+from typing import Any, Callable, Generic, Iterable, Iterator, List, Set, Tuple, TypeVar
+
+from etl.downloader import Downloader
+from etl.manifest import Manifest
+
+
+DownloaderObject = TypeVar('DownloaderObject', bound=Downloader)
+
+
+class Scheduler(Generic[DownloaderObject]):
+    """
+    Thread-safe priority queue of downloader objects.
+
+    Objects with the lowest priority value are popped first, objects of equal priority in
+    insertion order (or in reverse insertion order). Objects are identified by their key, so an
+    object added again, e.g. by an extraction callback, is ignored even if it was popped before.
+
+    The source objects are consumed lazily: the heap is refilled from the source only when it
+    holds fewer objects than the lookahead, so priorities order the objects within the
+    lookahead and sources should yield the most valuable objects early. Reversing the insertion
+    order needs the last source object first, so with `reverse` the source is consumed fully
+    on the first pop.
+
+    Attributes:
+        priority (Callable[[DownloaderObject], Any] | None): Priority of an object, lower first,
+            None for insertion order
+        reverse (bool): Whether objects of equal priority are popped in reverse insertion order
+        lookahead (int): Number of source objects held in the heap, ignored with `reverse`
+    """
+
+    def __init__(
+        self,
+        objects: Iterable[DownloaderObject] = (),
+        priority: Callable[[DownloaderObject], Any] | None = None,
+        reverse: bool = False,
+        lookahead: int = 1024
+    ) -> None:
+        self.priority = priority
+        self.reverse = reverse
+        self.lookahead = lookahead
+        self._source: Iterator[DownloaderObject] = iter(objects)
+        self._heap: List[Tuple[Any, int, DownloaderObject]] = []
+        self._seen: Set[str] = set()
+        self._counter = count()
+        self._lock = threading.RLock()
+
+    def _push(self, obj: DownloaderObject) -> None:
+        """
+        Add an object to the heap unless it was added before.
+
+        Args:
+            obj (DownloaderObject): Downloader instance
+        """
+        if obj.key in self._seen:
+            return
+        self._seen.add(obj.key)
+        order = next(self._counter)
+        priority = self.priority(obj) if self.priority is not None else 0
+        heapq.heappush(self._heap, (priority, -order if self.reverse else order, obj))
+
+    def _fill(self) -> None:
+        """
+        Refill the heap from the source up to the lookahead, or with the whole source if the
+        insertion order is reversed.
+        """
+        while self.reverse or len(self._heap) < max(self.lookahead, 1):
+            obj = next(self._source, None)
+            if obj is None:
+                return
+            self._push(obj)
+
+    def extend(self, objects: Iterable[DownloaderObject]) -> None:
+        """
+        Add objects, skipping the ones added before.
+
+        Args:
+            objects (Iterable[DownloaderObject]): Downloader instances
+        """
+        with self._lock:
+            for obj in objects:
+                self._push(obj)
+
+    def pop(self) -> DownloaderObject:
+        """
+        Remove and return the object with the highest priority.
+
+        Returns:
+            DownloaderObject: Downloader instance
+
+        Raises:
+            IndexError: If the scheduler is empty
+        """
+        with self._lock:
+            self._fill()
+            if not self._heap:
+                raise IndexError('pop from an empty scheduler')
+            return heapq.heappop(self._heap)[-1]
+
+    def __bool__(self) -> bool:
+        with self._lock:
+            self._fill()
+            return bool(self._heap)
+
+    def __len__(self) -> int:
+        """
+        Number of objects in the heap, excluding the ones not consumed from the source yet.
+        """
+        with self._lock:
+            return len(self._heap)
+
+
+def recently_changed_first(manifest: Manifest) -> Callable[[Downloader], float]:
+    """
+    Create a priority scheduling the objects whose content changed most recently first.
+
+    An object's content changed when it was last loaded. The last load of unchanged content
+    is skipped, so it does not update the time. Objects that were never loaded come last.
+
+    Args:
+        manifest (Manifest): Manifest of the loads
+
+    Returns:
+        Callable[[Downloader], float]: Priority of an object
+    """
+    def priority(obj: Downloader) -> float:
+        entry = manifest.get(obj.key)
+        return -(entry.loaded_at or 0.0) if entry is not None else 0.0
+    return priority
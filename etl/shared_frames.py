@@ -0,0 +1,106 @@
+"""Passing DataFrames between processes through shared memory"""
+from multiprocessing import shared_memory
+from typing import NamedTuple, cast
+
+import pandas as pd
+import pyarrow as pa
+
+
+class SharedFrame(NamedTuple):
+    """
+    Handle of a DataFrame stored in shared memory as an Arrow IPC stream.
+
+    Attributes:
+        name (str): Name of the shared memory block.
+        size (int): Size of the stream in bytes.
+    """
+    name: str
+    size: int
+
+
+def _write_table(buffer: memoryview, table: pa.Table) -> None:
+    """
+    Write an Arrow table as an IPC stream into a buffer.
+
+    Parameters:
+        buffer (memoryview): Buffer large enough for the stream.
+        table (pa.Table): Table to write.
+    """
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(buffer)), table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_frame(buffer: memoryview) -> pd.DataFrame:
+    """
+    Read a DataFrame from an Arrow IPC stream.
+
+    Parameters:
+        buffer (memoryview): Buffer holding the stream.
+
+    Returns:
+        pd.DataFrame: Data, not referencing the buffer.
+    """
+    with pa.ipc.open_stream(buffer) as reader:
+        return reader.read_all().to_pandas()
+
+
+def share_frame(data: pd.DataFrame) -> SharedFrame:
+    """
+    Store a DataFrame in a new shared memory block.
+
+    The block outlives the calling process and has to be released with `receive_frame`
+    or `release_frame`. The index is not stored.
+
+    Parameters:
+        data (pd.DataFrame): Data to store.
+
+    Returns:
+        SharedFrame: Handle of the stored data.
+    """
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = sink.size()
+    block = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        _write_table(cast(memoryview, block.buf), table)
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    block.close()
+    return SharedFrame(block.name, size)
+
+
+def receive_frame(shared: SharedFrame) -> pd.DataFrame:
+    """
+    Read a DataFrame from shared memory and release the block.
+
+    Parameters:
+        shared (SharedFrame): Handle of the stored data.
+
+    Returns:
+        pd.DataFrame: Data with a default index.
+    """
+    block = shared_memory.SharedMemory(shared.name)
+    try:
+        return _read_frame(cast(memoryview, block.buf)[:shared.size])
+    finally:
+        block.close()
+        block.unlink()
+
+
+def release_frame(shared: SharedFrame) -> None:
+    """
+    Release the shared memory block of a DataFrame that will not be read.
+
+    Parameters:
+        shared (SharedFrame): Handle of the stored data.
+    """
+    try:
+        block = shared_memory.SharedMemory(shared.name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
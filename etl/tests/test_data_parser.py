@@ -1,8 +1,10 @@
 # pylint: skip-file
+from pathlib import Path
 import pandas as pd
 import pytest
-from etl.data_parser import CSVDataParser
+from etl.data_parser import CSVDataParser, DataParser
 from etl.exceptions import DataParserError
+from etl.files import File
 
 
 
@@ -63,3 +65,124 @@ def test_parse_unicode_decode_error():
     parser = CSVDataParser()
     with pytest.raises(DataParserError):
         parser.parse(content)
+
+
+def test_parse_memoryview():
+    content = memoryview(b'col1,col2\n1,4\n2,5\n3,6')
+    expected_data = pd.DataFrame({'col1': ['1', '2', '3'], 'col2': ['4', '5', '6']})
+    parser = CSVDataParser()
+    pd.testing.assert_frame_equal(parser.parse(content), expected_data)
+
+
+def test_parse_memory_mapped_file(tmp_path):
+    file = File(tmp_path / 'file.csv')
+    file.save(b'col1,col2\n1,4\n2,5\n3,6')
+    expected_data = pd.DataFrame({'col1': ['1', '2', '3'], 'col2': ['4', '5', '6']})
+    parser = CSVDataParser(encoding='unicode_escape')
+    pd.testing.assert_frame_equal(parser.parse(file.read(memory_map=True)), expected_data)
+
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+@pytest.mark.parametrize('content, header', [
+    (b'col1,col2\n1,4\n2,5\n3,6', True),
+    (b'col1,col2,col3\n1,2,3\n4,5,6,7\n,,\n', True),
+    (b'col1,col2,col3\n1,2,3\n4,5,6\n7,,8,\n9,10', True),
+    (b'col1,col2\r\n1,\r\n,\r\n,2\r\n\r\n', True),
+    (b'h0,h1,h2,h3,h4\n1,1,1,1,1\n\n\na\n\n\n,,,,,', True),
+    (b'1,4\n2,5\n3,6', False),
+    ('col1,col2\r1,2\x0b3,4\x0c5,6\x1c7,8\x1d9,\x1e,10\u202811,12\u2029\x8513,14'.encode('utf-8'), True),
+])
+def test_csv_parser_c_engine(content, header):
+    expected_data = CSVDataParser(header=header).parse(content)
+    parsed = CSVDataParser(header=header, engine='c').parse(content)
+    pd.testing.assert_frame_equal(parsed, expected_data)
+
+
+@pytest.mark.parametrize('fixture', ['E0.csv', 'ARG.csv'])
+@pytest.mark.parametrize('header', [True, False])
+def test_csv_parser_c_engine_fixture(fixture, header):
+    content = (FIXTURES / fixture).read_bytes()
+    expected_data = CSVDataParser(header=header, encoding='unicode_escape').parse(content)
+    parsed = CSVDataParser(header=header, encoding='unicode_escape', engine='c').parse(content)
+    pd.testing.assert_frame_equal(parsed, expected_data)
+    assert parsed.isna().equals(expected_data.isna())
+
+
+def test_csv_parser_c_engine_dtype():
+    content = b'team,goals,odds\nA,1,1.5\nB,,2.25\nC,3\n'
+    parser = CSVDataParser(engine='c', dtype={'goals': 'Int16', 'odds': 'float64'})
+    parsed = parser.parse(content)
+    expected_data = pd.DataFrame({
+        'team': ['A', 'B', 'C'],
+        'goals': pd.array([1, None, 3], dtype='Int16'),
+        'odds': [1.5, 2.25, None]
+    })
+    pd.testing.assert_frame_equal(parsed, expected_data)
+
+
+def test_csv_parser_c_engine_invalid_dtype_value():
+    content = b'team,goals\nA,1\nB,two\n'
+    parser = CSVDataParser(engine='c', dtype={'goals': 'Int16'})
+    with pytest.raises(DataParserError):
+        parser.parse(content)
+
+
+def test_csv_parser_invalid_options():
+    with pytest.raises(ValueError):
+        CSVDataParser(engine='arrow')
+    with pytest.raises(ValueError):
+        CSVDataParser(dtype={'goals': 'Int16'})
+
+
+@pytest.mark.parametrize('engine', CSVDataParser.ENGINES)
+@pytest.mark.parametrize('header', [True, False])
+def test_csv_parser_parse_iter(engine, header):
+    content = (FIXTURES / 'E0.csv').read_bytes()
+    parser = CSVDataParser(header=header, encoding='unicode_escape', engine=engine)
+    chunks = list(parser.parse_iter(content, chunk_size=5))
+    assert [len(chunk) for chunk in chunks] == [5, 5, 3 - int(header)]
+    pd.testing.assert_frame_equal(pd.concat(chunks), parser.parse(content))
+
+
+def test_csv_parser_parse_iter_small_blocks(monkeypatch):
+    monkeypatch.setattr(CSVDataParser, '_BLOCK_SIZE', 4)
+    content = b'col1,col2\r\n1,4\r\n,\r\n2,5\r\n3\r\n'
+    expected_data = pd.DataFrame({'col1': ['1', '2', '3'], 'col2': ['4', '5', None]})
+    chunks = list(CSVDataParser().parse_iter(content, chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [1, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected_data)
+
+
+@pytest.mark.parametrize('engine', CSVDataParser.ENGINES)
+def test_csv_parser_parse_iter_no_rows(engine):
+    chunks = list(CSVDataParser(engine=engine).parse_iter(b'col1,col2\n,\n'))
+    assert len(chunks) == 1
+    assert chunks[0].empty
+    assert list(chunks[0].columns) == ['col1', 'col2']
+
+
+def test_csv_parser_parse_iter_errors():
+    with pytest.raises(DataParserError):
+        next(CSVDataParser().parse_iter(b''))
+
+
+def test_data_parser_parse_iter_default():
+    class SingleParser(DataParser):
+        def parse(self, content):
+            return pd.DataFrame({'col1': [content]})
+
+    chunks = list(SingleParser().parse_iter(b'data', chunk_size=1))
+    assert len(chunks) == 1
+    pd.testing.assert_frame_equal(chunks[0], pd.DataFrame({'col1': [b'data']}))
+
+
+def test_data_parser_parse_iter_default_chunks():
+    class RowsParser(DataParser):
+        def parse(self, content):
+            return pd.DataFrame({'col1': list(content)})
+
+    chunks = list(RowsParser().parse_iter(b'abcde', chunk_size=2))
+    assert [chunk['col1'].tolist() for chunk in chunks] == [[97, 98], [99, 100], [101]]
+    assert [len(chunk) for chunk in RowsParser().parse_iter(b'', chunk_size=2)] == [0]
@@ -1,9 +1,18 @@
 # pylint: skip-file
+import multiprocessing
+from pathlib import Path
 import pytest
+import yaml
 from datetime import datetime
 import pandas as pd
-from etl.date_utils import generate_seasons, generate_dates, parse_dataframe_dates
+from etl.date_utils import DateFormatCache, generate_seasons, generate_dates, parse_dataframe_dates
 from etl.exceptions import DataParserError  # Replace 'your_module_name' with the actual module name where the code resides
+from etl.files import File
+from etl.data_parser import CSVDataParser
+from footballdata_co_uk.pipelines import get_transform_pipeline
+
+
+CONFIG_PATH = Path(__file__).parents[2] / 'footballdata_co_uk/configuration/footballdata_co_uk.yaml'
 
 
 @pytest.fixture
@@ -44,3 +53,92 @@ def test_parse_dataframe_dates_with_no_matching_date_format(sample_data):
     date_formats = ['%d-%m-%Y', '%Y/%m/%d']
     with pytest.raises(DataParserError):
         parse_dataframe_dates(sample_data, 'date_col', date_formats)
+
+
+def test_parse_dataframe_dates_with_mixed_date_formats():
+    data = pd.DataFrame({'date_col': ['01/02/21', '1/2/2021', None, '28/02/2021']})
+    parsed_data = parse_dataframe_dates(data, 'date_col', ['%d/%m/%y', '%d/%m/%Y'])
+    expected = pd.Series(
+        [pd.Timestamp('2021-02-01'), pd.Timestamp('2021-02-01'), pd.NaT, pd.Timestamp('2021-02-28')], name='date_col')
+    pd.testing.assert_series_equal(parsed_data['date_col'], expected)
+    assert data['date_col'][0] == '01/02/21'
+
+
+def test_parse_dataframe_dates_lists_unparseable_rows():
+    data = pd.DataFrame({'date_col': ['01/02/21', '32/01/21', '1/2/2021', 'n/a']}, index=[10, 11, 12, 13])
+    with pytest.raises(DataParserError, match=r"2 dates in date_col .*: 11: '32/01/21', 13: 'n/a'$"):
+        parse_dataframe_dates(data, 'date_col', ['%d/%m/%y', '%d/%m/%Y'])
+
+
+def test_parse_dataframe_dates_blank_dates():
+    data = pd.DataFrame({'date_col': ['01/02/21', '', '  ', None]})
+    parsed_data = parse_dataframe_dates(data, 'date_col', ['%d/%m/%y', '%d/%m/%Y'])
+
+    expected = pd.Series([pd.Timestamp('2021-02-01'), pd.NaT, pd.NaT, pd.NaT], name='date_col')
+    pd.testing.assert_series_equal(parsed_data['date_col'], expected)
+
+
+def test_transform_pipeline_drops_blank_dates():
+    config = yaml.safe_load(CONFIG_PATH.read_text(encoding='utf-8'))
+    content = b'Div,Date,HomeTeam,AwayTeam,FTHG,FTAG\nE0,12/08/23,A,B,1,2\nE0,,C,D,,\n'
+    data = CSVDataParser(encoding='unicode_escape', engine='c').parse(content)
+
+    transformed = get_transform_pipeline(config['preprocessing'], 'E0').apply(data)
+
+    assert transformed['home_team'].tolist() == ['A']
+    assert transformed['match_date'].tolist() == [pd.Timestamp('2023-08-12')]
+
+
+def test_parse_dataframe_dates_format_cache(tmp_path):
+    cache = DateFormatCache(File(tmp_path / 'formats.json'))
+    data = pd.DataFrame({'date_col': ['01/02/2021', '02/02/2021', '03/02/21']})
+    parse_dataframe_dates(data, 'date_col', ['%d/%m/%y', '%d/%m/%Y'], source='E0', format_cache=cache)
+    assert cache.get('E0') == ['%d/%m/%Y', '%d/%m/%y']
+    assert DateFormatCache(File(tmp_path / 'formats.json')).get('E0') == ['%d/%m/%Y', '%d/%m/%y']
+    assert cache.get('E1') == []
+
+
+def test_parse_dataframe_dates_tries_cached_format_first(tmp_path, monkeypatch):
+    cache = DateFormatCache(File(tmp_path / 'formats.json'))
+    cache.update('E0', ['%d/%m/%Y'])
+    tried = []
+    to_datetime = pd.to_datetime
+    monkeypatch.setattr(pd, 'to_datetime', lambda values, format, **kwargs: tried.append(format) or to_datetime(
+        values, format=format, **kwargs))
+    data = pd.DataFrame({'date_col': ['01/02/2021', '02/02/2021']})
+    parse_dataframe_dates(data, 'date_col', ['%d/%m/%y', '%d/%m/%Y'], source='E0', format_cache=cache)
+    assert tried == ['%d/%m/%Y']
+
+
+def test_parse_dataframe_dates_with_non_string_values():
+    data = pd.DataFrame({'date_col': ['01/02/21', 3]})
+    with pytest.raises(DataParserError, match="1 dates in date_col .*: 1: 3$"):
+        parse_dataframe_dates(data, 'date_col', ['%d/%m/%y'])
+
+
+def test_parse_dataframe_dates_with_copy_on_write():
+    data = pd.DataFrame({'date_col': ['01/02/21', '1/2/2021']})
+    with pd.option_context('mode.copy_on_write', True):
+        parsed_data = parse_dataframe_dates(data, 'date_col', ['%d/%m/%y', '%d/%m/%Y'])
+    assert (parsed_data['date_col'] == pd.Timestamp('2021-02-01')).all()
+
+
+def update_formats(path, worker, updates):
+    cache = DateFormatCache(File(path))
+    for i in range(updates):
+        cache.update(f'{worker}-{i}', ['%d/%m/%Y'])
+
+
+def test_date_format_cache_concurrent_updates(tmp_path):
+    context = multiprocessing.get_context('fork')
+    processes = [
+        context.Process(target=update_formats, args=(tmp_path / 'formats.json', worker, 10)) for worker in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    cache = DateFormatCache(File(tmp_path / 'formats.json'))
+    assert all(process.exitcode == 0 for process in processes)
+    assert all(cache.get(f'{worker}-{i}') == ['%d/%m/%Y'] for worker in range(4) for i in range(10))
@@ -1,8 +1,13 @@
 # pylint: skip-file
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
 from unittest.mock import MagicMock, Mock, patch
 import pytest
 import requests
-from etl.downloader import APIDownloader
+from etl.downloader import APIDownloader, Downloader, create_session
+from etl.exceptions import ContentNotModified
+from etl.files import File
 
 
 @pytest.fixture
@@ -34,6 +39,7 @@ def test_create_downloader():
 
 def test_download(mock_request):
     mock_file = MagicMock()
+    mock_file.exists.return_value = False
     downloader = APIDownloader(
         'GET',
         'http://test_url.com',
@@ -54,6 +60,7 @@ def test_download(mock_request):
 
 def test_download_fail(mock_request):
     mock_file = MagicMock()
+    mock_file.exists.return_value = False
     downloader = APIDownloader(
         'GET',
         'http://test_url.com',
@@ -69,3 +76,127 @@ def test_download_fail(mock_request):
 
     with pytest.raises(requests.exceptions.HTTPError) as err:
         content = downloader.download()
+
+
+def test_host():
+    downloader = APIDownloader('GET', 'https://test_url.com/path/file.csv', MagicMock())
+    assert downloader.host == 'test_url.com'
+
+
+def test_create_session():
+    session = create_session(pool_size=4)
+    adapter = session.get_adapter('https://test_url.com')
+    assert adapter._pool_maxsize == 4
+
+
+def test_download_stores_validators(mock_request, tmp_path):
+    file = File(tmp_path / 'E0.csv')
+    downloader = APIDownloader('GET', 'http://test_url.com', file)
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.content = b'Mock data content'
+    mock_response.headers = {'ETag': '"abc"', 'Last-Modified': 'Sun, 01 Sep 2024 10:00:00 GMT'}
+    mock_request.return_value = mock_response
+
+    downloader.download()
+    assert downloader.state == {}
+
+    downloader.commit()
+    assert File(tmp_path / 'E0.csv.state.json').exists()
+    assert APIDownloader('GET', 'http://test_url.com', file).state == {
+        'etag': '"abc"', 'last_modified': 'Sun, 01 Sep 2024 10:00:00 GMT', 'content_length': None
+    }
+
+
+def test_download_conditional_request(mock_request, tmp_path):
+    file = File(tmp_path / 'E0.csv')
+    file.save(b'Mock data content')
+    file.sidecar('.state.json').save(b'{"etag": "\\"abc\\"", "last_modified": "Sun, 01 Sep 2024 10:00:00 GMT"}')
+    downloader = APIDownloader('GET', 'http://test_url.com', file, headers={'header': 'test'})
+    mock_response = Mock()
+    mock_response.status_code = 304
+    mock_request.return_value = mock_response
+
+    with pytest.raises(ContentNotModified):
+        downloader.download()
+
+    assert mock_request.call_args.kwargs['headers'] == {
+        'header': 'test',
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': 'Sun, 01 Sep 2024 10:00:00 GMT'
+    }
+
+
+def test_download_not_conditional_without_file(mock_request, tmp_path):
+    file = File(tmp_path / 'E0.csv')
+    file.sidecar('.state.json').save(b'{"etag": "\\"abc\\""}')
+    downloader = APIDownloader('GET', 'http://test_url.com', file)
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.content = b'Mock data content'
+    mock_request.return_value = mock_response
+
+    assert downloader.download() == b'Mock data content'
+    assert 'headers' not in mock_request.call_args.kwargs
+
+
+@pytest.fixture
+def gzip_server():
+    body = b'col1,col2\n' + b'1,2\n' * 10000
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            payload = gzip.compress(body)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('ETag', '"abc"')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', body
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_stream(gzip_server, tmp_path):
+    url, body = gzip_server
+    file = File(tmp_path / 'E0.csv')
+    downloader = APIDownloader('GET', f'{url}/E0.csv', file)
+
+    chunks = list(downloader.download_stream(chunk_size=1024))
+
+    assert all(len(chunk) <= 1024 for chunk in chunks)
+    assert b''.join(chunks) == body
+    downloader.commit()
+    assert downloader.state['etag'] == '"abc"'
+
+
+def test_download_stream_default(tmp_path):
+    class ContentDownloader(Downloader):
+        def download(self, session=None):
+            return self.content
+
+    downloader = ContentDownloader(File(tmp_path / 'E0.csv'), None, None, None)
+    downloader.content = b'example data'
+    assert list(downloader.download_stream(chunk_size=5)) == [b'examp', b'le da', b'ta']
+    downloader.content = b''
+    assert list(downloader.download_stream(chunk_size=5)) == [b'']
+
+
+def test_download_stream_fail(mock_request):
+    mock_file = MagicMock()
+    mock_file.exists.return_value = False
+    downloader = APIDownloader('GET', 'http://test_url.com', mock_file)
+    mock_response = Mock()
+    mock_response.raise_for_status.side_effect = requests.HTTPError("404 Client Error")
+    mock_request.return_value = mock_response
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        downloader.download_stream()
+    assert mock_request.call_args.kwargs['stream'] == True
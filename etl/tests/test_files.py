@@ -1,4 +1,7 @@
 # pylint: skip-file
+import hashlib
+import mmap
+import os
 from pathlib import Path
 from unittest.mock import mock_open, patch
 import pytest
@@ -32,14 +35,19 @@ def test_exists(mock_file: File) -> None:
         assert mock_file.exists()
 
 
-def test_save(mock_file):
-    with patch('etl.files.open', mock_open(), create=False) as m:
-        with patch('pathlib.Path.mkdir'):
-            mock_file.save('example data', mode='wb')
+def test_save(tmp_path):
+    file = File(tmp_path / 'folder' / 'file.csv')
+    file.save(b'example data', mode='wb')
 
-    m.assert_called_once_with(Path('folder/file.csv'), 'wb', encoding=None)
-    handle = m()
-    handle.write.assert_called_once_with('example data')
+    assert (tmp_path / 'folder' / 'file.csv').read_bytes() == b'example data'
+    assert os.listdir(tmp_path / 'folder') == ['file.csv']
+
+
+def test_save_str(tmp_path):
+    file = File(tmp_path / 'file.csv')
+    file.save('example data', mode='w', encoding='utf-8')
+
+    assert (tmp_path / 'file.csv').read_text(encoding='utf-8') == 'example data'
 
 
 def test_read(mock_file):
@@ -55,13 +63,15 @@ def test_invalid_read_mode(mock_file):
         mock_file.read('r')
 
 
-def test_save_failure(mock_file):
-    with patch('etl.files.open', mock_open(), create=False) as m:
-        with patch('pathlib.Path.mkdir'):
-            handle = m()
-            handle.write.side_effect = IOError()
-            with pytest.raises(IOError):
-                mock_file.save('example data')
+def test_save_failure(tmp_path):
+    file = File(tmp_path / 'file.csv')
+    file.save(b'old data')
+    with patch('etl.files.os.fsync', side_effect=IOError()):
+        with pytest.raises(IOError):
+            file.save(b'example data')
+
+    assert file.read() == b'old data'
+    assert os.listdir(tmp_path) == ['file.csv']
 
 
 def test_read_failure(mock_file):
@@ -76,3 +86,131 @@ def test_read_no_file(mock_file):
     with pytest.raises(FileNotFoundError):
         mock_file.read()
 
+
+
+def test_sidecar(mock_file):
+    sidecar = mock_file.sidecar('.state.json')
+    assert sidecar.path == Path('folder/file.csv.state.json')
+
+
+def test_save_stream(tmp_path):
+    file = File(tmp_path / 'file.csv')
+    size = file.save_stream(iter([b'example ', b'data']))
+
+    assert size == 12
+    assert file.read() == b'example data'
+
+
+def test_save_stream_digest(tmp_path):
+    file = File(tmp_path / 'file.csv', compression='zstd')
+    digest = hashlib.sha256()
+    file.save_stream(iter([b'example ', b'data']), digest)
+
+    assert digest.hexdigest() == hashlib.sha256(b'example data').hexdigest()
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='POSIX file modes')
+@pytest.mark.parametrize('compression', [None, 'zstd'])
+def test_save_file_mode(tmp_path, compression):
+    file = File(tmp_path / 'file.csv', compression=compression)
+    with patch('etl.files._UMASK', 0o022):
+        file.save(b'example data')
+    assert os.stat(file.path).st_mode & 0o777 == 0o644
+
+    os.chmod(file.path, 0o640)
+    file.save_stream(iter([b'new data']))
+    assert os.stat(file.path).st_mode & 0o777 == 0o640
+
+
+def test_save_stream_interrupted(tmp_path):
+    def chunks():
+        yield b'partial '
+        raise IOError('connection lost')
+
+    file = File(tmp_path / 'file.csv')
+    file.save(b'old data')
+    with pytest.raises(IOError):
+        file.save_stream(chunks())
+
+    assert file.read() == b'old data'
+    assert os.listdir(tmp_path) == ['file.csv']
+
+
+def test_read_chunks(tmp_path):
+    file = File(tmp_path / 'file.csv')
+    file.save(b'example data')
+
+    assert list(file.read_chunks(chunk_size=5)) == [b'examp', b'le da', b'ta']
+
+
+def test_read_memory_map(tmp_path):
+    file = File(tmp_path / 'file.csv')
+    file.save(b'example data')
+
+    content = file.read(memory_map=True)
+    assert isinstance(content, mmap.mmap)
+    assert content[:] == b'example data'
+
+
+def test_read_memory_map_empty_file(tmp_path):
+    file = File(tmp_path / 'file.csv')
+    file.save(b'')
+
+    assert file.read(memory_map=True) == b''
+
+
+@pytest.mark.parametrize('compression, suffix', [('gzip', '.gz'), ('zstd', '.zst')])
+def test_compressed_file(tmp_path, compression, suffix):
+    file = File(tmp_path / 'file.csv', compression=compression)
+    file.save(b'example data')
+
+    assert file.path == tmp_path / f'file.csv{suffix}'
+    assert file.exists()
+    assert os.listdir(tmp_path) == [f'file.csv{suffix}']
+    assert (tmp_path / f'file.csv{suffix}').read_bytes() != b'example data'
+    assert file.read() == b'example data'
+    assert file.read(memory_map=True) == b'example data'
+    assert list(file.read_chunks(chunk_size=5)) == [b'examp', b'le da', b'ta']
+    assert File(tmp_path / f'file.csv{suffix}').read() == b'example data'
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+def test_compressed_save_stream(tmp_path, compression):
+    file = File(tmp_path / 'file.csv', compression=compression)
+    size = file.save_stream(iter([b'example ', b'data']))
+
+    assert size == 12
+    assert file.read() == b'example data'
+
+
+def test_compressed_save_str(tmp_path):
+    file = File(tmp_path / 'file.csv.gz')
+    file.save('example data', mode='w', encoding='utf-8')
+
+    assert file.compression == 'gzip'
+    assert file.read() == b'example data'
+
+
+def test_compressed_file_invalid_compression():
+    with pytest.raises(ValueError):
+        File('file.csv', compression='bz2')
+    with pytest.raises(ValueError):
+        File('file.csv.gz', compression='zstd')
+
+
+def test_compressed_file_uncompressed_fallback(tmp_path):
+    File(tmp_path / 'file.csv').save(b'old data')
+    file = File(tmp_path / 'file.csv', compression='zstd')
+
+    assert file.exists()
+    assert file.read() == b'old data'
+    assert list(file.read_chunks()) == [b'old data']
+
+    file.save(b'new data')
+    assert os.listdir(tmp_path) == ['file.csv.zst']
+    assert file.read() == b'new data'
+
+
+def test_compressed_file_sidecar():
+    assert File('folder/file.csv', compression='zstd').sidecar('.state.json').path == \
+        Path('folder/file.csv.state.json')
@@ -0,0 +1,318 @@
+# pylint: skip-file
+import hashlib
+import sqlite3
+from unittest.mock import MagicMock, patch
+import pandas as pd
+import pytest
+import requests
+
+from etl.download_strategy import AppendStrategy, ContentHashStrategy, ReplaceOnMetaFlagStrategy, ReplaceStrategy
+from etl.data_parser import CSVDataParser
+from etl.downloader import APIDownloader
+from etl.exceptions import ContentNotModified
+from etl.files import File
+from etl.manifest import Manifest, ManifestEntry, MissingEntry
+from etl.process import ETL
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = Manifest(tmp_path / 'manifest.sqlite3', run_id='run-1')
+    yield manifest
+    manifest.close()
+
+
+def test_get_missing(manifest):
+    assert manifest.get('http://test_url.com/E0.csv') is None
+
+
+def test_record_download(manifest):
+    manifest.record_download('http://test_url.com/E0.csv', 'data/E0.csv', 'abc', 10)
+    entry = manifest.get('http://test_url.com/E0.csv')
+
+    assert isinstance(entry, ManifestEntry)
+    assert (entry.path, entry.sha256, entry.size) == ('data/E0.csv', 'abc', 10)
+    assert entry.fetched_at is not None
+    assert entry.loaded_at is None and entry.loaded_sha256 is None
+
+
+def test_record_loads(manifest):
+    manifest.record_download('http://test_url.com/E0.csv', 'data/E0.csv', 'abc', 10)
+    manifest.record_loads([('http://test_url.com/E0.csv', 'abc', 5), ('http://test_url.com/E1.csv', None, 3)])
+
+    entry = manifest.get('http://test_url.com/E0.csv')
+    assert (entry.sha256, entry.loaded_sha256, entry.rows) == ('abc', 'abc', 5)
+    assert manifest.get('http://test_url.com/E1.csv').rows == 3
+
+
+def test_record_download_keeps_load(manifest):
+    manifest.record_loads([('http://test_url.com/E0.csv', 'abc', 5)])
+    manifest.record_download('http://test_url.com/E0.csv', 'data/E0.csv', 'def', 12)
+
+    entry = manifest.get('http://test_url.com/E0.csv')
+    assert (entry.sha256, entry.loaded_sha256, entry.rows) == ('def', 'abc', 5)
+
+
+def test_persistence(tmp_path):
+    manifest = Manifest(tmp_path / 'manifest.sqlite3')
+    manifest.record_download('http://test_url.com/E0.csv', 'data/E0.csv', 'abc', 10)
+    manifest.close()
+
+    reopened = Manifest(tmp_path / 'manifest.sqlite3')
+    assert reopened.get('http://test_url.com/E0.csv').sha256 == 'abc'
+    reopened.close()
+
+
+def test_history_and_runs(tmp_path):
+    first = Manifest(tmp_path / 'manifest.sqlite3', run_id='run-1')
+    first.record_download('http://test_url.com/E0.csv', 'data/E0.csv', 'abc', 10)
+    first.record_loads([('http://test_url.com/E0.csv', 'abc', 5)])
+    first.close()
+    second = Manifest(tmp_path / 'manifest.sqlite3', run_id='run-2')
+    second.record_download('http://test_url.com/E1.csv', 'data/E1.csv', 'def', 20)
+
+    assert [event['event'] for event in second.history('http://test_url.com/E0.csv')] == ['load', 'download']
+    assert len(second.history()) == 3
+    assert len(second.history(limit=1)) == 1
+    runs = {run['run_id']: run for run in second.runs()}
+    assert (runs['run-1']['downloads'], runs['run-1']['bytes'], runs['run-1']['loads'], runs['run-1']['rows']) \
+        == (1, 10, 1, 5)
+    assert (runs['run-2']['downloads'], runs['run-2']['loads']) == (1, 0)
+    second.close()
+
+
+def test_record_loads_rolls_back(manifest):
+    with pytest.raises(sqlite3.ProgrammingError):
+        manifest.record_loads([('http://test_url.com/E0.csv', 'abc', 5), ('http://test_url.com/E1.csv', 'def', object())])
+
+    assert manifest.get('http://test_url.com/E0.csv') is None
+    assert manifest.history() == []
+
+
+def test_strategies_check_manifest(manifest, tmp_path):
+    obj = APIDownloader('GET', 'http://test_url.com/E0.csv', File(tmp_path / 'E0.csv'), meta={'replace': False})
+
+    assert AppendStrategy(manifest).is_download_required(obj) == True
+    assert ReplaceOnMetaFlagStrategy(manifest).is_download_required(obj) == True
+    manifest.record_download(obj.key, obj.file.path, 'abc', 10)
+    assert AppendStrategy(manifest).is_download_required(obj) == False
+    assert ReplaceOnMetaFlagStrategy(manifest).is_download_required(obj) == False
+    assert ReplaceStrategy(manifest).is_download_required(obj) == True
+
+
+def test_content_hash_strategy_manifest(manifest, tmp_path):
+    obj = APIDownloader('GET', 'http://test_url.com/E0.csv', File(tmp_path / 'E0.csv'))
+    strategy = ContentHashStrategy(ReplaceStrategy(manifest), manifest)
+    digest = hashlib.sha256(b'content').hexdigest()
+
+    manifest.record_download(obj.key, obj.file.path, digest, 7)
+    assert strategy.is_load_required(obj, b'content') == True
+    manifest.record_loads([(obj.key, digest, 1)])
+    assert strategy.is_load_required(obj, b'content') == False
+    assert strategy.is_load_required(obj, b'changed content') == True
+
+
+def test_etl_records_downloads_and_loads(manifest, tmp_path):
+    obj = APIDownloader('GET', 'http://test_url.com/E0.csv', File(tmp_path / 'E0.csv'))
+    obj.download = MagicMock(return_value=b'content')
+    etl = ETL(manifest=manifest)
+
+    etl.extract(obj)
+    entry = manifest.get(obj.key)
+    assert (entry.sha256, entry.size, entry.loaded_at) == (hashlib.sha256(b'content').hexdigest(), 7, None)
+
+    data = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
+    etl.load((obj, data), MagicMock())
+    etl.load((obj, data.iloc[:1]), MagicMock())
+    assert manifest.get(obj.key).loaded_at is None
+    etl.commit()
+
+    entry = manifest.get(obj.key)
+    assert (entry.loaded_sha256, entry.rows) == (entry.sha256, 3)
+    assert [event['event'] for event in manifest.history(obj.key)] == ['load', 'download']
+
+
+def test_etl_records_fingerprinted_loads(manifest, tmp_path):
+    obj = APIDownloader('GET', 'http://test_url.com/E0.csv', File(tmp_path / 'E0.csv'))
+    obj.download = MagicMock(return_value=b'content')
+    etl = ETL(manifest=manifest)
+    strategy = ContentHashStrategy(ReplaceStrategy(manifest), manifest, fingerprint='transform v1')
+
+    etl.extract(obj, strategy=strategy)
+    etl.load((obj, pd.DataFrame({'col1': [1]})), MagicMock())
+    etl.commit()
+    entry = manifest.get(obj.key)
+    assert entry.sha256 == hashlib.sha256(b'content').hexdigest()
+    assert entry.loaded_sha256 == strategy.load_digest(obj, entry.sha256) != entry.sha256
+
+    with pytest.raises(ContentNotModified):
+        etl.extract(obj, strategy=strategy)
+    strategy.fingerprint = 'transform v2'
+    etl.extract(obj, strategy=strategy)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_etl_hashes_content_once(manifest, tmp_path, stream):
+    obj = APIDownloader('GET', 'http://test_url.com/E0.csv', File(tmp_path / 'E0.csv', compression='zstd'))
+    obj.download = MagicMock(return_value=b'content')
+    obj.download_stream = MagicMock(return_value=iter([b'con', b'tent']))
+    etl = ETL(manifest=manifest, stream=stream)
+    strategy = ContentHashStrategy(ReplaceStrategy(manifest), manifest)
+
+    with patch.object(File, 'read_chunks', side_effect=AssertionError('content read again')):
+        etl.extract(obj, strategy=strategy)
+
+    assert manifest.get(obj.key).sha256 == hashlib.sha256(b'content').hexdigest()
+
+
+def test_record_missing(manifest):
+    manifest.record_missing('http://test_url.com/E0.csv', 404)
+    manifest.record_missing('http://test_url.com/E0.csv', 410)
+
+    entry = manifest.get_missing('http://test_url.com/E0.csv')
+    assert (entry.status, entry.misses) == (410, 2)
+    assert entry.first_seen <= entry.checked_at
+    assert manifest.history('http://test_url.com/E0.csv')[0]['event'] == 'missing'
+
+
+def test_download_clears_missing(manifest):
+    manifest.record_missing('http://test_url.com/E0.csv', 404)
+    manifest.record_download('http://test_url.com/E0.csv', 'data/E0.csv', 'abc', 10)
+
+    assert manifest.get_missing('http://test_url.com/E0.csv') is None
+
+
+def test_missing_entry_expires_at():
+    entry = MissingEntry('http://test_url.com/E0.csv', 404, 0.0, 100.0, 1)
+
+    assert entry.expires_at(10, 1000) == 110
+    assert MissingEntry('http://test_url.com/E0.csv', 404, 0.0, 100.0, 3).expires_at(10, 1000) == 140
+    assert MissingEntry('http://test_url.com/E0.csv', 404, 0.0, 100.0, 20).expires_at(10, 1000) == 1100
+
+
+def missing_object(tmp_path, status):
+    obj = APIDownloader('GET', 'http://test_url.com/E0.csv', File(tmp_path / 'E0.csv'))
+    response = requests.Response()
+    response.status_code = status
+    obj.download = MagicMock(side_effect=requests.exceptions.HTTPError(response=response))
+    return obj
+
+
+def test_etl_skips_known_missing(manifest, tmp_path):
+    obj = missing_object(tmp_path, 404)
+    etl = ETL(manifest=manifest, missing_ttl=3600)
+
+    assert list(etl.extract_concurrent([obj], ignore_exceptions=(requests.exceptions.HTTPError,))) == []
+    assert manifest.get_missing(obj.key).misses == 1
+    assert list(etl.extract_concurrent([obj], ignore_exceptions=(requests.exceptions.HTTPError,))) == []
+    assert list(etl.process_queue([obj])) == []
+    obj.download.assert_called_once()
+
+
+def test_etl_requests_expired_missing(manifest, tmp_path):
+    obj = missing_object(tmp_path, 404)
+    manifest.record_missing(obj.key, 404)
+    etl = ETL(manifest=manifest, missing_ttl=0)
+
+    assert list(etl.extract_concurrent([obj], ignore_exceptions=(requests.exceptions.HTTPError,))) == []
+    obj.download.assert_called_once()
+    assert manifest.get_missing(obj.key).misses == 2
+
+
+def test_etl_refresh_missing(manifest, tmp_path):
+    obj = APIDownloader('GET', 'http://test_url.com/E0.csv', File(tmp_path / 'E0.csv'))
+    obj.download = MagicMock(return_value=b'content')
+    manifest.record_missing(obj.key, 404)
+    etl = ETL(manifest=manifest, missing_ttl=3600, refresh_missing=True)
+
+    assert list(etl.extract_concurrent([obj])) == [obj]
+    assert manifest.get_missing(obj.key) is None
+
+
+def test_etl_does_not_cache_other_errors(manifest, tmp_path):
+    obj = missing_object(tmp_path, 500)
+    etl = ETL(manifest=manifest, missing_ttl=3600)
+
+    assert list(etl.extract_concurrent([obj], ignore_exceptions=(requests.exceptions.HTTPError,))) == []
+    assert manifest.get_missing(obj.key) is None
+
+
+def test_checkpoints(tmp_path):
+    first = Manifest(tmp_path / 'manifest.sqlite3', run_id='run-1')
+    first.record_checkpoint('http://test_url.com/E1.csv', 'extracted')
+    first.record_checkpoint('http://test_url.com/E0.csv', 'unchanged')
+    first.record_checkpoint('http://test_url.com/E1.csv', 'loaded')
+    first.record_checkpoint('http://test_url.com/E2.csv', 'loaded')
+    first.record_loads([('http://test_url.com/E2.csv', 'abc', 5)])
+    second = Manifest(tmp_path / 'manifest.sqlite3', run_id='run-2')
+
+    assert list(first.checkpoints().items()) == [
+        ('http://test_url.com/E1.csv', 'loaded'),
+        ('http://test_url.com/E0.csv', 'unchanged'),
+        ('http://test_url.com/E2.csv', 'committed')
+    ]
+    assert second.checkpoints() == {}
+    assert second.checkpoints('run-1') == first.checkpoints()
+    first.close()
+    second.close()
+
+
+def test_etl_records_checkpoints(manifest, tmp_path):
+    obj = APIDownloader('GET', 'http://test_url.com/E0.csv', File(tmp_path / 'E0.csv'))
+    obj.download = MagicMock(return_value=b'content')
+    unchanged = APIDownloader('GET', 'http://test_url.com/E1.csv', File(tmp_path / 'E1.csv'))
+    unchanged.download = MagicMock(side_effect=ContentNotModified('not modified'))
+    etl = ETL(manifest=manifest)
+
+    etl.extract(obj)
+    with pytest.raises(ContentNotModified):
+        etl.extract(unchanged)
+    assert manifest.checkpoints() == {obj.key: 'extracted', unchanged.key: 'unchanged'}
+    etl.load((obj, pd.DataFrame({'col1': [1]})), MagicMock())
+    assert manifest.checkpoints()[obj.key] == 'loaded'
+    etl.commit()
+    assert manifest.checkpoints()[obj.key] == 'committed'
+
+
+def test_etl_resumes_run(tmp_path):
+    objects = []
+    for league in ['E0', 'E1', 'E2', 'E3']:
+        obj = APIDownloader('GET', f'http://test_url.com/{league}.csv', File(tmp_path / f'{league}.csv'))
+        obj.download = MagicMock(return_value=b'content')
+        objects.append(obj)
+    stopped = Manifest(tmp_path / 'manifest.sqlite3', run_id='run-1')
+    stopped.record_checkpoint(objects[0].key, 'loaded')
+    stopped.record_loads([(objects[0].key, 'abc', 1)])
+    stopped.record_checkpoint(objects[1].key, 'unchanged')
+    stopped.record_checkpoint(objects[2].key, 'loaded')
+    stopped.close()
+
+    restarted = Manifest(tmp_path / 'manifest.sqlite3', run_id='run-1')
+    extracted = list(ETL(manifest=restarted).extract_concurrent(objects))
+    assert sorted(obj.key for obj in extracted) == [objects[2].key, objects[3].key]
+    objects[0].download.assert_not_called()
+    objects[1].download.assert_not_called()
+    restarted.close()
+
+    new_run = Manifest(tmp_path / 'manifest.sqlite3', run_id='run-2')
+    assert len(list(ETL(manifest=new_run).process_queue(objects, strategy=ReplaceStrategy()))) == 4
+    new_run.close()
+
+
+def test_run_commits_every_objects(manifest, tmp_path):
+    objects = []
+    for league in ['E0', 'E1', 'E2']:
+        obj = APIDownloader(
+            'GET', f'http://test_url.com/{league}.csv', File(tmp_path / f'{league}.csv'),
+            table='test_table', schema='test_schema'
+        )
+        obj.download = MagicMock(return_value=b'col1,col2\n1,a\n')
+        objects.append(obj)
+    session = MagicMock()
+    etl = ETL(manifest=manifest)
+
+    etl.run(objects, session, CSVDataParser(), workers=1, commit_every=2)
+
+    session.commit.assert_called_once()
+    assert sorted(manifest.checkpoints().values()) == ['committed', 'committed', 'loaded']
+    assert len(etl._loaded) == 1
@@ -0,0 +1,152 @@
+# pylint: skip-file
+import json
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+
+from etl.data_parser import CSVDataParser
+from etl.data_quality import DataQualityValidator
+from etl.downloader import Downloader
+from etl.files import File
+from etl.metrics import METRICS, Measurement, Metrics, StageMetrics
+from etl.pacing import FixedPacer
+from etl.process import ETL, LoadResult
+from etl.transform import TransformPipeline
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def test_measure():
+    metrics = Metrics()
+    with metrics.measure('parse', bytes=10) as measurement:
+        measurement.rows_out = 3
+    with metrics.measure('parse', 'obj') as measurement:
+        measurement.rows_out = 2
+
+    assert metrics.stages['parse'] == StageMetrics(
+        calls=2, seconds=metrics.stages['parse'].seconds, bytes=10, rows_out=5)
+    assert [span.name for span in metrics.spans] == ['obj']
+
+
+def test_measure_error():
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.measure('load', 'obj'):
+            raise ValueError('fatal')
+
+    assert metrics.stages['load'].errors == 1
+    assert metrics.spans[0].error == 'ValueError: fatal'
+
+
+def test_follow():
+    metrics = Metrics()
+    with metrics.measure('transform', 'obj') as measurement:
+        chunks = metrics.follow(measurement, iter([pd.DataFrame({'a': [1, 2]}), pd.DataFrame({'a': [3]})]))
+    assert metrics.stages == {}
+
+    assert len(list(chunks)) == 2
+    assert metrics.stages['transform'].calls == 1
+    assert metrics.stages['transform'].rows_out == 3
+
+
+def test_follow_error():
+    def chunks():
+        yield pd.DataFrame({'a': [1]})
+        raise ValueError('fatal')
+
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        list(metrics.follow(Measurement('transform', 'obj'), chunks()))
+
+    assert metrics.stages['transform'] == StageMetrics(
+        calls=1, errors=1, seconds=metrics.stages['transform'].seconds, rows_out=1)
+
+
+def test_drain_merge():
+    worker = Metrics()
+    with worker.measure('transform', 'obj', rows_out=2):
+        pass
+    metrics = Metrics()
+    with metrics.measure('transform', rows_out=1):
+        pass
+
+    metrics.merge(*worker.drain())
+
+    assert worker.stages == {} and worker.spans == []
+    assert metrics.stages['transform'].calls == 2
+    assert metrics.stages['transform'].rows_out == 3
+    assert [span.name for span in metrics.spans] == ['obj']
+
+
+def test_write_summary(tmp_path):
+    metrics = Metrics()
+    with metrics.measure('load', 'obj', rows_in=2):
+        pass
+    file = File(tmp_path / 'summary.json')
+    metrics.write_summary(file, report={'inserted': 2})
+
+    summary = json.loads(file.read())
+    assert summary['report'] == {'inserted': 2}
+    assert summary['stages']['load']['rows_in'] == 2
+    assert summary['spans'][0]['name'] == 'obj'
+    assert '_deferred' not in summary['spans'][0]
+
+
+def test_write_textfile(tmp_path):
+    metrics = Metrics()
+    with metrics.measure('extract', 'obj', bytes=100, retries=1):
+        pass
+    file = File(tmp_path / 'etl.prom')
+    metrics.write_textfile(file, job='seasonal')
+
+    lines = file.read().decode().splitlines()
+    assert 'etl_stage_bytes{job="seasonal",stage="extract"} 100' in lines
+    assert 'etl_stage_retries{job="seasonal",stage="extract"} 1' in lines
+    assert '# TYPE etl_stage_calls gauge' in lines
+    assert any(line.startswith('etl_last_run_duration_seconds{job="seasonal"} ') for line in lines)
+
+
+def test_parse_validate_pipeline_metrics():
+    data = CSVDataParser().parse(b'a,b\n1,2\n3,4\n')
+    data = TransformPipeline().add_operation(pd.DataFrame.dropna).apply(data)
+    DataQualityValidator().validate(data)
+
+    assert METRICS.stages['parse'].bytes == 12
+    assert METRICS.stages['parse'].rows_out == 2
+    assert METRICS.stages['pipeline'].rows_in == 2
+    assert METRICS.stages['pipeline.DataFrame.dropna'].calls == 1
+    assert METRICS.stages['validate'].rows_in == 2
+
+
+def test_parse_iter_metrics():
+    chunks = CSVDataParser().parse_iter(b'a,b\n1,2\n3,4\n5,6\n', chunk_size=2)
+    assert 'parse' not in METRICS.stages
+
+    assert len(list(chunks)) == 2
+    assert METRICS.stages['parse'] == StageMetrics(
+        calls=1, seconds=METRICS.stages['parse'].seconds, bytes=16, rows_out=3)
+
+
+def test_etl_metrics():
+    obj = MagicMock(spec=Downloader)
+    obj.file = MagicMock(spec=File)
+    obj.table, obj.schema, obj.content = 'table', 'schema', None
+    obj.download.side_effect = [ConnectionError('throttled'), b'a,b\n1,2\n3,4\n']
+    pacer = MagicMock(spec=FixedPacer)
+    pacer.is_retryable.return_value = True
+    etl = ETL(pacer=pacer, max_retries=1)
+    etl._upsert = MagicMock(return_value=LoadResult(inserted=1))
+
+    etl.load(etl.transform(etl.extract(obj), CSVDataParser(), chunk_size=1), MagicMock())
+
+    assert METRICS.stages['extract'].retries == 1
+    assert METRICS.stages['extract'].bytes == 12
+    assert METRICS.stages['transform'].rows_out == 2
+    assert METRICS.stages['load'].rows_in == 2
+    assert METRICS.stages['load'].rows_out == 2
+    assert [span.stage for span in METRICS.spans] == ['extract', 'transform', 'load']
@@ -0,0 +1,140 @@
+# pylint: skip-file
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from unittest.mock import MagicMock
+import pytest
+import requests
+
+from etl.downloader import APIDownloader
+from etl.pacing import AdaptivePacer, FixedPacer, parse_retry_after
+from etl.process import ETL
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def throttling_server():
+    state = {'requests': 0, 'throttled': 2}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state['requests'] += 1
+            if state['requests'] <= state['throttled']:
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            body = b'col1,col2\n1,2\n'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', state
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+
+
+def test_fixed_pacer(clock):
+    pacer = FixedPacer(3, clock=clock, sleep=clock.sleep)
+    pacer.acquire()
+    pacer.acquire()
+    clock.now += 5
+    pacer.acquire()
+    assert clock.sleeps == [3]
+
+
+def test_adaptive_pacer_rate_limit(clock):
+    pacer = AdaptivePacer(rate=2.0, burst=1, clock=clock, sleep=clock.sleep)
+    pacer.acquire()
+    pacer.acquire()
+    assert clock.sleeps == [0.5]
+
+
+def test_adaptive_pacer_increase(clock):
+    pacer = AdaptivePacer(rate=1.0, max_rate=1.15, increase=0.1, clock=clock, sleep=clock.sleep)
+    pacer.observe(200, 0.1)
+    assert pacer.rate == pytest.approx(1.1)
+    pacer.observe(304, 0.1)
+    assert pacer.rate == pytest.approx(1.15)
+
+
+def test_adaptive_pacer_decrease(clock):
+    pacer = AdaptivePacer(rate=1.0, min_rate=0.3, decrease=0.5, target_latency=1.0, clock=clock, sleep=clock.sleep)
+    pacer.observe(200, 2.0)
+    assert pacer.rate == 0.5
+    pacer.observe(503, 0.1)
+    assert pacer.rate == 0.3
+
+
+def test_adaptive_pacer_retry_after(clock):
+    pacer = AdaptivePacer(rate=1.0, clock=clock, sleep=clock.sleep)
+    pacer.observe(429, 0.1, retry_after=10)
+    pacer.acquire()
+    assert clock.sleeps == [10]
+
+
+def test_is_retryable():
+    pacer = AdaptivePacer()
+    response = MagicMock(status_code=429)
+    assert pacer.is_retryable(requests.HTTPError(response=response))
+    response = MagicMock(status_code=404)
+    assert not pacer.is_retryable(requests.HTTPError(response=response))
+    assert not pacer.is_retryable(ValueError())
+
+
+def test_etl_adaptive_pacing_throttled_server(throttling_server):
+    url, state = throttling_server
+    pacer = AdaptivePacer(rate=10.0, min_rate=1.0, burst=1)
+    obj = APIDownloader('GET', f'{url}/E0.csv', MagicMock(**{'exists.return_value': False}))
+    etl = ETL(pacer=pacer, max_retries=3)
+
+    with pacer.attach(requests.Session()) as session:
+        etl.extract(obj, session=session)
+
+    assert state['requests'] == 3
+    assert pacer.rate < 10.0
+    obj.file.save.assert_called_once_with(b'col1,col2\n1,2\n')
+
+
+def test_etl_adaptive_pacing_retries_exhausted(throttling_server):
+    url, state = throttling_server
+    pacer = AdaptivePacer(rate=10.0, min_rate=1.0)
+    obj = APIDownloader('GET', f'{url}/E0.csv', MagicMock(**{'exists.return_value': False}))
+    etl = ETL(pacer=pacer, max_retries=1)
+
+    with pacer.attach(requests.Session()) as session:
+        with pytest.raises(requests.exceptions.HTTPError):
+            etl.extract(obj, session=session)
+
+    assert state['requests'] == 2
+    obj.file.save.assert_not_called()
@@ -1,13 +1,22 @@
 # pylint: skip-file
+import hashlib
+import os
+import time
+from queue import Queue
 from unittest.mock import MagicMock
 import pytest
 import requests
 import pandas as pd
 
+from etl.data_parser import CSVDataParser
 from etl.download_strategy import DownloadStrategy
-from etl.downloader import Downloader
+from etl.downloader import APIDownloader, Downloader
+from etl.exceptions import ContentNotModified, DataParserError, InvalidDataException
 from etl.files import File
-from etl.process import ETL
+from etl.process import ETL, LoadResult, _DONE, _RunState, _transform_file
+from etl.shared_frames import receive_frame
+from etl.transform import TransformPipeline
+from etl.transform_cache import TransformCache
 
 
 @pytest.fixture
@@ -24,6 +33,7 @@ def mock_download_object(mock_file):
     mock_download_object.file = mock_file()
     mock_download_object.table = 'test_table'
     mock_download_object.schema = 'test_schema'
+    mock_download_object.content = None
     return mock_download_object
 
 
@@ -34,13 +44,13 @@ def mock_strategy():
 
 def test_create_etl_default_object():
     etl = ETL()
-    assert etl._queue == []
+    assert len(etl._queue) == 0
     assert etl.sleep_time == 0
 
 
 def test_create_etl_object():
     etl = ETL(sleep_time=5)
-    assert etl._queue == []
+    assert len(etl._queue) == 0
     assert etl.sleep_time == 5
 
 
@@ -65,7 +75,7 @@ def test_process_queue_download_not_required(mock_download_object, mock_strategy
 
 
 def test_extract(mock_download_object):
-    mock_download_object.download.return_value = 'example data'
+    mock_download_object.download.return_value = b'example data'
     etl = ETL()
     return_obj = etl.extract(mock_download_object)
 
@@ -75,7 +85,7 @@ def test_extract(mock_download_object):
 
 
 def test_extract_w_session(mock_download_object):
-    mock_download_object.download.return_value = 'example data'
+    mock_download_object.download.return_value = b'example data'
     etl = ETL()
     mock_session = MagicMock(spec=requests.Session)
     return_obj = etl.extract(mock_download_object, session=mock_session)
@@ -89,14 +99,14 @@ def test_extract_w_callback(mock_download_object):
     def callback(content):
         return [mock_download_object]*2
     
-    mock_download_object.download.return_value = 'example data'
+    mock_download_object.download.return_value = b'example data'
     etl = ETL()
     return_obj = etl.extract(mock_download_object, callback=callback)
 
     assert return_obj == mock_download_object
     mock_download_object.download.assert_called_once_with(None)
     mock_download_object.file.save.assert_called_once()
-    assert len(etl._queue) == 2
+    assert len(etl._queue) == 1
 
 
 def test_transform(mock_download_object):
@@ -137,6 +147,92 @@ def test_transform_only_data(mock_download_object):
     mock_transform_pipeline.apply.assert_not_called()
 
 
+def test_transform_chunks(mock_download_object):
+    chunks = [pd.DataFrame({'col1': ['1', '2']}), pd.DataFrame({'col1': ['3']})]
+    mock_parser = MagicMock()
+    mock_parser.parse_iter.return_value = iter(chunks)
+    mock_validation_pipeline = MagicMock()
+    mock_transform_pipeline = MagicMock()
+    mock_transform_pipeline.apply.side_effect = lambda df: df.astype(int)
+
+    etl = ETL()
+    obj, data = etl.transform(
+        mock_download_object,
+        parser=mock_parser,
+        transform_pipeline=mock_transform_pipeline,
+        validation_pipeline=mock_validation_pipeline,
+        chunk_size=2
+    )
+
+    assert obj == mock_download_object
+    mock_parser.parse_iter.assert_called_once_with('example data', chunk_size=2)
+    mock_parser.parse.assert_not_called()
+    mock_validation_pipeline.validate.assert_called_once_with(chunks[0])
+    mock_transform_pipeline.apply.assert_not_called()
+    assert [chunk['col1'].tolist() for chunk in data] == [[1, 2], [3]]
+    assert mock_transform_pipeline.apply.call_count == 2
+
+
+def test_transform_chunks_validation_failure(mock_download_object):
+    mock_parser = MagicMock()
+    mock_parser.parse_iter.return_value = iter([pd.DataFrame({'col1': ['1']})])
+    mock_validation_pipeline = MagicMock()
+    mock_validation_pipeline.validate.side_effect = InvalidDataException('missing columns')
+
+    etl = ETL()
+    with pytest.raises(InvalidDataException):
+        etl.transform(
+            mock_download_object,
+            parser=mock_parser,
+            validation_pipeline=mock_validation_pipeline,
+            chunk_size=2
+        )
+
+
+@pytest.mark.parametrize('chunk_size', [None, 2])
+def test_transform_cache(mock_download_object, tmp_path, monkeypatch, chunk_size):
+    parser = CSVDataParser()
+    pipeline = TransformPipeline().add_operation(pd.DataFrame.astype, {'col1': 'Int16'})
+    etl = ETL(transform_cache=TransformCache(tmp_path, max_bytes=2**20))
+
+    def transform(obj):
+        obj.content = b'col1,col2\n1,a\n2,b\n3,c\n'
+        data = etl.transform(obj, parser=parser, transform_pipeline=pipeline, chunk_size=chunk_size)[1]
+        return [data] if chunk_size is None else list(data)
+
+    transformed = transform(mock_download_object)
+    monkeypatch.setattr(CSVDataParser, 'parse', MagicMock(side_effect=AssertionError))
+    monkeypatch.setattr(CSVDataParser, 'parse_iter', MagicMock(side_effect=AssertionError))
+    cached = transform(mock_download_object)
+
+    assert len(cached) == len(transformed) == (1 if chunk_size is None else 2)
+    for chunk, cached_chunk in zip(transformed, cached):
+        pd.testing.assert_frame_equal(chunk, cached_chunk)
+
+
+def upsert_query(call):
+    return str(call.args[0]).startswith('INSERT INTO test_schema')
+
+
+def test_load_chunks(mock_download_object):
+    chunks = iter([
+        pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']}),
+        pd.DataFrame(columns=['col1', 'col2']),
+        pd.DataFrame({'col1': [3], 'col2': ['c']})
+    ])
+    mock_session = MagicMock()
+
+    etl = ETL()
+    etl.load((mock_download_object, chunks), mock_session)
+
+    assert [call.args[1] for call in mock_session.execute.call_args_list if len(call.args) > 1][1:] == [
+        [{'col1': 1, 'col2': 'a'}, {'col1': 2, 'col2': 'b'}],
+        [{'col1': 3, 'col2': 'c'}]
+    ]
+    assert sum(map(upsert_query, mock_session.execute.call_args_list)) == 2
+    assert etl._loaded == [mock_download_object]
+
+
 def test_load_replace(mock_download_object):
     data = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
     mock_session = MagicMock()
@@ -144,13 +240,16 @@ def test_load_replace(mock_download_object):
     etl = ETL()
     etl.load((mock_download_object, data), mock_session, mode='replace')
 
-    executed_query = mock_session.execute.call_args.args[0]
-    expected_query = (
-        'INSERT INTO test_schema.test_table (col1, col2) VALUES (:col1, :col2) '
-        'ON CONFLICT ON CONSTRAINT test_table_unique DO UPDATE SET col1 = EXCLUDED.col1, col2 = EXCLUDED.col2'
-    )
-
-    assert str(executed_query) == expected_query
+    queries = [str(call.args[0]) for call in mock_session.execute.call_args_list]
+    assert queries[1:] == [
+        'DROP TABLE IF EXISTS pg_temp.test_table_staging',
+        'CREATE TEMPORARY TABLE test_table_staging ON COMMIT DROP AS '
+        'SELECT col1, col2 FROM test_schema.test_table WITH NO DATA',
+        'INSERT INTO test_table_staging (col1, col2) VALUES (:col1, :col2)',
+        'INSERT INTO test_schema.test_table (col1, col2) SELECT col1, col2 FROM test_table_staging '
+        'ON CONFLICT ON CONSTRAINT test_table_unique DO UPDATE SET col1 = EXCLUDED.col1, col2 = EXCLUDED.col2 '
+        'RETURNING (xmax = 0) AS inserted'
+    ]
 
 
 def test_load_append_mode(mock_download_object):
@@ -162,8 +261,391 @@ def test_load_append_mode(mock_download_object):
 
     executed_query = mock_session.execute.call_args.args[0]
     expected_query = (
-        'INSERT INTO test_schema.test_table (col1, col2) VALUES (:col1, :col2) '
-        'ON CONFLICT ON CONSTRAINT test_table_unique DO NOTHING'
+        'INSERT INTO test_schema.test_table (col1, col2) SELECT col1, col2 FROM test_table_staging '
+        'ON CONFLICT ON CONSTRAINT test_table_unique DO NOTHING RETURNING (xmax = 0) AS inserted'
     )
 
     assert str(executed_query) == expected_query
+
+
+def test_load_replace_changed_rows_only(mock_download_object):
+    data = pd.DataFrame({'col1': [1, 2], 'row_hash': [11, 12]})
+    mock_session = MagicMock()
+
+    etl = ETL()
+    etl.load((mock_download_object, data), mock_session)
+
+    executed_query = mock_session.execute.call_args.args[0]
+    assert str(executed_query).endswith(
+        'DO UPDATE SET col1 = EXCLUDED.col1, row_hash = EXCLUDED.row_hash '
+        'WHERE test_table.row_hash IS DISTINCT FROM EXCLUDED.row_hash RETURNING (xmax = 0) AS inserted'
+    )
+
+
+def test_load_table_without_row_hash(mock_download_object):
+    data = pd.DataFrame({'col1': [1, 2], 'row_hash': [11, 12]})
+    mock_session = MagicMock()
+    mock_session.execute.side_effect = lambda query, *args: MagicMock(
+        scalar=MagicMock(return_value=None)) if 'pg_attribute' in str(query) else MagicMock()
+
+    etl = ETL()
+    etl.load((mock_download_object, data), mock_session)
+    etl.load((mock_download_object, data), mock_session)
+
+    queries = [str(call.args[0]) for call in mock_session.execute.call_args_list]
+    assert sum('attname = :column' in query for query in queries) == 1
+    assert queries[-1].endswith('DO UPDATE SET col1 = EXCLUDED.col1 RETURNING (xmax = 0) AS inserted')
+
+
+def test_load_result(mock_download_object):
+    chunks = [
+        pd.DataFrame({'col1': [1, 2, 3], 'row_hash': [11, 12, 13]}),
+        pd.DataFrame({'col1': [4, 5], 'row_hash': [14, 15]})
+    ]
+    returned = iter([
+        [MagicMock(inserted=True), MagicMock(inserted=False)],
+        [MagicMock(inserted=True)]
+    ])
+    mock_session = MagicMock()
+    mock_session.execute.side_effect = (
+        lambda query, *args: next(returned) if 'RETURNING' in str(query) else MagicMock())
+
+    etl = ETL()
+    result = etl.load((mock_download_object, iter(chunks)), mock_session)
+
+    assert result == LoadResult(inserted=2, updated=1, unchanged=2)
+    assert result + LoadResult(1, 1, 1) == LoadResult(3, 2, 3)
+
+
+def test_load_copy(mock_download_object):
+    data = pd.DataFrame({'col1': [1, 2, 1], 'col2': ['a', None, 'c'], 'col3': ['x', 'y', 'z']})
+    mock_session = MagicMock()
+    mock_session.execute.return_value.scalars.return_value = ['col1', 'col2']
+    mock_cursor = mock_session.connection.return_value.connection.cursor.return_value.__enter__.return_value
+
+    etl = ETL()
+    etl.load((mock_download_object, data), mock_session, method='copy')
+
+    queries = [str(call.args[0]) for call in mock_session.execute.call_args_list]
+    assert queries[1:] == [
+        'DROP TABLE IF EXISTS pg_temp.test_table_staging',
+        'CREATE TEMPORARY TABLE test_table_staging ON COMMIT DROP AS '
+        'SELECT col1, col2, col3 FROM test_schema.test_table WITH NO DATA',
+        'INSERT INTO test_schema.test_table (col1, col2, col3) SELECT col1, col2, col3 FROM test_table_staging '
+        'ON CONFLICT ON CONSTRAINT test_table_unique DO UPDATE SET '
+        'col1 = EXCLUDED.col1, col2 = EXCLUDED.col2, col3 = EXCLUDED.col3 RETURNING (xmax = 0) AS inserted'
+    ]
+    copy_query, buffer = mock_cursor.copy_expert.call_args.args
+    assert copy_query == "COPY test_table_staging (col1, col2, col3) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    assert buffer.getvalue() == '1,a,x\n2,\\N,y\n1,c,z\n'
+
+
+def test_load_drops_duplicate_keys(mock_download_object):
+    data = pd.DataFrame({'col1': [1, 2, 1], 'col2': ['a', 'b', 'c']})
+    mock_session = MagicMock()
+    mock_session.execute.return_value.scalars.return_value = ['col1']
+    mock_cursor = mock_session.connection.return_value.connection.cursor.return_value.__enter__.return_value
+
+    etl = ETL()
+    etl.load((mock_download_object, data), mock_session, method='copy')
+    etl.load((mock_download_object, data), mock_session, mode='append', method='copy')
+    etl.load((mock_download_object, data), mock_session)
+
+    assert [call.args[1].getvalue() for call in mock_cursor.copy_expert.call_args_list] == [
+        '2,b\n1,c\n', '1,a\n2,b\n'
+    ]
+    assert mock_session.execute.call_args_list[-2].args[1] == [{'col1': 2, 'col2': 'b'}, {'col1': 1, 'col2': 'c'}]
+    # The unique key is looked up once per table
+    assert sum('pg_constraint' in str(call.args[0]) for call in mock_session.execute.call_args_list) == 1
+
+
+def test_load_invalid_options(mock_download_object):
+    data = pd.DataFrame({'col1': [1, 2]})
+    etl = ETL()
+    with pytest.raises(ValueError):
+        etl.load((mock_download_object, data), MagicMock(), mode='merge')
+    with pytest.raises(ValueError):
+        etl.load((mock_download_object, data), MagicMock(), method='bulk')
+
+
+def test_extract_concurrent(mock_download_object, mock_strategy):
+    mock_strategy.return_value.is_download_required.return_value = True
+    mock_download_object.download.return_value = b'example data'
+    etl = ETL()
+    return_objs = list(etl.extract_concurrent([mock_download_object] * 3, strategy=mock_strategy()))
+
+    assert return_objs == [mock_download_object]
+    assert mock_download_object.download.call_count == 1
+    assert len(etl._queue) == 0
+
+
+def test_extract_concurrent_download_not_required(mock_download_object, mock_strategy):
+    mock_strategy.return_value.is_download_required.return_value = False
+    etl = ETL()
+    return_objs = list(etl.extract_concurrent([mock_download_object], strategy=mock_strategy()))
+
+    assert return_objs == []
+    mock_download_object.download.assert_not_called()
+
+
+def test_extract_concurrent_w_callback(mock_download_object, mock_strategy, mock_file):
+    child_object = MagicMock(spec=Downloader)
+    child_object.file = mock_file()
+    child_object.download.return_value = b'child data'
+
+    calls = []
+
+    def callback(content):
+        calls.append(content)
+        return [child_object] * 2 if len(calls) == 1 else []
+
+    mock_strategy.return_value.is_download_required.return_value = True
+    mock_download_object.download.return_value = b'example data'
+    etl = ETL()
+    return_objs = list(
+        etl.extract_concurrent([mock_download_object], strategy=mock_strategy(), callback=callback))
+
+    assert return_objs.count(mock_download_object) == 1
+    assert return_objs.count(child_object) == 1
+
+
+def test_extract_concurrent_ignore_exceptions(mock_download_object, mock_strategy):
+    mock_strategy.return_value.is_download_required.return_value = True
+    mock_download_object.download.side_effect = requests.exceptions.HTTPError('404 Client Error')
+    etl = ETL()
+    return_objs = list(etl.extract_concurrent(
+        [mock_download_object],
+        strategy=mock_strategy(),
+        ignore_exceptions=(requests.exceptions.HTTPError,)
+    ))
+
+    assert return_objs == []
+
+
+def test_extract_concurrent_raises(mock_download_object, mock_strategy):
+    mock_strategy.return_value.is_download_required.return_value = True
+    mock_download_object.download.side_effect = ValueError('fatal')
+    etl = ETL()
+    with pytest.raises(ValueError):
+        list(etl.extract_concurrent([mock_download_object], strategy=mock_strategy()))
+
+
+def test_extract_concurrent_max_per_host(mock_file, mock_strategy):
+    active = []
+    peak = []
+
+    def download(session):
+        active.append(1)
+        peak.append(len(active))
+        time.sleep(0.01)
+        active.pop()
+        return b'example data'
+
+    objects = []
+    for _ in range(6):
+        obj = MagicMock(spec=APIDownloader)
+        obj.file = mock_file()
+        obj.host = 'test_host.com'
+        obj.download.side_effect = download
+        objects.append(obj)
+
+    mock_strategy.return_value.is_download_required.return_value = True
+    etl = ETL()
+    return_objs = list(etl.extract_concurrent(
+        objects, strategy=mock_strategy(), max_workers=4, max_per_host=2))
+
+    assert len(return_objs) == 6
+    assert max(peak) <= 2
+
+
+def test_commit_loaded_objects(mock_download_object):
+    data = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
+    etl = ETL()
+    etl.load((mock_download_object, data), MagicMock())
+    etl.load((mock_download_object, data), MagicMock())
+    etl.commit()
+
+    mock_download_object.commit.assert_called_once()
+    assert etl._loaded == []
+
+
+def test_extract_content_unchanged(mock_download_object, mock_strategy):
+    mock_strategy.return_value.is_load_required.return_value = False
+    mock_download_object.download.return_value = b'example data'
+    etl = ETL()
+    with pytest.raises(ContentNotModified):
+        etl.extract(mock_download_object, strategy=mock_strategy())
+
+    mock_strategy.return_value.is_load_required.assert_called_once_with(
+        mock_download_object, b'example data', hashlib.sha256(b'example data').hexdigest())
+    mock_download_object.file.save.assert_not_called()
+
+
+def test_extract_concurrent_content_unchanged(mock_download_object, mock_strategy):
+    mock_strategy.return_value.is_download_required.return_value = True
+    mock_strategy.return_value.is_load_required.return_value = False
+    mock_download_object.download.return_value = b'example data'
+    etl = ETL()
+    return_objs = list(etl.extract_concurrent(
+        [mock_download_object], strategy=mock_strategy(), ignore_exceptions=(ContentNotModified,)))
+
+    assert return_objs == []
+    mock_download_object.file.save.assert_not_called()
+
+
+def test_extract_stream(mock_download_object):
+    mock_download_object.download_stream.return_value = iter([b'example ', b'data'])
+    etl = ETL(stream=True, chunk_size=8)
+    return_obj = etl.extract(mock_download_object)
+
+    assert return_obj == mock_download_object
+    mock_download_object.download_stream.assert_called_once_with(None, chunk_size=8)
+    mock_download_object.download.assert_not_called()
+    mock_download_object.file.save_stream.assert_called_once()
+    mock_download_object.file.save.assert_not_called()
+
+
+def test_extract_stream_content_unchanged(mock_download_object, mock_strategy, tmp_path):
+    mock_strategy.return_value.is_load_required.return_value = False
+    mock_download_object.file = File(tmp_path / 'data.csv')
+    mock_download_object.download_stream.return_value = iter([b'example data'])
+    etl = ETL(stream=True)
+    with pytest.raises(ContentNotModified):
+        etl.extract(mock_download_object, strategy=mock_strategy())
+
+    mock_strategy.return_value.is_load_required.assert_called_once_with(
+        mock_download_object, None, hashlib.sha256(b'example data').hexdigest())
+
+
+def test_extract_hands_over_content(mock_download_object):
+    mock_download_object.download.return_value = b'example data'
+    etl = ETL()
+    etl.extract(mock_download_object)
+
+    assert mock_download_object.content == b'example data'
+    mock_download_object.file.read.assert_not_called()
+
+
+def test_transform_uses_handed_over_content(mock_download_object):
+    mock_download_object.content = b'downloaded data'
+    mock_parser = MagicMock()
+    mock_parser.parse.return_value = 'parsed_data'
+
+    etl = ETL()
+    result = etl.transform(mock_download_object, parser=mock_parser)
+
+    assert result[1] == 'parsed_data'
+    mock_parser.parse.assert_called_once_with(b'downloaded data')
+    mock_download_object.file.read.assert_not_called()
+    assert mock_download_object.content is None
+
+
+def test_transform_reads_memory_map(mock_download_object):
+    etl = ETL()
+    etl.transform(mock_download_object)
+
+    mock_download_object.file.read.assert_called_once_with(memory_map=True)
+
+
+@pytest.fixture
+def run_objects(tmp_path, mock_strategy):
+    mock_strategy.return_value.is_download_required.return_value = True
+    objects = []
+    for i, content in enumerate([b'col1,col2\n1,a\n2,b\n3,c\n', b'col1,col2\n4,d\n', b'col1,col2\n']):
+        obj = MagicMock(spec=Downloader)
+        obj.file = File(tmp_path / f'{i}.csv')
+        obj.download.return_value = content
+        obj.meta = {'source': i}
+        objects.append(obj)
+    return objects
+
+
+def shared_memory_blocks():
+    return {name for name in os.listdir('/dev/shm') if name.startswith('psm_')} if os.path.isdir('/dev/shm') else set()
+
+
+def test_run(run_objects, mock_strategy):
+    loaded = {}
+
+    def load(dataset, session, mode, method):
+        obj, chunks = dataset
+        loaded[obj.meta['source']] = list(chunks)
+        return LoadResult(inserted=sum(len(chunk) for chunk in loaded[obj.meta['source']]))
+
+    etl = ETL()
+    etl.load = load
+    blocks = shared_memory_blocks()
+    report = etl.run(
+        run_objects,
+        MagicMock(),
+        CSVDataParser(),
+        transform_pipeline=lambda obj: TransformPipeline().add_operation(pd.DataFrame.assign, **obj.meta),
+        chunk_size=2,
+        strategy=mock_strategy(),
+        workers=1,
+        queue_size=1
+    )
+
+    assert report.result == LoadResult(inserted=4)
+    assert set(report.utilisation) == {'extract', 'transform', 'load'}
+    assert [len(chunk) for chunk in loaded[0]] == [2, 1]
+    pd.testing.assert_frame_equal(
+        pd.concat(loaded[0], ignore_index=True),
+        pd.DataFrame({'col1': ['1', '2', '3'], 'col2': ['a', 'b', 'c'], 'source': [0, 0, 0]})
+    )
+    assert loaded[1][0].to_dict(orient='list') == {'col1': ['4'], 'col2': ['d'], 'source': [1]}
+    assert len(loaded[2]) == 1 and loaded[2][0].empty
+    assert all(obj.content is None for obj in run_objects)
+    assert shared_memory_blocks() == blocks
+
+
+def test_transform_stage_sends_content(tmp_path):
+    in_memory = MagicMock(spec=Downloader)
+    in_memory.content = b'col1\n1\n'
+    in_memory.file = File(tmp_path / 'in_memory.csv')
+    streamed = MagicMock(spec=Downloader)
+    streamed.content = None
+    streamed.file = File(tmp_path / 'streamed.csv')
+    state = _RunState(Queue(), Queue())
+    for item in (in_memory, streamed, _DONE):
+        state.extracted.put(item)
+    executor = MagicMock()
+
+    ETL._transform_stage(state, executor, (CSVDataParser(), None, None, None, None, None))
+
+    assert [call.args[1] for call in executor.submit.call_args_list] == [b'col1\n1\n', streamed.file]
+    assert in_memory.content is None
+
+
+def test_transform_file_content(tmp_path):
+    shared, _, _ = _transform_file(b'col1,col2\n1,a\n2,b\n', CSVDataParser(), None, None, None)
+    file = File(tmp_path / 'data.csv')
+    file.save(b'col1,col2\n3,c\n')
+    shared += _transform_file(file, CSVDataParser(), None, None, None)[0]
+
+    assert [receive_frame(frame).to_dict(orient='list') for frame in shared] == [
+        {'col1': ['1', '2'], 'col2': ['a', 'b']},
+        {'col1': ['3'], 'col2': ['c']}
+    ]
+
+
+def test_run_transform_error(run_objects, mock_strategy):
+    run_objects[1].download.return_value = 'col1,col2\n4,ą\n'.encode('utf-8')
+    etl = ETL()
+    etl.load = MagicMock(return_value=LoadResult())
+    blocks = shared_memory_blocks()
+
+    with pytest.raises(DataParserError):
+        etl.run(run_objects, MagicMock(), CSVDataParser(encoding='ascii'), strategy=mock_strategy(), workers=1)
+
+    assert shared_memory_blocks() == blocks
+
+
+def test_run_extract_error(run_objects, mock_strategy):
+    run_objects[0].download.side_effect = ValueError('fatal')
+    etl = ETL()
+    etl.load = MagicMock(return_value=LoadResult())
+
+    with pytest.raises(ValueError, match='fatal'):
+        etl.run(run_objects, MagicMock(), CSVDataParser(), strategy=mock_strategy(), workers=1)
+
@@ -0,0 +1,87 @@
+# pylint: skip-file
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+
+from etl.data_parser import CSVDataParser
+from etl.downloader import Downloader
+from etl.files import File
+from etl.process import ETL, LoadResult
+from etl.profiling import Profiler
+
+
+def test_profile(tmp_path):
+    profiler = Profiler(tmp_path, top=5)
+    with profiler.profile('transform', 'APIDownloader https://host/E0.csv@schema/table'):
+        data = pd.DataFrame({'a': range(10000)}).astype(str)
+
+    path = tmp_path / 'APIDownloader_https_host_E0.csv_schema_table'
+    assert sorted(file.name for file in path.iterdir()) == ['transform.memory.txt', 'transform.prof', 'transform.txt']
+    assert 'cumulative' in (path / 'transform.txt').read_text()
+    memory = (path / 'transform.memory.txt').read_text().splitlines()
+    assert memory[0].startswith('Peak traced memory: ')
+    assert 2 < len(memory) <= 7
+
+
+def test_profile_error(tmp_path):
+    profiler = Profiler(tmp_path)
+    with pytest.raises(ValueError):
+        with profiler.profile('load', 'obj'):
+            raise ValueError('fatal')
+
+    assert (tmp_path / 'obj' / 'load.prof').exists()
+
+
+@pytest.mark.parametrize('value, enabled, expected', [
+    (None, False, False),
+    ('0', False, False),
+    ('false', False, False),
+    (None, True, True),
+    ('1', False, True),
+    ('yes', False, True),
+])
+def test_from_environment(tmp_path, monkeypatch, value, enabled, expected):
+    if value is None:
+        monkeypatch.delenv('ETL_PROFILE', raising=False)
+    else:
+        monkeypatch.setenv('ETL_PROFILE', value)
+
+    profiler = Profiler.from_environment(tmp_path, enabled, top=5)
+
+    assert (profiler is not None) == expected
+    if profiler is not None:
+        assert profiler.directory.parent == tmp_path
+        assert profiler.top == 5
+
+
+@pytest.fixture
+def objects(tmp_path):
+    objects = []
+    for name in ('E0', 'E1'):
+        obj = MagicMock(spec=Downloader)
+        obj.file = File(tmp_path / 'data' / f'{name}.csv')
+        obj.download.return_value = b'a,b\n1,2\n'
+        obj.table, obj.schema, obj.content = 'table', 'schema', None
+        obj.__str__.return_value = name
+        objects.append(obj)
+    return objects
+
+
+def test_run_profiles_objects(tmp_path, objects):
+    etl = ETL(profiler=Profiler(tmp_path / 'profiles'))
+    etl.load = MagicMock(return_value=LoadResult())
+
+    etl.run(objects, MagicMock(), CSVDataParser(), workers=1)
+
+    for name in ('E0', 'E1'):
+        assert (tmp_path / 'profiles' / name / 'extract.prof').exists()
+        assert (tmp_path / 'profiles' / name / 'transform.prof').exists()
+
+
+def test_load_profiles_object(tmp_path, objects):
+    etl = ETL(profiler=Profiler(tmp_path / 'profiles'))
+    etl._upsert = MagicMock(return_value=LoadResult(inserted=1))
+
+    etl.load((objects[0], pd.DataFrame({'a': [1]})), MagicMock())
+
+    assert (tmp_path / 'profiles' / 'E0' / 'load.memory.txt').exists()
@@ -0,0 +1,89 @@
+# pylint: skip-file
+from unittest.mock import MagicMock
+import pytest
+
+from etl.downloader import APIDownloader
+from etl.files import File
+from etl.process import ETL
+from etl.download_strategy import DownloadStrategy
+from etl.scheduler import Scheduler
+
+
+def make_object(url, **meta):
+    return APIDownloader('GET', f'http://test_url.com/{url}', File(f'{url}.csv'), meta=meta)
+
+
+def urls(objects):
+    return [obj.url.rsplit('/', 1)[-1] for obj in objects]
+
+
+def drain(scheduler):
+    objects = []
+    while scheduler:
+        objects.append(scheduler.pop())
+    return objects
+
+
+def test_insertion_order():
+    objects = [make_object(name) for name in 'abc']
+
+    assert urls(drain(Scheduler(objects))) == ['a', 'b', 'c']
+    assert urls(drain(Scheduler(objects, reverse=True))) == ['c', 'b', 'a']
+
+
+def test_priority():
+    objects = [make_object('a', rank=2), make_object('b', rank=1), make_object('c', rank=2), make_object('d', rank=0)]
+    scheduler = Scheduler(objects, priority=lambda obj: obj.meta['rank'])
+
+    assert urls(drain(scheduler)) == ['d', 'b', 'a', 'c']
+
+
+def test_skips_duplicates():
+    scheduler = Scheduler([make_object('a'), make_object('b'), make_object('a')])
+    first = scheduler.pop()
+    scheduler.extend([make_object('a'), make_object('c'), make_object('c')])
+
+    assert urls([first, *drain(scheduler)]) == ['a', 'b', 'c']
+
+
+def test_consumes_source_lazily():
+    consumed = []
+
+    def generate():
+        for name in 'abcdef':
+            consumed.append(name)
+            yield make_object(name)
+
+    scheduler = Scheduler(generate(), lookahead=2)
+    assert urls([scheduler.pop()]) == ['a']
+    assert consumed == ['a', 'b']
+    assert len(scheduler) == 1
+    assert urls(drain(scheduler)) == list('bcdef')
+
+
+def test_reverse_consumes_whole_source():
+    scheduler = Scheduler((make_object(name) for name in 'abcdef'), reverse=True, lookahead=2)
+
+    assert urls(drain(scheduler)) == list('fedcba')
+
+
+def test_duplicate_source_objects_do_not_end_the_queue():
+    scheduler = Scheduler([make_object('a'), make_object('a'), make_object('a'), make_object('b')], lookahead=1)
+
+    assert urls(drain(scheduler)) == ['a', 'b']
+
+
+def test_pop_empty():
+    with pytest.raises(IndexError):
+        Scheduler().pop()
+
+
+def test_process_queue_priority():
+    strategy = MagicMock(spec=DownloadStrategy)
+    strategy.is_download_required.return_value = True
+    objects = (make_object(name, season=season) for name, season in [('a', '2022'), ('b', '2024'), ('c', '2023')])
+    etl = ETL()
+
+    processed = etl.process_queue(objects, strategy=strategy, priority=lambda obj: -int(obj.meta['season']))
+
+    assert urls(processed) == ['b', 'c', 'a']
@@ -0,0 +1,36 @@
+# pylint: skip-file
+from multiprocessing import shared_memory
+import pandas as pd
+import pytest
+
+from etl.shared_frames import receive_frame, release_frame, share_frame
+
+
+def test_share_and_receive_frame():
+    data = pd.DataFrame({
+        'int': pd.array([1, None, 3], dtype='Int16'),
+        'str': pd.array(['a', None, 'c'], dtype='string'),
+        'float': [1.5, 2.5, None],
+        'date': pd.to_datetime(['2023-08-11', '2023-08-12', '2023-08-13'])
+    }, index=[5, 6, 7])
+
+    shared = share_frame(data)
+    result = receive_frame(shared)
+
+    pd.testing.assert_frame_equal(result, data.reset_index(drop=True))
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(shared.name)
+
+
+def test_share_empty_frame():
+    data = pd.DataFrame({'col1': pd.Series([], dtype='int64')})
+    pd.testing.assert_frame_equal(receive_frame(share_frame(data)), data)
+
+
+def test_release_frame():
+    shared = share_frame(pd.DataFrame({'col1': [1, 2]}))
+    release_frame(shared)
+    release_frame(shared)
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(shared.name)
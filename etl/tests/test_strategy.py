@@ -1,8 +1,13 @@
 # pylint: skip-file
+from datetime import date, timedelta
+import time
 from unittest.mock import MagicMock, patch
 import pytest
-from etl.download_strategy import AppendStrategy, ReplaceOnMetaFlagStrategy, ReplaceStrategy
-from etl.downloader import Downloader
+from etl.download_strategy import (
+    AppendStrategy, ContentHashStrategy, ReplaceOnMetaFlagStrategy, ReplaceStrategy, SeasonRefreshStrategy,
+    SeasonWindow
+)
+from etl.downloader import APIDownloader, Downloader
 
 from etl.files import File
 
@@ -61,3 +66,157 @@ def test_replaceonmetaflag_strategy(mock_download_object):
         mock_download_object.meta = {'replace': False}
         result = strategy.is_download_required(mock_download_object)
         assert result == False
+
+
+def test_default_is_load_required(mock_download_object):
+    assert AppendStrategy().is_load_required(mock_download_object, b'content') == True
+
+
+def test_content_hash_strategy(tmp_path):
+    file = File(tmp_path / 'E0.csv')
+    obj = APIDownloader('GET', 'http://test_url.com', file)
+    strategy = ContentHashStrategy(ReplaceStrategy())
+
+    assert strategy.is_download_required(obj) == True
+    assert strategy.is_load_required(obj, b'content') == True
+
+    file.save(b'content')
+    obj.commit()
+    assert strategy.is_load_required(obj, b'content') == False
+    assert strategy.is_load_required(obj, b'changed content') == True
+
+
+def test_content_hash_strategy_compressed_file(tmp_path):
+    file = File(tmp_path / 'E0.csv', compression='zstd')
+    obj = APIDownloader('GET', 'http://test_url.com', file)
+    strategy = ContentHashStrategy(ReplaceStrategy())
+
+    file.save(b'content')
+    assert strategy.is_load_required(obj, None) == True
+    obj.commit()
+    assert strategy.is_load_required(obj, b'content') == False
+    assert strategy.is_load_required(obj, None) == False
+
+
+def test_content_hash_strategy_missing_file(tmp_path):
+    file = File(tmp_path / 'E0.csv')
+    file.sidecar('.state.json').save(
+        b'{"sha256": "ed7002b439e9ac845f22357d822bac1444730fbdb6016d3ec9432297b9ec9f73"}')
+    obj = APIDownloader('GET', 'http://test_url.com', file)
+    strategy = ContentHashStrategy(ReplaceStrategy())
+
+    assert strategy.is_load_required(obj, b'content') == True
+
+
+def test_content_hash_strategy_delegates(mock_download_object):
+    wrapped = MagicMock(spec=ReplaceStrategy)
+    wrapped.is_download_required.return_value = False
+    strategy = ContentHashStrategy(wrapped)
+
+    assert strategy.is_download_required(mock_download_object) == False
+    wrapped.is_download_required.assert_called_once_with(mock_download_object)
+
+
+def test_content_hash_strategy_streamed_file(tmp_path):
+    file = File(tmp_path / 'E0.csv')
+    file.save(b'content')
+    obj = APIDownloader('GET', 'http://test_url.com', file)
+    strategy = ContentHashStrategy(ReplaceStrategy())
+
+    assert strategy.is_load_required(obj, None) == True
+    obj.commit()
+    assert strategy.is_load_required(obj, None) == False
+
+
+def test_content_hash_strategy_fingerprint(tmp_path):
+    file = File(tmp_path / 'E0.csv')
+    file.save(b'content')
+    obj = APIDownloader('GET', 'http://test_url.com', file)
+    strategy = ContentHashStrategy(ReplaceStrategy(), fingerprint='transform v1')
+
+    assert strategy.is_load_required(obj, b'content') == True
+    obj.commit()
+    assert strategy.is_load_required(obj, b'content') == False
+    strategy.fingerprint = lambda obj: 'transform v2'
+    assert strategy.is_load_required(obj, b'content') == True
+    assert ContentHashStrategy(ReplaceStrategy()).is_load_required(obj, b'content') == True
+
+
+def test_content_hash_strategy_force(tmp_path):
+    file = File(tmp_path / 'E0.csv')
+    file.save(b'content')
+    obj = APIDownloader('GET', 'http://test_url.com', file)
+    ContentHashStrategy(ReplaceStrategy()).is_load_required(obj, b'content')
+    obj.commit()
+
+    assert ContentHashStrategy(ReplaceStrategy(), force=True).is_load_required(obj, b'content') == True
+
+
+def test_season_window_dates():
+    window = SeasonWindow.from_config({'start': '08-01', 'end': '06-10'})
+
+    assert window == SeasonWindow((8, 1), (6, 10))
+    assert window.dates('2023/2024') == (date(2023, 8, 1), date(2024, 6, 10))
+    assert SeasonWindow((3, 1), (11, 30)).dates('2024') == (date(2024, 3, 1), date(2024, 11, 30))
+
+
+def season_object(season, league='E0'):
+    obj = MagicMock(spec=Downloader)
+    obj.key = f'http://test_url.com/{season}/{league}.csv'
+    obj.meta = {'season': season, 'league': league}
+    return obj
+
+
+@pytest.mark.parametrize('today, latest, expected', [
+    (date(2024, 7, 1), {}, False),
+    (date(2024, 10, 1), {}, True),
+    (date(2024, 10, 1), {('E0', '2024/2025'): date(2024, 9, 28)}, True),
+    (date(2025, 6, 20), {('E0', '2024/2025'): date(2025, 5, 25)}, True),
+    (date(2025, 6, 20), {('E0', '2024/2025'): date(2025, 6, 10)}, False),
+])
+def test_season_refresh_strategy_current_season(today, latest, expected):
+    strategy = SeasonRefreshStrategy(latest, today=today)
+
+    assert strategy.is_download_required(season_object('2024/2025')) == expected
+
+
+def test_season_refresh_strategy_past_seasons():
+    latest = {('E0', '2022/2023'): date(2023, 5, 28)}
+    strategy = SeasonRefreshStrategy(latest, today=date(2024, 10, 1))
+
+    assert strategy.is_download_required(season_object('2022/2023')) == False
+    assert strategy.is_download_required(season_object('2021/2022')) == True
+
+
+def test_season_refresh_strategy_league_windows():
+    latest = {('E0', '2024/2025'): date(2025, 5, 25), ('BRA', '2025'): date(2025, 7, 27)}
+    strategy = SeasonRefreshStrategy(latest, windows={'BRA': SeasonWindow((3, 25), (12, 10))}, today=date(2025, 8, 1))
+
+    assert strategy.is_download_required(season_object('2025', 'BRA')) == True
+    assert strategy.is_download_required(season_object('2025/2026')) == True
+    assert strategy.is_download_required(season_object('2024/2025')) == False
+
+
+def test_season_refresh_strategy_ttl():
+    manifest = MagicMock()
+    latest = {('E0', '2024/2025'): date(2025, 5, 25)}
+    strategy = SeasonRefreshStrategy(latest, ttl=timedelta(days=7), today=date(2025, 7, 1), manifest=manifest)
+    obj = season_object('2024/2025')
+
+    manifest.get.return_value.fetched_at = time.time() - 86400
+    assert strategy.is_download_required(obj) == False
+    manifest.get.return_value.fetched_at = time.time() - 8 * 86400
+    assert strategy.is_download_required(obj) == True
+    manifest.get.return_value = None
+    assert strategy.is_download_required(obj) == True
+    manifest.get.assert_called_with(obj.key)
+
+
+def test_season_refresh_strategy_query_latest():
+    session = MagicMock()
+    session.execute.return_value = [('E0', '2024/2025', date(2025, 5, 25))]
+
+    latest = SeasonRefreshStrategy.query_latest(session, 'football_data', 'football_data_co_uk')
+
+    assert latest == {('E0', '2024/2025'): date(2025, 5, 25)}
+    assert 'MAX(match_date) FROM football_data.football_data_co_uk' in str(session.execute.call_args.args[0])
@@ -1,6 +1,7 @@
 # pylint: skip-file
 import pytest
-from etl.transform import TransformPipeline
+import pandas as pd
+from etl.transform import TransformPipeline, add_row_hash, cast_numeric
 
 
 def test_add_operation():
@@ -52,3 +53,97 @@ def test_branch_pipelines():
     assert len(other_pipe._operations) == 2
     assert base_pipe.apply(data) == [6, 11, 16]
     assert other_pipe.apply(data) == [12, 22, 32]
+
+
+@pytest.mark.parametrize('copy_on_write', [False, True])
+def test_apply_inplace_operation(copy_on_write):
+    pipe = TransformPipeline(copy_on_write=copy_on_write)
+    pipe.add_inplace_operation(pd.DataFrame.rename, columns={'a': 'b'}, inplace=True)
+    pipe.add_inplace_operation(pd.DataFrame.replace, 1, 10, inplace=True)
+    data = pd.DataFrame({'a': [1, 2]})
+    result = pipe.apply(data)
+    pd.testing.assert_frame_equal(result, pd.DataFrame({'b': [10, 2]}))
+    pd.testing.assert_frame_equal(data, pd.DataFrame({'a': [1, 2]}))
+
+
+def test_apply_inplace_operation_on_new_object():
+    pipe = TransformPipeline()
+    pipe.add_operation(lambda x: x + [4])
+    pipe.add_inplace_operation(list.reverse)
+    data = [1, 2, 3]
+    assert pipe.apply(data) == [4, 3, 2, 1]
+    assert data == [1, 2, 3]
+
+
+def test_apply_track_memory():
+    pipe = TransformPipeline(track_memory=True)
+    pipe.add_operation(lambda x: x * 2)
+    pipe.add_inplace_operation(list.reverse)
+    assert pipe.apply([1, 2]) == [2, 1, 2, 1]
+    assert [stats.operation for stats in pipe.stats] == ['test_apply_track_memory.<locals>.<lambda>', 'list.reverse']
+    assert all(stats.seconds >= 0 and stats.allocated_peak >= 0 for stats in pipe.stats)
+    pipe.apply([1])
+    assert len(pipe.stats) == 2
+
+
+def test_copy_options():
+    pipe = TransformPipeline(copy_on_write=True, track_memory=True).copy()
+    assert pipe.copy_on_write
+    assert pipe.track_memory
+
+
+def test_add_row_hash():
+    data = pd.DataFrame({'col1': [1, 2, 1], 'col2': ['a', 'b', 'a']})
+    result = add_row_hash(data)
+
+    assert list(result.columns) == ['col1', 'col2', 'row_hash']
+    assert result['row_hash'].dtype == 'int64'
+    assert result['row_hash'][0] == result['row_hash'][2] != result['row_hash'][1]
+    assert 'row_hash' not in data.columns
+    # Rehashing ignores the previous hash, so it is stable across chunks and reruns
+    pd.testing.assert_frame_equal(add_row_hash(result), result)
+    assert add_row_hash(data.iloc[1:])['row_hash'].tolist() == result['row_hash'][1:].tolist()
+
+
+def test_cast_numeric(caplog):
+    data = pd.DataFrame({
+        'goals': ['1', '2.0', None, 'x', '1.5', '40000'],
+        'odds': ['1.85', ' 2 ', None, 'inf', '1e1', '-3'],
+        'name': ['a', 'b', 'c', 'd', 'e', 'f']
+    })
+
+    result = cast_numeric(data, {'goals': 'Int16', 'odds': 'Float32', 'missing': 'Int16'})
+
+    expected = pd.DataFrame({
+        'goals': pd.array([1, 2, None, None, None, None], dtype='Int16'),
+        'odds': pd.array([1.85, 2, None, None, 10, -3], dtype='Float32'),
+        'name': ['a', 'b', 'c', 'd', 'e', 'f']
+    })
+    pd.testing.assert_frame_equal(result, expected)
+    assert 'Coerced 3 values to null in column goals' in caplog.text
+    assert 'Coerced 1 values to null in column odds' in caplog.text
+
+
+def test_cast_numeric_mixed_values():
+    data = pd.DataFrame({'goals': [1.0, None, 3.0], 'shots': ['4', 5, None]})
+
+    result = cast_numeric(data, {'goals': 'Int16', 'shots': 'Int32'})
+
+    assert result['goals'].tolist() == [1, pd.NA, 3]
+    assert result['shots'].tolist() == [4, 5, pd.NA]
+    assert result.dtypes.tolist() == ['Int16', 'Int32']
+
+
+def test_cast_numeric_invalid_dtype():
+    with pytest.raises(ValueError):
+        cast_numeric(pd.DataFrame({'goals': ['1']}), {'goals': 'int16'})
+
+
+def test_fingerprint():
+    pipe = TransformPipeline().add_operation(pd.DataFrame.rename, columns={'a': 'b', 'c': 'd'})
+    same = TransformPipeline(copy_on_write=True).add_operation(pd.DataFrame.rename, columns={'c': 'd', 'a': 'b'})
+    assert pipe.fingerprint() == same.fingerprint()
+    assert pipe.fingerprint() != TransformPipeline().add_operation(pd.DataFrame.rename, columns={'a': 'c'}).fingerprint()
+    assert pipe.fingerprint() != TransformPipeline().add_inplace_operation(
+        pd.DataFrame.rename, columns={'a': 'b', 'c': 'd'}).fingerprint()
+    assert pipe.fingerprint() != pipe.copy().add_operation(add_row_hash).fingerprint()
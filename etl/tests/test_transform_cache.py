@@ -0,0 +1,84 @@
+# pylint: skip-file
+import os
+import pandas as pd
+import pytest
+
+from etl.data_parser import CSVDataParser
+from etl.transform import TransformPipeline
+from etl.transform_cache import TransformCache
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame({
+        'col1': pd.array([1, None, 3], dtype='Int16'),
+        'col2': ['a', 'b', None],
+        'col3': pd.to_datetime(['2021-01-01', None, '2021-01-03'])
+    }, index=[0, 2, 5])
+
+
+def test_key():
+    pipeline = TransformPipeline().add_operation(pd.DataFrame.rename, columns={'a': 'b'})
+    key = TransformCache.key(b'content', CSVDataParser(), pipeline, None)
+    assert key == TransformCache.key(b'content', CSVDataParser(), pipeline.copy(), None)
+    assert key != TransformCache.key(b'other', CSVDataParser(), pipeline, None)
+    assert key != TransformCache.key(b'content', CSVDataParser(encoding='latin-1'), pipeline, None)
+    assert key != TransformCache.key(b'content', CSVDataParser(), pipeline.copy().add_operation(pd.DataFrame.dropna), None)
+    assert key != TransformCache.key(b'content', CSVDataParser(), pipeline, 1000)
+
+
+def test_get_missing(tmp_path):
+    assert TransformCache(tmp_path, 2**20).get('key', chunked=False) is None
+
+
+def test_put_get(tmp_path, data):
+    cache = TransformCache(tmp_path, 2**20)
+    assert cache.put('key', data, chunked=False) is data
+    pd.testing.assert_frame_equal(cache.get('key', chunked=False), data)
+
+
+def test_put_get_chunks(tmp_path, data):
+    cache = TransformCache(tmp_path, 2**20)
+    chunks = [data, data.iloc[:1]]
+    assert list(cache.put('key', iter(chunks), chunked=True)) == chunks
+    cached = cache.get('key', chunked=True)
+    for chunk, cached_chunk in zip(chunks, cached, strict=True):
+        pd.testing.assert_frame_equal(chunk, cached_chunk)
+
+
+def test_put_chunks_not_consumed(tmp_path, data):
+    cache = TransformCache(tmp_path, 2**20)
+    chunks = cache.put('key', iter([data, data]), chunked=True)
+    next(chunks)
+    chunks.close()
+    assert cache.get('key', chunked=True) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_put_chunks_error(tmp_path, data):
+    def chunks():
+        yield data
+        raise ValueError('parse error')
+
+    cache = TransformCache(tmp_path, 2**20)
+    with pytest.raises(ValueError):
+        list(cache.put('key', chunks(), chunked=True))
+    assert cache.get('key', chunked=True) is None
+
+
+def test_put_not_dataframe(tmp_path):
+    cache = TransformCache(tmp_path, 2**20)
+    assert cache.put('key', 'data', chunked=False) == 'data'
+    assert cache.get('key', chunked=False) is None
+
+
+def test_evict_least_recently_used(tmp_path, data):
+    cache = TransformCache(tmp_path, 2**20)
+    for number, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, data, chunked=False)
+        os.utime(tmp_path / key, (number, number))
+    cache.get('a', chunked=False)
+    size = sum(path.stat().st_size for path in (tmp_path / 'a').iterdir())
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['a', 'c']
@@ -1,16 +1,213 @@
 """Data Transformation Pipeline"""
-from typing import Any, Callable, List
+from contextlib import ExitStack
+import copy
+from dataclasses import dataclass
+import logging
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from etl.fingerprint import fingerprint
+from etl.metrics import METRICS, count_rows
+
+
+logger = logging.getLogger(__name__)
+ROW_HASH = 'row_hash'
+_NUMBER_PATTERN = r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+
+
+def _parse_numbers(values: np.ndarray) -> np.ndarray:
+    """
+    Parse an array of strings into floats with Arrow compute kernels.
+
+    Parameters:
+        values (np.ndarray): Object array of strings and nulls.
+
+    Returns:
+        np.ndarray: Parsed numbers, NaN where a value is not a number.
+    """
+    try:
+        strings = pa.array(values, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        return np.asarray(pd.to_numeric(values, errors='coerce'), dtype=np.float64)
+    is_number = pc.match_substring_regex(strings, _NUMBER_PATTERN)  # pylint: disable=no-member
+    numbers = pc.if_else(is_number, pc.utf8_trim_whitespace(strings), None)  # pylint: disable=no-member
+    return pc.cast(numbers, pa.float64()).to_numpy(zero_copy_only=False)
+
+
+def cast_numeric(data: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """
+    Convert columns to nullable numeric dtypes in a single vectorized pass.
+
+    All the columns are parsed together in one pass and built directly as arrays of the
+    target dtypes. Values that are not finite numbers, that are not whole numbers in integer
+    columns, or that do not fit the dtype become null. The number of such values
+    is logged per column.
+
+    Parameters:
+        data (pd.DataFrame): Data to convert.
+        dtypes (Dict[str, str]): Target nullable dtype of each column ('Int16', 'Float32', etc.),
+            columns missing from the data are skipped.
+
+    Returns:
+        pd.DataFrame: Data with the converted columns.
+    """
+    columns = [col for col in dtypes if col in data.columns]
+    if not columns:
+        return data
+    raw = np.concatenate([data[col].to_numpy(dtype=object) for col in columns])
+    values = _parse_numbers(raw).reshape(len(columns), len(data))
+    valid = np.isfinite(values)
+    converted = {}
+    for position, col in enumerate(columns):
+        dtype = pd.api.types.pandas_dtype(dtypes[col])
+        if not isinstance(dtype, pd.api.extensions.ExtensionDtype) or dtype.kind not in 'iuf':
+            raise ValueError(f'{dtype} is not a nullable numeric dtype')
+        col_values = values[position]
+        if dtype.kind == 'f':
+            converted[col] = pd.arrays.FloatingArray(col_values.astype(dtype.numpy_dtype), ~valid[position])
+            continue
+        limits = np.iinfo(dtype.numpy_dtype)
+        with np.errstate(invalid='ignore'):
+            valid[position] &= (
+                (col_values == np.floor(col_values)) & (col_values >= limits.min) & (col_values <= limits.max)
+            )
+        mask = ~valid[position]
+        converted[col] = pd.arrays.IntegerArray(np.where(mask, 0, col_values).astype(dtype.numpy_dtype), mask)
+    coerced = pd.notna(raw).reshape(valid.shape) & ~valid
+    for col, count in zip(columns, coerced.sum(axis=1)):
+        if count:
+            logger.warning('Coerced %d values to null in column %s', count, col)
+    return data.assign(**converted)
+
+
+def add_row_hash(data: pd.DataFrame, column: str = ROW_HASH) -> pd.DataFrame:
+    """
+    Add a column with a 64-bit fingerprint of every row, computed from all other columns.
+
+    The hash depends on the values and their dtypes, so changing a column dtype in the
+    pipeline changes the fingerprints of all rows once.
+
+    Parameters:
+        data (pd.DataFrame): Data to fingerprint.
+        column (str): Name of the hash column (default is 'row_hash').
+
+    Returns:
+        pd.DataFrame: Data with the hash column.
+    """
+    hashes = pd.util.hash_pandas_object(data.drop(columns=column, errors='ignore'), index=False)
+    return data.assign(**{column: hashes.to_numpy().view(np.int64)})
+
+
+@dataclass
+class OperationStats:
+    """
+    Resources used by a pipeline operation.
+
+    Attributes:
+        operation (str): Operation name.
+        seconds (float): Duration of the operation.
+        allocated_peak (int): Peak memory allocated by the operation in bytes, as traced by tracemalloc.
+        rss_peak (int | None): Peak resident set size of the process during the operation in bytes,
+            None if the platform cannot reset the peak (only Linux can).
+    """
+    operation: str
+    seconds: float
+    allocated_peak: int
+    rss_peak: int | None
+
+
+class InPlaceOperation:
+    """
+    Operation modifying the data in place instead of returning a new object.
+
+    Attributes:
+        operation (Callable): Wrapped operation, its return value is ignored.
+    """
+
+    def __init__(self, operation: Callable) -> None:
+        self.operation = operation
+        self.__qualname__ = getattr(operation, '__qualname__', repr(operation))
+
+    def __call__(self, data: Any, *args: Any, **kwargs: Any) -> Any:
+        self.operation(data, *args, **kwargs)
+        return data
+
+
+def _operation_name(operation: Callable) -> str:
+    """
+    Get the name of a pipeline operation.
+
+    Parameters:
+        operation (Callable): Operation.
+
+    Returns:
+        str: Qualified name of the operation.
+    """
+    return getattr(operation, '__qualname__', repr(operation))
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Reset the peak resident set size of the process (Linux only).
+
+    Returns:
+        bool: Whether the peak was reset.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as handle:
+            handle.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def _peak_rss() -> int | None:
+    """
+    Get the peak resident set size of the process since it was last reset (Linux only).
+
+    Returns:
+        int | None: Peak resident set size in bytes, None if unavailable.
+    """
+    try:
+        with open('/proc/self/status', encoding='ascii') as handle:
+            for line in handle:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
 
 class TransformPipeline:
     """
     Class managing a pipeline of transformation operations.
 
+    With copy-on-write enabled, pandas shares data between the frames returned by consecutive
+    operations and copies a column only when it is modified, so operations that only select,
+    rename or add columns do not copy the data. In-place operations modify the data the pipeline
+    owns: the input is copied (lazily with copy-on-write) before the first of them unless an
+    earlier operation already returned a new object. The result of a copy-on-write pipeline may
+    share memory with its input, so it must not be modified in place while copy-on-write is
+    disabled if the input is still used.
+
     Attributes:
         _operations (list): List containing tuples of operations, arguments, and keyword arguments.
+        copy_on_write (bool): Whether the operations run with pandas copy-on-write enabled.
+        track_memory (bool): Whether the resources used by every operation are recorded.
+        stats (List[OperationStats]): Resources used by the operations of the last run,
+            if tracked.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, copy_on_write: bool = False, track_memory: bool = False) -> None:
         self._operations: List[tuple] = []
+        self.copy_on_write = copy_on_write
+        self.track_memory = track_memory
+        self.stats: List[OperationStats] = []
 
     def add_operation(self, operation: Callable, *args: Any, **kwargs: Any) -> 'TransformPipeline':
         """
@@ -27,20 +224,115 @@ class TransformPipeline:
         self._operations.append((operation, args, kwargs))
         return self
 
+    def add_inplace_operation(self, operation: Callable, *args: Any, **kwargs: Any) -> 'TransformPipeline':
+        """
+        Add an operation modifying the data in place (e.g. a pandas method with inplace=True).
+
+        Parameters:
+            operation (Callable): Operation to add, its return value is ignored.
+            *args (Any): Arguments for the operation.
+            **kwargs (Any): Keyword arguments for the operation.
+
+        Returns:
+            TransformPipeline: Updated instance with the added operation.
+        """
+        return self.add_operation(InPlaceOperation(operation), *args, **kwargs)
+
+    def _own(self, data: Any) -> Any:
+        """
+        Copy the input data before it is modified in place.
+
+        Parameters:
+            data (Any): Pipeline input.
+
+        Returns:
+            Any: Copy of the data, lazy with copy-on-write.
+        """
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            return data.copy(deep=not self.copy_on_write)
+        return copy.deepcopy(data)
+
     def apply(self, data: Any) -> Any:
         """
         Apply the sequence of operations to the provided data.
 
+        The duration and the rows in and out of the pipeline ('pipeline' stage) and of every
+        operation ('pipeline.<operation>' stages) are added to the run metrics.
+
         Parameters:
             data (Any): Data to apply the operations on.
 
         Returns:
             data(Any): Transformed data after applying all operations.
         """
-        for operation, args, kwargs in self._operations:
-            data = operation(data, *args, **kwargs)
+        self.stats = []
+        with ExitStack() as stack:
+            measurement = stack.enter_context(METRICS.measure('pipeline', rows_in=count_rows(data)))
+            if self.copy_on_write:
+                stack.enter_context(pd.option_context('mode.copy_on_write', True))
+            if self.track_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                stack.callback(tracemalloc.stop)
+            owned = False
+            for operation, args, kwargs in self._operations:
+                if isinstance(operation, InPlaceOperation) and not owned:
+                    data = self._own(data)
+                    owned = True
+                with METRICS.measure(f'pipeline.{_operation_name(operation)}', rows_in=count_rows(data)) as step:
+                    if self.track_memory:
+                        result = self._apply_tracked(operation, data, args, kwargs)
+                    else:
+                        result = operation(data, *args, **kwargs)
+                    step.rows_out = count_rows(result)
+                owned = owned or result is not data
+                data = result
+            measurement.rows_out = count_rows(data)
         return data
 
+    def _apply_tracked(self, operation: Callable, data: Any, args: tuple, kwargs: dict) -> Any:
+        """
+        Apply an operation recording the resources it uses.
+
+        Parameters:
+            operation (Callable): Operation to apply.
+            data (Any): Data to apply the operation on.
+            args (tuple): Arguments for the operation.
+            kwargs (dict): Keyword arguments for the operation.
+
+        Returns:
+            Any: Transformed data.
+        """
+        rss_reset = _reset_peak_rss()
+        tracemalloc.reset_peak()
+        allocated = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = operation(data, *args, **kwargs)
+        stats = OperationStats(
+            _operation_name(operation),
+            time.perf_counter() - start,
+            tracemalloc.get_traced_memory()[1] - allocated,
+            _peak_rss() if rss_reset else None
+        )
+        self.stats.append(stats)
+        logger.info(
+            'Operation %s took %.3fs, allocated up to %.1f MiB, peak RSS %s',
+            stats.operation, stats.seconds, stats.allocated_peak / 2**20,
+            'unknown' if stats.rss_peak is None else f'{stats.rss_peak / 2**20:.1f} MiB'
+        )
+        return result
+
+    def fingerprint(self) -> str:
+        """
+        Get a fingerprint of the operations and their arguments, stable across processes and runs.
+
+        The fingerprint changes when an operation, its arguments or the code of its module
+        change. The execution options do not change the result, so they are not included.
+
+        Returns:
+            str: Hex digest of the pipeline.
+        """
+        return fingerprint(self._operations)
+
     def copy(self) -> 'TransformPipeline':
         """
         Create a copy of the current pipeline.
@@ -48,7 +340,7 @@ class TransformPipeline:
         Returns:
             TransformPipeline: Copy of the current pipeline.
         """
-        pipe = TransformPipeline()
+        pipe = TransformPipeline(copy_on_write=self.copy_on_write, track_memory=self.track_memory)
         for op, args, kwargs in self._operations:
             pipe.add_operation(op, *args, **kwargs)
         return pipe
@@ -0,0 +1,171 @@
+"""Content-addressed cache of transformed data"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Any, Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from etl.fingerprint import fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+
+class TransformCache:
+    """
+    Cache of transformed data stored on disk as Parquet, addressed by the raw content and
+    the configuration of its transformation.
+
+    Every entry is a directory named by its key holding one Parquet file per chunk. Entries are
+    written to a temporary directory and renamed into place once complete, so the cache can be
+    shared by processes. When the cache grows over its size limit, the least recently used
+    entries are removed.
+
+    Attributes:
+        directory (Path): Directory storing the entries.
+        max_bytes (int): Size limit of the cache in bytes.
+    """
+    _CHUNK_NAME = '{:05d}.parquet'
+
+    def __init__(self, directory: str | Path, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(content: Any, *options: Any) -> str:
+        """
+        Get the key of transformed data.
+
+        Parameters:
+            content (Any): Raw content, a bytes-like object
+            *options (Any): Objects configuring the transformation, e.g. the parser settings
+                and the pipelines (see `etl.fingerprint.describe`)
+
+        Returns:
+            str: Hex digest of the content and the options
+        """
+        digest = hashlib.sha256(content)
+        digest.update(fingerprint(*options).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str, chunked: bool) -> Any | None:
+        """
+        Get cached transformed data.
+
+        Parameters:
+            key (str): Key of the data
+            chunked (bool): Whether the data was transformed in chunks
+
+        Returns:
+            Any | None: DataFrame, or an iterator over the chunks read lazily if chunked,
+                None if the data is not cached
+        """
+        entry = self.directory / key
+        try:
+            paths = sorted(entry.iterdir())
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        logger.info('Transform cache hit: %s', key)
+        if chunked:
+            return (pq.read_table(path).to_pandas() for path in paths)
+        return pq.read_table(paths[0]).to_pandas()
+
+    def put(self, key: str, data: Any, chunked: bool) -> Any:
+        """
+        Store transformed data while it is consumed.
+
+        Only DataFrames are stored. Chunked data is written chunk by chunk as the returned
+        iterator is consumed and stored only if all of it is consumed.
+
+        Parameters:
+            key (str): Key of the data
+            data (Any): DataFrame, or an iterator over DataFrame chunks if chunked
+            chunked (bool): Whether the data is transformed in chunks
+
+        Returns:
+            Any: The data, or an iterator over the same chunks if chunked
+        """
+        if chunked:
+            return self._put_chunks(key, data)
+        for _ in self._put_chunks(key, iter([data])):
+            pass
+        return data
+
+    def _put_chunks(self, key: str, chunks: Iterator[Any]) -> Iterator[Any]:
+        """
+        Yield the chunks and store them once all of them are consumed.
+
+        Parameters:
+            key (str): Key of the data
+            chunks (Iterator[Any]): Chunks of transformed data
+
+        Yields:
+            Any: Chunks of transformed data
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=self.directory, prefix=f'.{key}.'))
+        try:
+            storable = True
+            for number, chunk in enumerate(chunks):
+                storable = storable and isinstance(chunk, pd.DataFrame)
+                if storable:
+                    self._write_chunk(tmp / self._CHUNK_NAME.format(number), chunk)
+                yield chunk
+            if storable:
+                self._commit(key, tmp)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @staticmethod
+    def _write_chunk(path: Path, chunk: pd.DataFrame) -> None:
+        """
+        Write a chunk as a Parquet file.
+
+        Parameters:
+            path (Path): File path
+            chunk (pd.DataFrame): Chunk of transformed data
+        """
+        pq.write_table(pa.Table.from_pandas(chunk), path)
+
+    def _commit(self, key: str, tmp: Path) -> None:
+        """
+        Move a completely written entry into place and evict entries over the size limit.
+
+        Parameters:
+            key (str): Key of the data
+            tmp (Path): Temporary directory with the written entry
+        """
+        try:
+            tmp.rename(self.directory / key)
+        except OSError:
+            logger.debug('Transform cache entry %s already stored', key)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache fits its size limit.
+        """
+        entries = []
+        for entry in self.directory.iterdir():
+            if entry.name.startswith('.'):
+                continue
+            try:
+                size = sum(path.stat().st_size for path in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except FileNotFoundError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            logger.info('Evicted transform cache entry %s', entry.name)
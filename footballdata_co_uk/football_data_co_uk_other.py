@@ -1,54 +1,45 @@
 """Update script for Football Data Co UK other dataset"""
 
 import logging
-from pathlib import Path
-import requests
+from typing import Any
 
-import yaml
-
-from database.database import Session
-from etl.data_parser import CSVDataParser
 from etl.download_strategy import ReplaceStrategy
 from etl.files import File
-from etl.process import ETL
+from etl.scheduler import recently_changed_first
 from etl.downloader import APIDownloader
+from etl.transform import TransformPipeline, add_row_hash
 from footballdata_co_uk.pipelines import get_transform_pipeline, get_validation_pipeline
+from footballdata_co_uk.runner import UpdateRunner
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 def main() -> None:
-    objects = []
-    with open(Path('footballdata_co_uk/configuration/footballdata_co_uk.yaml'), 'r') as handle:
-        config = yaml.safe_load(handle)
-
-    for league in config['new_dataset']['leagues']:
-        file = File(f'data/FootballDataCoUK/{league}/{league}.csv')
-        url = f"{config['new_dataset']['base_url']}/{league}.csv"
-        obj = APIDownloader('GET', url, file, table='football_data_co_uk', schema='football_data')
-        objects.append(obj)
+    runner = UpdateRunner('football_data_co_uk_other', __doc__)
+    config = runner.config
+
+    objects = (
+        APIDownloader(
+            'GET', f"{config['new_dataset']['base_url']}/{league}.csv",
+            File(f'data/FootballDataCoUK/{league}/{league}.csv', compression=config['archive']['compression']),
+            table='football_data_co_uk', schema='football_data'
+        )
+        for league in config['new_dataset']['leagues']
+    )
 
     preprocessing_config = config['preprocessing']
-    validation_config = config['new_dataset']['validation']
-    transform_pipeline = get_transform_pipeline(preprocessing_config)
-    validation_pipeline = get_validation_pipeline(validation_config)
-
-    etl: ETL = ETL(sleep_time=3)
-    download_strategy = ReplaceStrategy()
-    with Session.begin() as upload_session, requests.Session() as download_session:
-        for item in etl.process_queue(objects, strategy=download_strategy):
-            try:
-                item_extracted = etl.extract(item, session=download_session)
-            except requests.exceptions.HTTPError:
-                continue
-            item_transformed = etl.transform(
-                item_extracted,
-                parser = CSVDataParser(encoding='unicode_escape'),
-                transform_pipeline=transform_pipeline,
-                validation_pipeline=validation_pipeline
-            )
-            etl.load(item_transformed, upload_session)
+
+    def transform_pipeline(obj: Any) -> TransformPipeline:
+        return get_transform_pipeline(preprocessing_config, obj.url, runner.format_cache).add_operation(add_row_hash)
+
+    runner.run(
+        objects,
+        transform_pipeline,
+        get_validation_pipeline(config['new_dataset']['validation']),
+        strategy=lambda upload_session: ReplaceStrategy(runner.manifest),
+        priority=recently_changed_first(runner.manifest)
+    )
 
 
 if __name__ == '__main__':
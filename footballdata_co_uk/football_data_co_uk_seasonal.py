@@ -1,69 +1,91 @@
 """Update script for Football Data Co UK seasonal dataset"""
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
-from pathlib import Path
-import requests
+from typing import Any, Dict, Iterator, List, Tuple
 
-import yaml
 import pandas as pd
 
-from database.database import Session
-from etl.data_parser import CSVDataParser
 from etl.date_utils import generate_seasons
-from etl.download_strategy import ReplaceOnMetaFlagStrategy
+from etl.download_strategy import SeasonRefreshStrategy, SeasonWindow
 from etl.files import File
-from etl.process import ETL
+from etl.scheduler import recently_changed_first
 from etl.downloader import APIDownloader
+from etl.transform import TransformPipeline, add_row_hash
 from footballdata_co_uk.pipelines import get_transform_pipeline, get_validation_pipeline
+from footballdata_co_uk.runner import UpdateRunner
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-BACKTRACK = 2
 
 
-def main() -> None:
-    start_date = datetime(2000, 7, 1)
-    end_date = datetime.today()
-    objects = []
-    with open(Path('footballdata_co_uk/configuration/footballdata_co_uk.yaml'), 'r') as handle:
-        config = yaml.safe_load(handle)
-
-    seasons = list(generate_seasons(start_date, end_date))
-    num_seasons = len(seasons)
-    for season in seasons:
-        replace = season in seasons[num_seasons-BACKTRACK:]
+def generate_objects(config: Dict[str, Any], seasons: List[Tuple[str, str]]) -> Iterator[APIDownloader]:
+    """
+    Yields the download objects of every league of the seasons, from the latest season.
+
+    Parameters:
+        config (Dict[str, Any]): Configuration
+        seasons (List[Tuple[str, str]]): Seasons, e.g. ('2324', '2023/2024')
+
+    Yields:
+        APIDownloader: Download object of a league season
+    """
+    for season in reversed(seasons):
         for league in config['seasonal_dataset']['leagues']:
-            file = File(f'data/FootballDataCoUK/{season[0].replace("/","_")}/{league}.csv')
+            file = File(
+                f'data/FootballDataCoUK/{season[0].replace("/","_")}/{league}.csv',
+                compression=config['archive']['compression']
+            )
             url = f"{config['seasonal_dataset']['base_url']}/{season[0]}/{league}.csv"
-            obj_meta = {'season': season[1], 'replace': replace}
-            obj = APIDownloader(
+            obj_meta = {'season': season[1], 'league': league}
+            yield APIDownloader(
                 'GET', url, file, table='football_data_co_uk', schema='football_data', meta=obj_meta)
-            objects.append(obj)
+
+
+def main() -> None:
+    runner = UpdateRunner('football_data_co_uk_seasonal', __doc__)
+    config = runner.config
+    start_date = datetime(2000, 7, 1)
+    end_date = datetime.today()
+
+    first_year = end_date.year if end_date.month >= start_date.month else end_date.year - 1
+    current_season = f'{first_year}/{first_year + 1}'
 
     preprocessing_config = config['preprocessing']
-    validation_config = config['seasonal_dataset']['validation']
-    transform_base_pipeline = get_transform_pipeline(preprocessing_config)
-    validation_pipeline = get_validation_pipeline(validation_config)
-
-
-    etl: ETL = ETL(sleep_time=3)
-    download_strategy = ReplaceOnMetaFlagStrategy()
-    with Session.begin() as upload_session, requests.Session() as download_session:
-        for item in etl.process_queue(objects, strategy=download_strategy):
-            try:
-                item_extracted = etl.extract(item, session=download_session)
-            except requests.exceptions.HTTPError:
-                continue
-            transform_pipeline = transform_base_pipeline.copy()\
-                .add_operation(pd.DataFrame.assign, season=item.meta['season'])
-            item_transformed = etl.transform(
-                item_extracted,
-                parser = CSVDataParser(encoding='unicode_escape'),
-                transform_pipeline=transform_pipeline,
-                validation_pipeline=validation_pipeline
-            )
-            etl.load(item_transformed, upload_session)
+
+    def transform_pipeline(obj: Any) -> TransformPipeline:
+        return (
+            get_transform_pipeline(preprocessing_config, obj.url, runner.format_cache)
+            .add_operation(pd.DataFrame.assign, season=obj.meta['season'])
+            .add_operation(add_row_hash)
+        )
+
+    refresh_config = config['seasonal_dataset']['refresh']
+
+    def refresh_strategy(upload_session: Any) -> SeasonRefreshStrategy:
+        return SeasonRefreshStrategy(
+            SeasonRefreshStrategy.query_latest(
+                upload_session, 'football_data', config['database']['table_name'],
+                config['database']['date_column']
+            ),
+            windows={
+                league: SeasonWindow.from_config(window)
+                for league, window in refresh_config['windows'].items()
+            },
+            default_window=SeasonWindow.from_config(refresh_config['default_window']),
+            grace=timedelta(days=refresh_config['grace_days']),
+            ttl=timedelta(days=refresh_config['ttl_days']),
+            manifest=runner.manifest
+        )
+
+    changed_first = recently_changed_first(runner.manifest)
+    runner.run(
+        generate_objects(config, list(generate_seasons(start_date, end_date))),
+        transform_pipeline,
+        get_validation_pipeline(config['seasonal_dataset']['validation']),
+        strategy=refresh_strategy,
+        priority=lambda obj: (obj.meta['season'] != current_season, changed_first(obj))
+    )
 
 
 if __name__ == '__main__':
@@ -1,35 +1,62 @@
 """Common Pipelines"""
+from typing import List
 
 import pandas as pd
 from etl.data_quality import DataQualityValidator
-from etl.date_utils import parse_dataframe_dates
-from etl.transform import TransformPipeline
+from etl.date_utils import DateFormatCache, parse_dataframe_dates
+from etl.transform import TransformPipeline, cast_numeric
 
 
-def get_transform_pipeline(config) -> TransformPipeline:
+def select_columns(data: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Select the given columns present in the data, keeping their order in the data.
+
+    With copy-on-write enabled the columns are taken one by one, so they are views of
+    the data instead of a copy of the selected part of its blocks.
+
+    Parameters:
+        data (pd.DataFrame): Data
+        columns (List[str]): Columns to select
+
+    Returns:
+        pd.DataFrame: Data with the selected columns
+    """
+    selected = [col for col in data.columns if col in columns]
+    if pd.options.mode.copy_on_write and data.columns.is_unique:
+        return pd.DataFrame({col: data[col] for col in selected}, index=data.index, copy=False)
+    return data[selected]
+
+
+def has_columns(data: pd.DataFrame, columns: List[str]) -> bool:
+    """
+    Check whether the data contains all the given columns.
+
+    Parameters:
+        data (pd.DataFrame): Data
+        columns (List[str]): Required columns
+
+    Returns:
+        bool: Whether all the columns are present
+    """
+    return all(col in data.columns for col in columns)
+
+
+def get_transform_pipeline(
+    config, source: str | None = None, format_cache: DateFormatCache | None = None
+) -> TransformPipeline:
     return (
-        TransformPipeline()
-            .add_operation(pd.DataFrame.rename, **config['rename'])
-            .add_operation(
-                lambda df: df[[col for col in df.columns if col in config['columns_select']]])
-            .add_operation(parse_dataframe_dates, **config['parse_dates'])
-            .add_operation(pd.DataFrame.replace, **config['replace'])
-            .add_operation(pd.DataFrame.dropna, **config['dropna'])
-            .add_operation(
-                pd.DataFrame.apply,
-                lambda col: pd.to_numeric(col, errors='coerce')
-                if col.name in config['columns_to_numeric'] else col,
-                axis=0
-            )
-            .add_operation(pd.DataFrame.convert_dtypes, **config['convert_dtypes'])
+        TransformPipeline(copy_on_write=True)
+            .add_inplace_operation(pd.DataFrame.rename, inplace=True, **config['rename'])
+            .add_operation(select_columns, config['columns_select'])
+            .add_operation(parse_dataframe_dates, **config['parse_dates'], source=source, format_cache=format_cache)
+            .add_inplace_operation(pd.DataFrame.replace, inplace=True, **config['replace'])
+            .add_inplace_operation(pd.DataFrame.dropna, inplace=True, **config['dropna'])
+            .add_operation(cast_numeric, config['columns_to_numeric'])
         )
 
 
 def get_validation_pipeline(config) -> DataQualityValidator:
     return (
         DataQualityValidator()
-            .add_condition(
-                lambda df: all(col in df.columns for col in config['columns_required']),
-                True
-            )
+            .add_condition(has_columns, True, config['columns_required'])
     )
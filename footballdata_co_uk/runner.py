@@ -0,0 +1,165 @@
+"""Common setup of the Football Data Co UK update scripts"""
+import argparse
+from dataclasses import asdict
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable
+import requests
+
+import yaml
+
+from database.database import Session
+from etl.data_parser import CSVDataParser
+from etl.data_quality import DataQualityValidator
+from etl.date_utils import DateFormatCache
+from etl.download_strategy import ContentHashStrategy, DownloadStrategy
+from etl.downloader import APIDownloader, create_session
+from etl.exceptions import ContentNotModified
+from etl.files import File
+from etl.fingerprint import fingerprint
+from etl.manifest import Manifest
+from etl.metrics import METRICS
+from etl.pacing import AdaptivePacer
+from etl.process import ETL
+from etl.profiling import Profiler
+from etl.transform import TransformPipeline
+from etl.transform_cache import TransformCache
+
+
+DEFAULT_CONFIG = Path('footballdata_co_uk/configuration/footballdata_co_uk.yaml')
+
+
+def parse_args(description: str | None) -> argparse.Namespace:
+    """
+    Parse the command line arguments of an update script.
+
+    Parameters:
+        description (str | None): Description of the script
+
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    arg_parser = argparse.ArgumentParser(description=description)
+    arg_parser.add_argument(
+        '--profile',
+        action='store_true',
+        help=f'Profile every object (also enabled by the {Profiler.ENVIRONMENT_VARIABLE} environment variable)'
+    )
+    arg_parser.add_argument(
+        '--refresh-missing',
+        action='store_true',
+        help='Request the URLs known to be missing regardless of their expiry'
+    )
+    arg_parser.add_argument(
+        '--force-reload',
+        action='store_true',
+        help='Transform and load the downloaded content even if it was loaded before'
+    )
+    arg_parser.add_argument(
+        '--run-id',
+        default=os.getenv('ETL_RUN_ID'),
+        help='Run identifier, a run restarted with the same identifier skips the objects it finished '
+             '(default: the ETL_RUN_ID environment variable or a new identifier)'
+    )
+    arg_parser.add_argument('--config', type=Path, default=DEFAULT_CONFIG, help='Configuration file')
+    return arg_parser.parse_args()
+
+
+class UpdateRunner:
+    """
+    Runs an update script: the ETL of its download objects into the database, recording the
+    run in the manifest and writing the run metrics.
+
+    Attributes:
+        name (str): Name of the script in the profiles and metrics
+        args (argparse.Namespace): Command line arguments
+        config (Dict[str, Any]): Configuration
+        format_cache (DateFormatCache): Cache of the date formats of the sources
+        parser (CSVDataParser): Parser of the downloaded content
+        pacer (AdaptivePacer): Request pacing controller
+        manifest (Manifest): Manifest of the downloads, loads and run checkpoints
+        etl (ETL): ETL processor
+    """
+    def __init__(self, name: str, description: str | None) -> None:
+        self.name = name
+        self.args = parse_args(description)
+        with open(self.args.config, 'r', encoding='utf-8') as handle:
+            self.config: Dict[str, Any] = yaml.safe_load(handle)
+        self.format_cache = DateFormatCache(File(self.config['preprocessing']['date_format_cache']))
+        self.parser = CSVDataParser(encoding='unicode_escape', engine='c')
+        pacing_config = self.config['pacing']
+        self.pacer = AdaptivePacer(**pacing_config['pacer'])
+        self.manifest = Manifest(self.config['manifest']['path'], run_id=self.args.run_id)
+        self.etl: ETL = ETL(
+            pacer=self.pacer,
+            max_retries=pacing_config['max_retries'],
+            transform_cache=TransformCache(**self.config['transform_cache']),
+            profiler=Profiler.from_environment(
+                f"{self.config['profiling']['directory']}/{name}",
+                enabled=self.args.profile,
+                top=self.config['profiling']['top']
+            ),
+            manifest=self.manifest,
+            missing_ttl=self.config['missing']['ttl_days'] * 86400,
+            max_missing_ttl=self.config['missing']['max_ttl_days'] * 86400,
+            refresh_missing=self.args.refresh_missing
+        )
+
+    def run(
+        self,
+        objects: Iterable[APIDownloader],
+        transform_pipeline: Callable[[Any], TransformPipeline],
+        validation_pipeline: DataQualityValidator,
+        strategy: Callable[[Any], DownloadStrategy],
+        priority: Callable[[Any], Any]
+    ) -> None:
+        """
+        Extract, transform and load the objects, commit them and write the run metrics.
+
+        Content that was loaded before with the same transformation is skipped unless the
+        run is forced to reload it.
+
+        Parameters:
+            objects (Iterable[APIDownloader]): Download objects
+            transform_pipeline (Callable[[Any], TransformPipeline]): Function returning the
+                transform pipeline of an object
+            validation_pipeline (DataQualityValidator): Validation pipeline
+            strategy (Callable[[Any], DownloadStrategy]): Function returning the download
+                strategy given the upload session
+            priority (Callable[[Any], Any]): Priority of an object, lower first
+        """
+        extract_config = self.config['extract']
+        metrics_config = self.config['metrics']
+        report = None
+        try:
+            with Session() as upload_session, \
+                    self.pacer.attach(create_session(extract_config['max_workers'])) as download_session:
+                report = self.etl.run(
+                    objects,
+                    upload_session,
+                    self.parser,
+                    transform_pipeline=transform_pipeline,
+                    validation_pipeline=validation_pipeline,
+                    method=self.config['load']['method'],
+                    commit_every=self.config['load']['commit_every'],
+                    strategy=ContentHashStrategy(
+                        strategy(upload_session),
+                        self.manifest,
+                        fingerprint=lambda obj: fingerprint(self.parser, transform_pipeline(obj), validation_pipeline),
+                        force=self.args.force_reload
+                    ),
+                    priority=priority,
+                    download_session=download_session,
+                    ignore_exceptions=(requests.exceptions.HTTPError, ContentNotModified),
+                    **self.config['transform'],
+                    **extract_config
+                )
+                upload_session.commit()
+            self.etl.commit()
+        finally:
+            METRICS.write_summary(
+                File(f"{metrics_config['directory']}/{self.name}.json"),
+                report=asdict(report) if report is not None else None
+            )
+            METRICS.write_textfile(File(f"{metrics_config['directory']}/{self.name}.prom"), job=self.name)
+            self.manifest.close()